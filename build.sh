@@ -11,4 +11,5 @@ python -m pip install --no-cache-dir -r requirements.txt
 
 # Run migrations before collectstatic so DB is ready
 python manage.py migrate --noinput --run-syncdb
+python manage.py createcachetable
 python manage.py collectstatic --noinput
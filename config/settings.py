@@ -36,6 +36,13 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Opt-in request instrumentation: Server-Timing headers, per-request log
+# lines and /stats/requests/ (staff only). Placed after static file serving.
+INSTRUMENT_REQUESTS = bool(int(os.environ.get("JOBTOOL_INSTRUMENT", "0")))
+INSTRUMENT_N_PLUS_ONE_THRESHOLD = int(os.environ.get("JOBTOOL_N_PLUS_ONE_THRESHOLD", "10"))
+if INSTRUMENT_REQUESTS:
+    MIDDLEWARE.insert(2, "core.middleware.QueryInstrumentationMiddleware")
+
 ROOT_URLCONF = "config.urls"
 TEMPLATES = [
     {
@@ -55,8 +62,97 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "config.wsgi.application"
 
-DATABASES = {
-    "default": dj_database_url.config(default=os.environ.get("DATABASE_URL", "sqlite:///db.sqlite3"), conn_max_age=600)
+# Serve the report and dashboard with their async views (see core/urls.py). Off by default:
+# the middleware stack is sync-only, so async views still hold a thread per request.
+ASYNC_VIEWS = bool(int(os.environ.get("JOBTOOL_ASYNC_VIEWS", "0")))
+
+# Database profile. Persistent connections are health-checked before reuse.
+# On PostgreSQL, JOBTOOL_STATEMENT_TIMEOUT_MS makes the server cancel runaway
+# queries, and JOBTOOL_DB_POOL=1 swaps persistent connections for a psycopg 3
+# pool (`pip install "psycopg[pool]"`).
+DB_CONN_MAX_AGE = int(os.environ.get("JOBTOOL_DB_CONN_MAX_AGE", "600"))
+DB_POOL = bool(int(os.environ.get("JOBTOOL_DB_POOL", "0")))
+DB_POOL_MIN_SIZE = int(os.environ.get("JOBTOOL_DB_POOL_MIN", "2"))
+DB_POOL_MAX_SIZE = int(os.environ.get("JOBTOOL_DB_POOL_MAX", "10"))
+STATEMENT_TIMEOUT_MS = int(os.environ.get("JOBTOOL_STATEMENT_TIMEOUT_MS", "0"))
+REPLICA_STATEMENT_TIMEOUT_MS = int(os.environ.get("JOBTOOL_REPLICA_STATEMENT_TIMEOUT_MS", str(STATEMENT_TIMEOUT_MS)))
+
+
+def _database(url, statement_timeout_ms):
+    db = dj_database_url.parse(url, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=True)
+    if db["ENGINE"] == "django.db.backends.postgresql":
+        options = db.setdefault("OPTIONS", {})
+        if statement_timeout_ms:
+            options["options"] = f"-c statement_timeout={statement_timeout_ms}"
+        if DB_POOL:
+            options["pool"] = {"min_size": DB_POOL_MIN_SIZE, "max_size": DB_POOL_MAX_SIZE, "timeout": 10}
+            db["CONN_MAX_AGE"] = 0  # the pool keeps connections open instead
+    return db
+
+
+DATABASES = {"default": _database(os.environ.get("DATABASE_URL", "sqlite:///db.sqlite3"), STATEMENT_TIMEOUT_MS)}
+
+# Optional read replica. Views wrapped in core.routers.use_replica (report,
+# exports, dashboard, receivables) read job data from it; every write, and
+# everything outside those views, uses "default". Tests mirror it to default.
+DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+if DATABASE_REPLICA_URL:
+    DATABASES["replica"] = _database(DATABASE_REPLICA_URL, REPLICA_STATEMENT_TIMEOUT_MS)
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+
+# Cache for report totals and fragments (see core/report_cache.py). No Redis:
+# "locmem" is per process, so use "db" (after `createcachetable`) or "file"
+# when running more than one worker.
+CACHE_BACKENDS = {
+    "locmem": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "jobtool"},
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("JOBTOOL_CACHE_DIR", "/tmp/jobtool-cache"),
+    },
+    "db": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "jobtool_cache"},
+    "dummy": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+}
+CACHES = {"default": CACHE_BACKENDS[os.environ.get("JOBTOOL_CACHE", "locmem")]}
+REPORT_CACHE_TIMEOUT = int(os.environ.get("JOBTOOL_REPORT_CACHE_TIMEOUT", str(60 * 60 * 24)))
+# Totals for periods that ended before the current month rarely change.
+REPORT_CLOSED_PERIOD_TIMEOUT = int(os.environ.get("JOBTOOL_CLOSED_PERIOD_CACHE_TIMEOUT", str(60 * 60 * 24 * 30)))
+
+# Maintain the MonthlyRollup table on every write and read monthly receivables
+# from it. Fill it with `manage.py rebuild_ledger --rollups` before enabling.
+RECEIVABLES_ROLLUP = bool(int(os.environ.get("JOBTOOL_ROLLUP", "0")))
+
+# Entry changelists in the admin show PostgreSQL's row estimate instead of an
+# exact COUNT(*) once a result is larger than this.
+ADMIN_COUNT_ESTIMATE_THRESHOLD = int(os.environ.get("JOBTOOL_ADMIN_COUNT_THRESHOLD", "100000"))
+
+# Background tasks (core/tasks.py, `manage.py run_tasks`). A running task that
+# has not reported progress for TASK_STALE_AFTER seconds is assumed to have
+# lost its worker and is retried; finished tasks and their files are deleted
+# after TASK_RETENTION_DAYS.
+TASK_STALE_AFTER = int(os.environ.get("JOBTOOL_TASK_STALE_AFTER", "600"))
+TASK_RETENTION_DAYS = int(os.environ.get("JOBTOOL_TASK_RETENTION_DAYS", "7"))
+
+# Files written by background tasks go to the default storage. The web and
+# worker processes must share it: a common directory on one host, or an
+# object-storage backend (e.g. django-storages) named in JOBTOOL_FILE_STORAGE.
+# For S3-compatible storage ("storages.backends.s3.S3Storage") set the bucket
+# below; boto3 reads AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY itself.
+MEDIA_ROOT = os.environ.get("JOBTOOL_MEDIA_ROOT", str(BASE_DIR / "media"))
+FILE_STORAGE_OPTIONS = {}
+if os.environ.get("JOBTOOL_STORAGE_BUCKET"):
+    FILE_STORAGE_OPTIONS = {
+        "bucket_name": os.environ["JOBTOOL_STORAGE_BUCKET"],
+        "endpoint_url": os.environ.get("JOBTOOL_STORAGE_ENDPOINT_URL") or None,
+        "region_name": os.environ.get("JOBTOOL_STORAGE_REGION") or None,
+        "default_acl": "private",
+    }
+STORAGES = {
+    "default": {
+        "BACKEND": os.environ.get("JOBTOOL_FILE_STORAGE", "django.core.files.storage.FileSystemStorage"),
+        "OPTIONS": FILE_STORAGE_OPTIONS,
+    },
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
 }
 
 # Static files (WhiteNoise)
@@ -88,3 +184,12 @@ SESSION_COOKIE_SECURE = not DEBUG
 CSRF_COOKIE_SECURE = not DEBUG
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "core": {"handlers": ["console"], "level": os.environ.get("JOBTOOL_LOG_LEVEL", "INFO")},
+    },
+}
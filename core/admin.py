@@ -1,8 +1,135 @@
 from __future__ import annotations
 
-from django.contrib import admin
+from datetime import date, timedelta
 
-from .models import Asset, Client, MaterialEntry, Payment, Project, RateOverride, WorkEntry
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.utils import timezone
+
+from .invoicing import generate_invoices
+from .models import (
+    ArchivedProjectSummary,
+    Asset,
+    BackfillRun,
+    BackgroundTask,
+    Client,
+    Invoice,
+    InvoiceLine,
+    MaterialEntry,
+    Payment,
+    Project,
+    ProjectLedger,
+    RateOverride,
+    WorkEntry,
+)
+from .pagination import EstimatedCountPaginator
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """Foreign-key list filter rendered as an autocomplete box.
+
+    The stock filter lists every related row in the sidebar; this one only
+    loads the selected one and searches the rest through the related
+    admin's ``search_fields``, like ``autocomplete_fields`` on the form.
+    """
+
+    template = "admin/core/autocomplete_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.admin_site = model_admin.admin_site
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def field_choices(self, field, request, model_admin):
+        if not self.lookup_val:
+            return []
+        try:
+            selected = list(field.remote_field.model._default_manager.filter(pk__in=self.lookup_val))
+        except (ValueError, ValidationError):
+            return []  # the changelist reports the bad parameter itself
+        return [(obj.pk, str(obj)) for obj in selected]
+
+    def has_output(self) -> bool:
+        return True
+
+    def widget(self) -> str:
+        related = self.field.remote_field.model._default_manager.all()
+        choice = forms.ModelChoiceField(
+            queryset=related, required=False, widget=AutocompleteSelect(self.field, self.admin_site)
+        )
+        value = self.lookup_choices[-1][0] if self.lookup_choices else None
+        attrs = {
+            "id": f"filter_{self.field_path}",
+            "style": "width: 100%",
+            "data-filter-param": self.lookup_kwarg,
+            "data-filter-null-param": self.lookup_kwarg_isnull,
+        }
+        return choice.widget.render(self.lookup_kwarg, value, attrs=attrs)
+
+
+class AutocompleteFilterAdmin(admin.ModelAdmin):
+    """Loads the scripts :class:`AutocompleteFilter` needs on the changelist."""
+
+    @property
+    def media(self):
+        autocomplete = AutocompleteSelect(None, self.admin_site).media
+        return super().media + autocomplete + forms.Media(js=["js/admin_filters.js"])
+
+
+class EntryLogQuerySet(models.QuerySet):
+    """Changelist queryset whose ``date_hierarchy`` links avoid a full scan.
+
+    ``dates()`` is a DISTINCT over every matching row; here it is the
+    periods between MIN and MAX (both index lookups) that hold at least one
+    row, found with an EXISTS probe per period.
+    """
+
+    def dates(self, field_name, kind, order="ASC"):
+        bounds = self.aggregate(first=models.Min(field_name), last=models.Max(field_name))
+        if bounds["first"] is None:
+            return []
+        periods = []
+        current = _period_start(bounds["first"], kind)
+        while current <= bounds["last"]:
+            following = _next_period(current, kind)
+            if self.filter(**{f"{field_name}__gte": current, f"{field_name}__lt": following}).exists():
+                periods.append(current)
+            current = following
+        return periods if order == "ASC" else periods[::-1]
+
+
+def _period_start(day: date, kind: str) -> date:
+    if kind == "year":
+        return day.replace(month=1, day=1)
+    if kind == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_period(start: date, kind: str) -> date:
+    if kind == "year":
+        return start.replace(year=start.year + 1)
+    if kind == "month":
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+class EntryLogAdmin(AutocompleteFilterAdmin):
+    """Changelist settings for the entry logs, which grow without bound.
+
+    Counts come from :class:`EstimatedCountPaginator`, filtered lists skip the
+    second unfiltered count, job/asset filters use autocomplete and the date
+    hierarchy probes periods instead of scanning (:class:`EntryLogQuerySet`).
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return EntryLogQuerySet(model=queryset.model, query=queryset.query, using=queryset.db)
 
 
 # ---------- Client ----------
@@ -26,50 +153,162 @@ class AssetAdmin(admin.ModelAdmin):
 # ---------- Project (Job) ----------
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
-    list_display = ("client", "name", "active")
+    list_display = ("client", "name", "hourly_rate", "material_markup_percent", "active")
     list_filter = ("client", "active")
     search_fields = ("name", "location", "client__name")
     autocomplete_fields = ("client",)
     list_select_related = ("client",)
+    actions = ["invoice_through_today"]
+
+    def get_readonly_fields(self, request, obj=None):
+        # An archived job's entries are in the archive tables; it reopens through `archive_jobs --restore`.
+        if obj is not None and obj.archived_at:
+            return (*super().get_readonly_fields(request, obj), "active", "archived_at")
+        return super().get_readonly_fields(request, obj)
+
+    @admin.action(description="Generate invoices for unbilled entries through today")
+    def invoice_through_today(self, request, queryset):
+        invoices = generate_invoices(queryset, timezone.localdate())
+        if invoices:
+            self.message_user(request, f"Generated {len(invoices)} invoice(s).", messages.SUCCESS)
+        else:
+            self.message_user(request, "Nothing to invoice for the selected jobs.", messages.WARNING)
 
 
 # ---------- Work Entry ----------
 @admin.register(WorkEntry)
-class WorkEntryAdmin(admin.ModelAdmin):
+class WorkEntryAdmin(EntryLogAdmin):
     list_display = ("project", "date", "hours", "asset")
-    list_filter = ("project", "asset")
+    list_filter = (("project", AutocompleteFilter), ("asset", AutocompleteFilter))
     date_hierarchy = "date"
     autocomplete_fields = ("project", "asset")
-    list_select_related = ("project", "asset", "project__client")
+    list_select_related = ("project__client", "asset__client")
 
 
 # ---------- Material Entry ----------
 @admin.register(MaterialEntry)
-class MaterialEntryAdmin(admin.ModelAdmin):
-    list_display = ("project", "date", "description", "quantity", "unit_cost")
-    list_filter = ("project",)
+class MaterialEntryAdmin(EntryLogAdmin):
+    list_display = ("project", "date", "description", "quantity", "unit_cost", "markup_percent")
+    list_filter = (("project", AutocompleteFilter),)
     date_hierarchy = "date"
     autocomplete_fields = ("project",)
-    list_select_related = ("project",)
+    list_select_related = ("project__client",)
 
 
 # ---------- Payment ----------
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(EntryLogAdmin):
     list_display = ("project", "date", "amount")
-    list_filter = ("project",)
+    list_filter = (("project", AutocompleteFilter),)
     date_hierarchy = "date"
     autocomplete_fields = ("project",)
-    list_select_related = ("project",)
+    list_select_related = ("project__client",)
 
 
 # ---------- Rate Override ----------
 @admin.register(RateOverride)
-class RateOverrideAdmin(admin.ModelAdmin):
+class RateOverrideAdmin(AutocompleteFilterAdmin):
     list_display = ("project", "asset", "hourly_rate")
-    list_filter = ("project", "asset")
+    list_filter = (("project", AutocompleteFilter), ("asset", AutocompleteFilter))
     autocomplete_fields = ("project", "asset")
-    list_select_related = ("project", "asset")
+    list_select_related = ("project__client", "asset__client")
+
+
+# ---------- Project Ledger (derived, read-only) ----------
+@admin.register(ProjectLedger)
+class ProjectLedgerAdmin(admin.ModelAdmin):
+    list_display = ("project", "labor", "materials", "payments", "balance", "updated_at")
+    list_select_related = ("project", "project__client")
+    search_fields = ("project__name", "project__client__name")
+    readonly_fields = ("project", "labor", "materials", "payments", "balance", "updated_at")
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+
+# ---------- Invoices (frozen snapshots, read-only) ----------
+class InvoiceLineInline(admin.TabularInline):
+    model = InvoiceLine
+    fields = ("kind", "description", "first_date", "last_date", "quantity", "rate", "amount")
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None) -> bool:
+        return False
+
+
+@admin.register(Invoice)
+class InvoiceAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "issued_on", "period_start", "period_end", "total", "balance_due")
+    list_filter = ("issued_on",)
+    search_fields = ("client_name", "project_name")
+    date_hierarchy = "issued_on"
+    readonly_fields = (
+        "project",
+        "client_name",
+        "project_name",
+        "issued_on",
+        "period_start",
+        "period_end",
+        "labor",
+        "materials",
+        "total",
+        "payments_to_date",
+        "balance_due",
+        "created_at",
+    )
+    inlines = [InvoiceLineInline]
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+
+# ---------- Background tasks (queued by views, run by `manage.py run_tasks`) ----------
+@admin.register(BackgroundTask)
+class BackgroundTaskAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "status", "progress", "total", "attempts", "created_by", "created_at", "finished_at")
+    list_filter = ("status", "name")
+    date_hierarchy = "created_at"
+    list_select_related = ("created_by",)
+    readonly_fields = [field.name for field in BackgroundTask._meta.fields]
+    actions = ["retry"]
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    @admin.action(description="Retry selected failed tasks")
+    def retry(self, request, queryset):
+        retried = queryset.filter(status=BackgroundTask.FAILED).update(
+            status=BackgroundTask.QUEUED, attempts=0, run_after=timezone.now(), finished_at=None, worker=""
+        )
+        self.message_user(request, f"Queued {retried} task(s) again.", messages.SUCCESS)
+
+
+# ---------- Backfill checkpoints (written by `manage.py run_backfill`) ----------
+@admin.register(BackfillRun)
+class BackfillRunAdmin(admin.ModelAdmin):
+    list_display = ("name", "percent", "last_pk", "max_pk", "rows", "batches", "started_at", "finished_at")
+    readonly_fields = [field.name for field in BackfillRun._meta.fields]
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+
+# ---------- Archived jobs (written by `manage.py archive_jobs`) ----------
+@admin.register(ArchivedProjectSummary)
+class ArchivedProjectSummaryAdmin(admin.ModelAdmin):
+    list_display = ("project", "labor", "materials", "payments", "balance", "first_date", "last_date", "archived_at")
+    list_select_related = ("project__client",)
+    search_fields = ("project__name", "project__client__name")
+    readonly_fields = [field.name for field in ArchivedProjectSummary._meta.fields]
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_delete_permission(self, request, obj=None) -> bool:
+        # why: deleting the summary alone would drop the job's archived totals
+        return False
 
 
 # Branding (optional; safe to keep)
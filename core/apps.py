@@ -1,7 +1,13 @@
 from __future__ import annotations
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
     verbose_name = "Job Tool"
+
+    def ready(self) -> None:
+        from . import search, signals  # noqa: F401  # registers write hooks
+
+        post_migrate.connect(search.install_sqlite_index, sender=self)
@@ -0,0 +1,179 @@
+"""Moving the entries of closed jobs out of the hot tables, and back.
+
+Archiving an inactive job copies its labor, material and payment rows into
+the ``Archived*`` tables, with each row's rate, markup and amounts frozen
+as they were priced that day, records the job's totals in an
+:class:`~core.models.ArchivedProjectSummary` and deletes the originals.
+The entry tables, their indexes and every query over them then only carry
+jobs that can still change. Totals, ledger refreshes, reports and per-job
+exports of an archived job read the summary and archive tables instead
+(see ``Project.archived_at``).
+
+Each job is archived or restored in one transaction, so a failure leaves
+it untouched. Rows keep their ids both ways; restoring puts them back as
+regular entries, priced again at the job's current rates.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Tuple
+
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from . import report_cache
+from .models import (
+    ArchivedMaterialEntry,
+    ArchivedPayment,
+    ArchivedProjectSummary,
+    ArchivedWorkEntry,
+    MaterialEntry,
+    MonthlyRollup,
+    Payment,
+    Project,
+    ProjectLedger,
+    ProjectTotals,
+    WorkEntry,
+)
+from .signals import projects_changed
+
+DEFAULT_BATCH_SIZE = 2000
+
+
+class ArchiveError(ValueError):
+    """The job can't be archived or restored in its current state."""
+
+
+@dataclass(frozen=True)
+class ArchivedKind:
+    model: type
+    archive: type
+    # Copied as they are in both directions.
+    fields: Tuple[str, ...]
+    # ``with_cost()`` annotations stored on the archived row.
+    frozen: Tuple[str, ...] = ()
+
+    def live(self, project_id: int) -> models.QuerySet:
+        queryset = self.model.objects.filter(project_id=project_id)
+        return queryset.with_cost() if self.frozen else queryset
+
+
+KINDS: Dict[str, ArchivedKind] = {
+    "work": ArchivedKind(
+        WorkEntry,
+        ArchivedWorkEntry,
+        ("id", "project_id", "date", "hours", "asset_id", "notes", "client_uuid", "invoice_id"),
+        ("rate", "cost"),
+    ),
+    "materials": ArchivedKind(
+        MaterialEntry,
+        ArchivedMaterialEntry,
+        (
+            "id",
+            "project_id",
+            "date",
+            "description",
+            "quantity",
+            "unit_cost",
+            "markup_percent",
+            "client_uuid",
+            "invoice_id",
+        ),
+        ("markup", "cost", "sell_price"),
+    ),
+    "payments": ArchivedKind(Payment, ArchivedPayment, ("id", "project_id", "date", "amount", "notes", "client_uuid")),
+}
+
+
+def archive_project(project_id: int, batch_size: int = DEFAULT_BATCH_SIZE) -> ArchivedProjectSummary:
+    """Move an inactive job's entries into the archive tables."""
+    with transaction.atomic():
+        project = Project.objects.select_for_update().get(pk=project_id)
+        if project.active:
+            raise ArchiveError(f"{project} is still active; mark it inactive first.")
+        if project.archived_at:
+            raise ArchiveError(f"{project} is already archived.")
+        totals = ProjectTotals.for_project(project)
+
+        counts, dates = {}, []
+        for name, kind in KINDS.items():
+            counts[name], first, last = _copy_to_archive(kind, project.pk, batch_size)
+            dates += [d for d in (first, last) if d is not None]
+            _delete_live(kind.model, project.pk)
+        summary = ArchivedProjectSummary.objects.create(
+            project=project,
+            labor=totals.labor,
+            materials=totals.materials,
+            payments=totals.payments,
+            balance=totals.balance,
+            work_entries=counts["work"],
+            material_entries=counts["materials"],
+            payment_entries=counts["payments"],
+            first_date=min(dates, default=None),
+            last_date=max(dates, default=None),
+        )
+        MonthlyRollup.objects.filter(project=project).delete()
+        project.archived_at = summary.archived_at
+        Project.objects.filter(pk=project.pk).update(archived_at=project.archived_at)
+        ProjectLedger.rebuild(project, totals)
+        report_cache.bump_project_versions([project.pk])
+    return summary
+
+
+def restore_project(project_id: int, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """Put an archived job's entries back into the entry tables; returns rows restored per log."""
+    with transaction.atomic():
+        project = Project.objects.select_for_update().get(pk=project_id)
+        if not project.archived_at:
+            raise ArchiveError(f"{project} is not archived.")
+        counts = {}
+        for name, kind in KINDS.items():
+            archived = kind.archive.objects.filter(project_id=project.pk)
+            counts[name] = _bulk_insert(
+                kind.model, (kind.model(**row) for row in archived.order_by("pk").values(*kind.fields)), batch_size
+            )
+            archived.delete()
+        ArchivedProjectSummary.objects.filter(pk=project.pk).delete()
+        Project.objects.filter(pk=project.pk).update(archived_at=None)
+        # Refreshes the ledger (and rollups) from the restored rows at today's rates.
+        projects_changed([project.pk])
+    return counts
+
+
+def _copy_to_archive(kind: ArchivedKind, project_id: int, batch_size: int):
+    places = {name: Decimal(10) ** -kind.archive._meta.get_field(name).decimal_places for name in kind.frozen}
+    first = last = None
+
+    def rows():
+        nonlocal first, last
+        source = kind.live(project_id).order_by("pk").values(*kind.fields, *kind.frozen)
+        for row in source.iterator(chunk_size=batch_size):
+            for name, exp in places.items():
+                row[name] = row[name].quantize(exp)
+            first = row["date"] if first is None else min(first, row["date"])
+            last = row["date"] if last is None else max(last, row["date"])
+            yield kind.archive(**row)
+
+    return _bulk_insert(kind.archive, rows(), batch_size), first, last
+
+
+def _bulk_insert(model: type, objects, batch_size: int) -> int:
+    count, batch = 0, []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            count, batch = count + len(batch), []
+    if batch:
+        model.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+def _delete_live(model: type, project_id: int) -> None:
+    # why: QuerySet.delete() fires post_delete per row, refreshing the ledger once per entry
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE project_id = %s", [project_id])
@@ -0,0 +1,192 @@
+"""Resumable, throttled backfills over large tables.
+
+A backfill is a function registered with :func:`backfill` that updates the
+rows of one primary-key range and returns how many it changed. :func:`run`
+walks the model's table in ascending ``pk`` chunks, each in its own short
+transaction, so writers are only ever blocked on one chunk's rows. The
+chunk and its :class:`~core.models.BackfillRun` checkpoint commit together:
+an interrupted run picks up after the last committed chunk, and a failed
+chunk rolls back without moving the checkpoint.
+
+Throttling: the worker sleeps between chunks, and halves the chunk size
+whenever a chunk takes longer than ``MAX_BATCH_SECONDS`` (growing it back
+once chunks are fast again), so a busy database slows the backfill down
+instead of the other way round.
+
+The range is fixed at the first chunk (``max_pk``). Rows written after
+that are kept current by the regular write hooks and need no backfilling.
+Schema changes that go with a backfill belong in :mod:`core.online_schema`.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from . import report_cache
+from .models import (
+    ArchivedMaterialEntry,
+    ArchivedWorkEntry,
+    BackfillRun,
+    Invoice,
+    MaterialEntry,
+    MonthlyRollup,
+    Project,
+    ProjectLedger,
+    ProjectTotals,
+    WorkEntry,
+)
+
+# Pause between chunks, in seconds.
+DEFAULT_SLEEP = 0.1
+# A chunk slower than this halves the next chunk's size.
+MAX_BATCH_SECONDS = 2.0
+MIN_BATCH_SIZE = 10
+
+ApplyFunction = Callable[[models.QuerySet], int]
+
+
+@dataclass(frozen=True)
+class Backfill:
+    name: str
+    model: type
+    apply: ApplyFunction
+    batch_size: int
+
+    @property
+    def description(self) -> str:
+        return (self.apply.__doc__ or "").strip().split("\n")[0]
+
+
+BACKFILLS: Dict[str, Backfill] = {}
+
+
+def backfill(name: str, model: type, batch_size: int = 1000) -> Callable[[ApplyFunction], ApplyFunction]:
+    """Register ``fn(chunk_queryset) -> rows changed`` as backfill ``name`` over ``model``."""
+
+    def register(fn: ApplyFunction) -> ApplyFunction:
+        BACKFILLS[name] = Backfill(name=name, model=model, apply=fn, batch_size=batch_size)
+        return fn
+
+    return register
+
+
+def run(
+    job: Backfill,
+    batch_size: Optional[int] = None,
+    sleep: float = DEFAULT_SLEEP,
+    max_batches: Optional[int] = None,
+    restart: bool = False,
+    on_batch: Optional[Callable[[BackfillRun, int, float], None]] = None,
+) -> BackfillRun:
+    """Run (or resume) ``job`` until it is finished or ``max_batches`` chunks have committed.
+
+    ``on_batch(state, chunk_size, seconds)`` is called after every chunk.
+    """
+    state, _ = BackfillRun.objects.get_or_create(name=job.name)
+    if restart:
+        state.min_pk = state.max_pk = state.last_pk = state.finished_at = None
+        state.rows = state.batches = 0
+        state.started_at = timezone.now()
+        state.save()
+    if state.finished_at:
+        return state
+
+    table = job.model._default_manager.order_by("pk").values_list("pk", flat=True)
+    if state.max_pk is None:
+        # why: pk ranges exclude their lower bound, so start one below the first row
+        first = table.first()
+        state.min_pk = first - 1 if first is not None else None
+        state.max_pk = table.last()
+        state.save(update_fields=["min_pk", "max_pk", "updated_at"])
+
+    wanted = batch_size or job.batch_size
+    size = wanted
+    done = 0
+    while state.max_pk is not None and (state.last_pk is None or state.last_pk < state.max_pk):
+        lower = state.last_pk if state.last_pk is not None else state.min_pk
+        upper = table.filter(pk__gt=lower, pk__lte=state.max_pk)[size - 1 : size].first() or state.max_pk
+        started = time.monotonic()
+        with transaction.atomic():
+            changed = job.apply(job.model._default_manager.filter(pk__gt=lower, pk__lte=upper))
+            state.last_pk = upper
+            state.rows += changed or 0
+            state.batches += 1
+            state.save(update_fields=["last_pk", "rows", "batches", "updated_at"])
+        elapsed = time.monotonic() - started
+        if on_batch:
+            on_batch(state, size, elapsed)
+        done += 1
+        if max_batches and done >= max_batches:
+            return state
+        if elapsed > MAX_BATCH_SECONDS:
+            size = max(MIN_BATCH_SIZE, size // 2)
+        elif elapsed < MAX_BATCH_SECONDS / 4:
+            size = min(wanted, size * 2)
+        time.sleep(sleep)
+
+    state.finished_at = timezone.now()
+    state.save(update_fields=["finished_at", "updated_at"])
+    return state
+
+
+# ---------- backfills ----------
+LEDGER_FIELDS = ["labor", "materials", "payments", "balance", "updated_at"]
+
+
+@backfill("ledger", Project, batch_size=200)
+def ledger(projects: models.QuerySet) -> int:
+    """Write every job's ledger row from live totals (three grouped queries per chunk)."""
+    rows = [
+        ProjectLedger(
+            project_id=pid,
+            labor=totals.labor,
+            materials=totals.materials,
+            payments=totals.payments,
+            balance=totals.balance,
+        )
+        for pid, totals in ProjectTotals.for_projects(projects).items()
+    ]
+    ProjectLedger.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=["project"], update_fields=LEDGER_FIELDS
+    )
+    report_cache.bump_project_versions([row.project_id for row in rows])
+    return len(rows)
+
+
+@backfill("monthly_rollups", Project, batch_size=50)
+def monthly_rollups(projects: models.QuerySet) -> int:
+    """Fill the monthly rollups for every job; run before setting JOBTOOL_ROLLUP=1."""
+    project_ids = list(projects.values_list("pk", flat=True))
+    MonthlyRollup.refresh(project_ids)
+    report_cache.bump_project_versions(project_ids)
+    return len(project_ids)
+
+
+def link_invoices(entries: models.QuerySet) -> int:
+    """Point entries billed before per-entry billing at the invoice that covered them."""
+    # Those invoices billed everything after the job's previous period_end, so
+    # an entry belongs to the job's first invoice ending on or after its date.
+    covering = Invoice.objects.filter(
+        project=models.OuterRef("project_id"), period_end__gte=models.OuterRef("date")
+    ).order_by("period_end", "pk")
+    return (
+        entries.filter(invoice__isnull=True)
+        .filter(models.Exists(covering))
+        .update(invoice_id=models.Subquery(covering.values("pk")[:1]))
+    )
+
+
+# Run by migration 0016 before invoicing relies on the links.
+INVOICE_LINKS = {
+    "work_invoices": WorkEntry,
+    "material_invoices": MaterialEntry,
+    "archived_work_invoices": ArchivedWorkEntry,
+    "archived_material_invoices": ArchivedMaterialEntry,
+}
+for _name, _model in INVOICE_LINKS.items():
+    backfill(_name, _model, batch_size=2000)(link_invoices)
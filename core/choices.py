@@ -0,0 +1,88 @@
+"""Cached choice lists for the job and asset dropdowns.
+
+Each list is built with one client-joined query and cached until a project,
+client or asset changes (see the hooks in :mod:`core.signals`), so entry
+forms render their dropdowns without touching the database.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Asset, Project
+
+PROJECTS_KEY = "jobtool:choices:projects"
+ASSETS_KEY = "jobtool:choices:assets"
+
+# (project id, label, client id)
+ProjectChoice = Tuple[int, str, int]
+# (asset id, label)
+AssetChoice = Tuple[int, str]
+
+
+def project_label(client_name: str, project_name: str) -> str:
+    return f"{client_name} — {project_name}"
+
+
+def active_projects() -> List[ProjectChoice]:
+    """Active jobs in picker order, labelled ``Client — Job``."""
+    choices = cache.get(PROJECTS_KEY)
+    if choices is None:
+        rows = (
+            Project.objects.filter(active=True)
+            .order_by("client__name", "name")
+            .values_list("pk", "client__name", "name", "client_id")
+        )
+        choices = [(pk, project_label(client, name), client_id) for pk, client, name, client_id in rows]
+        cache.set(PROJECTS_KEY, choices, timeout=None)
+    return choices
+
+
+def active_assets() -> Dict[str, object]:
+    """Active assets by name, overall and grouped by client id."""
+    data = cache.get(ASSETS_KEY)
+    if data is None:
+        rows = (
+            Asset.objects.filter(active=True)
+            .order_by("name", "pk")
+            .values_list("pk", "name", "client_id", "client__name")
+        )
+        all_assets: List[AssetChoice] = []
+        by_client: Dict[int, List[AssetChoice]] = {}
+        for pk, name, client_id, client_name in rows:
+            # Same label as Asset.__str__
+            choice = (pk, f"{name} — {client_name if client_id else '(no client)'}")
+            all_assets.append(choice)
+            by_client.setdefault(client_id, []).append(choice)
+        data = {"all": all_assets, "by_client": by_client}
+        cache.set(ASSETS_KEY, data, timeout=None)
+    return data
+
+
+def client_for_project(project_id: object) -> Optional[int]:
+    """Client id of an active job from the cached list, without a query."""
+    try:
+        project_id = int(project_id)
+    except (TypeError, ValueError):
+        return None
+    for pk, _label, client_id in active_projects():
+        if pk == project_id:
+            return client_id
+    return None
+
+
+def assets_for_client(client_id: Optional[int]) -> List[AssetChoice]:
+    data = active_assets()
+    if client_id is None:
+        return data["all"]
+    return data["by_client"].get(client_id, [])
+
+
+def invalidate(*keys: str) -> None:
+    keys = keys or (PROJECTS_KEY, ASSETS_KEY)
+    cache.delete_many(keys)
+    # why: drop lists rebuilt from uncommitted rows once the write commits
+    transaction.on_commit(lambda: cache.delete_many(keys))
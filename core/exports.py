@@ -0,0 +1,167 @@
+"""Row builders and writers for CSV/XLSX exports.
+
+Exports read entries through ``.iterator()`` and emit one row at a time, so
+the size of an export is bounded by the file, not by worker memory. Labor
+rows reuse :meth:`WorkEntryQuerySet.with_cost` for rate-override costing.
+A job's own export reads the archive tables once the job is archived.
+"""
+
+from __future__ import annotations
+
+import csv
+import tempfile
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+from django.db.models import QuerySet
+
+from .models import (
+    AMOUNT_PLACES,
+    COST_PLACES,
+    ArchivedMaterialEntry,
+    ArchivedPayment,
+    ArchivedWorkEntry,
+    MaterialEntry,
+    Payment,
+    Project,
+    ProjectTotals,
+    WorkEntry,
+)
+
+try:  # optional: only needed for .xlsx downloads
+    import openpyxl
+except ImportError:  # pragma: no cover - depends on environment
+    openpyxl = None
+
+ITERATOR_CHUNK = 2000
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+Row = Sequence[object]
+
+# Leading characters that make Excel (and other spreadsheets) read a cell as a formula.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class Section:
+    """One exportable log: its queryset, header and row mapping.
+
+    ``archived`` gives the same log's archive table, whose rows carry the
+    attributes ``row`` reads.
+    """
+
+    def __init__(
+        self,
+        header: Sequence[str],
+        queryset: Callable[[], QuerySet],
+        row: Callable[[object], Row],
+        archived: Callable[[], QuerySet],
+    ) -> None:
+        self.header = header
+        self.queryset = queryset
+        self.row = row
+        self.archived = archived
+
+    def for_project(self, project: Project) -> QuerySet:
+        source = self.archived if project.archived_at else self.queryset
+        return source().filter(project=project)
+
+    def rows(self, queryset: QuerySet) -> Iterator[Row]:
+        yield self.header
+        for obj in queryset.order_by("-date", "id").iterator(chunk_size=ITERATOR_CHUNK):
+            yield self.row(obj)
+
+
+SECTIONS: Dict[str, Section] = {
+    "work": Section(
+        ["Date", "Client", "Job", "Asset", "Hours", "Rate", "Cost", "Notes"],
+        lambda: WorkEntry.objects.select_related("project__client", "asset").with_cost(),
+        lambda w: [
+            w.date,
+            w.project.client.name,
+            w.project.name,
+            w.asset.name if w.asset_id else "",
+            w.hours,
+            w.rate.quantize(AMOUNT_PLACES),
+            w.cost.quantize(COST_PLACES),
+            w.notes,
+        ],
+        lambda: ArchivedWorkEntry.objects.select_related("project__client", "asset"),
+    ),
+    "materials": Section(
+        ["Date", "Client", "Job", "Description", "Quantity", "Unit Cost", "Cost", "Markup %", "Sell Price", "Margin"],
+        lambda: MaterialEntry.objects.select_related("project__client").with_cost(),
+        lambda m: [
+            m.date,
+            m.project.client.name,
+            m.project.name,
+            m.description,
+            m.quantity,
+            m.unit_cost,
+            m.cost.quantize(COST_PLACES),
+            m.markup.quantize(AMOUNT_PLACES),
+            m.sell_price.quantize(COST_PLACES),
+            m.margin.quantize(COST_PLACES),
+        ],
+        lambda: ArchivedMaterialEntry.objects.select_related("project__client"),
+    ),
+    "payments": Section(
+        ["Date", "Client", "Job", "Amount", "Notes"],
+        lambda: Payment.objects.select_related("project__client"),
+        lambda p: [p.date, p.project.client.name, p.project.name, p.amount, p.notes],
+        lambda: ArchivedPayment.objects.select_related("project__client"),
+    ),
+}
+
+TOTALS_HEADER = ["Client", "Job", "Labor & Equipment", "Materials", "Payments", "Balance Due"]
+
+
+def totals_rows(project: Project, totals: ProjectTotals) -> Iterator[Row]:
+    yield TOTALS_HEADER
+    yield [project.client.name, project.name, totals.labor, totals.materials, totals.payments, totals.balance]
+
+
+class _Echo:
+    """File-like object whose ``write`` just returns the value written."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def safe_cell(value: object) -> object:
+    """Quote text that a spreadsheet would otherwise evaluate as a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(rows: Iterable[Row]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow([safe_cell(value) for value in row])
+
+
+def xlsx_available() -> bool:
+    return openpyxl is not None
+
+
+def xlsx_chunks(rows: Iterable[Row], title: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Build a workbook with openpyxl's write-only mode and yield its bytes.
+
+    Write-only workbooks spool rows to disk as they are appended, so memory
+    stays flat; the finished file is then read back in ``chunk_size`` pieces.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    for row in rows:
+        sheet.append([safe_cell(value) for value in row])
+    with tempfile.TemporaryFile() as handle:
+        workbook.save(handle)
+        handle.seek(0)
+        yield from iter(lambda: handle.read(chunk_size), b"")
+
+
+def filter_range(queryset: QuerySet, start: Optional[object], end: Optional[object]) -> QuerySet:
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lte=end)
+    return queryset
@@ -1,8 +1,18 @@
 from __future__ import annotations
 
+import codecs
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
 from django import forms
+from django.db import models, transaction
+from django.forms.models import ModelChoiceIterator
+from django.utils import timezone
+from django.utils.functional import cached_property
 
+from . import choices, importers
 from .models import Asset, Client, MaterialEntry, Payment, Project, WorkEntry
+from .signals import COMPONENT_BY_MODEL, projects_changed
 
 
 DATE_FMT = "%m/%d/%Y"  # US format
@@ -17,19 +27,192 @@ class USDateInput(forms.DateInput):
         self.attrs.update({"placeholder": DATE_FMT, "autocomplete": "off"})
 
 
+class CachedProjectChoiceIterator(ModelChoiceIterator):
+    """Yields job options from :mod:`core.choices` instead of querying."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for pk, label, _client_id in choices.active_projects():
+            yield (pk, label)
+
+    def __len__(self) -> int:
+        return len(choices.active_projects()) + (self.field.empty_label is not None)
+
+    def __bool__(self) -> bool:
+        return self.field.empty_label is not None or bool(choices.active_projects())
+
+
 class ProjectChoiceField(forms.ModelChoiceField):
+    """Active-job picker whose options come from the cached choice list.
+
+    The queryset is still used to validate submitted values.
+    """
+
+    iterator = CachedProjectChoiceIterator
+
+    def __init__(self, queryset=None, **kwargs):
+        if queryset is None:
+            queryset = Project.objects.filter(active=True).select_related("client")
+        super().__init__(queryset=queryset, **kwargs)
+
     def label_from_instance(self, obj: Project) -> str:
-        return f"{obj.client.name} — {obj.name}"
+        return choices.project_label(obj.client.name, obj.name)
 
 
 class ProjectPickerForm(forms.Form):
     """Simple form used on the dashboard to select a project."""
 
-    project = ProjectChoiceField(queryset=Project.objects.filter(active=True))
+    project = ProjectChoiceField()
+
+
+class PortfolioFilterForm(forms.Form):
+    """Filters for the dashboard's portfolio of active jobs."""
+
+    SORT_CHOICES = [
+        ("-balance", "Balance due (high to low)"),
+        ("balance", "Balance due (low to high)"),
+        ("name", "Client / job name"),
+    ]
+
+    client = forms.ModelChoiceField(
+        queryset=Client.objects.filter(active=True), required=False, empty_label="All clients"
+    )
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False)
+
+
+class ExportForm(forms.Form):
+    """Options for CSV/XLSX exports of a job or of every job in a date range."""
+
+    SECTION_CHOICES = [
+        ("work", "Labor & Equipment"),
+        ("materials", "Materials"),
+        ("payments", "Payments"),
+        ("totals", "Totals"),
+    ]
+    FORMAT_CHOICES = [("csv", "CSV"), ("xlsx", "Excel (.xlsx)")]
+
+    section = forms.ChoiceField(choices=SECTION_CHOICES)
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False)
+    start = forms.DateField(required=False, widget=USDateInput(), input_formats=[DATE_FMT, "%Y-%m-%d"])
+    end = forms.DateField(required=False, widget=USDateInput(), input_formats=[DATE_FMT, "%Y-%m-%d"])
+
+    def clean(self):
+        cleaned = super().clean()
+        start, end = cleaned.get("start"), cleaned.get("end")
+        if start and end and start > end:
+            raise forms.ValidationError("Start date must be on or before end date.")
+        cleaned["format"] = cleaned.get("format") or "csv"
+        return cleaned
+
+
+class BackgroundExportForm(ExportForm):
+    """An export run by a background task; limited to one job when ``project`` is set."""
+
+    project = ProjectChoiceField(required=False, empty_label="All jobs")
+
+    def clean(self):
+        cleaned = super().clean()
+        if cleaned.get("section") == "totals" and not cleaned.get("project"):
+            raise forms.ValidationError("Totals can only be exported for a single job.")
+        return cleaned
+
+    def task_params(self) -> Dict[str, object]:
+        data = self.cleaned_data
+        return {
+            "section": data["section"],
+            "format": data["format"],
+            "start": data["start"].isoformat() if data["start"] else None,
+            "end": data["end"].isoformat() if data["end"] else None,
+            "project": data["project"].pk if data["project"] else None,
+        }
+
+
+class ReportPeriodForm(forms.Form):
+    """Optional date range for a job report; blank bounds are open."""
+
+    start = forms.DateField(required=False, widget=USDateInput(), input_formats=[DATE_FMT, "%Y-%m-%d"])
+    end = forms.DateField(required=False, widget=USDateInput(), input_formats=[DATE_FMT, "%Y-%m-%d"])
+
+    def clean(self):
+        cleaned = super().clean()
+        start, end = cleaned.get("start"), cleaned.get("end")
+        if start and end and start > end:
+            raise forms.ValidationError("Start date must be on or before end date.")
+        return cleaned
+
+    def period(self):
+        """``(start, end)`` when valid, otherwise the whole job."""
+        if not self.is_valid():
+            return None, None
+        return self.cleaned_data["start"], self.cleaned_data["end"]
+
+
+class ReceivablesForm(forms.Form):
+    """Filters for the receivables report; blank dates cover the last year."""
+
+    GRANULARITY_CHOICES = [("month", "Monthly"), ("week", "Weekly")]
+
+    client = forms.ModelChoiceField(
+        queryset=Client.objects.filter(active=True), required=False, empty_label="All clients"
+    )
+    granularity = forms.ChoiceField(choices=GRANULARITY_CHOICES, required=False)
+    start = forms.DateField(required=False, widget=USDateInput(), input_formats=[DATE_FMT, "%Y-%m-%d"])
+    end = forms.DateField(required=False, widget=USDateInput(), input_formats=[DATE_FMT, "%Y-%m-%d"])
+    as_of = forms.DateField(
+        required=False, label="Aged as of", widget=USDateInput(), input_formats=[DATE_FMT, "%Y-%m-%d"]
+    )
+
+    def clean(self):
+        cleaned = super().clean()
+        today = timezone.localdate()
+        cleaned["as_of"] = cleaned.get("as_of") or today
+        cleaned["end"] = cleaned.get("end") or cleaned["as_of"]
+        cleaned["start"] = cleaned.get("start") or (cleaned["end"] - timedelta(days=365)).replace(day=1)
+        if cleaned["start"] > cleaned["end"]:
+            raise forms.ValidationError("Start date must be on or before end date.")
+        cleaned["granularity"] = cleaned.get("granularity") or "month"
+        return cleaned
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(
+        label="Search", max_length=200, required=False,
+        widget=forms.TextInput(attrs={"placeholder": "Clients, jobs, assets, notes…", "autofocus": True}),
+    )
+
+
+class ImportForm(forms.Form):
+    """CSV upload for bulk-importing entries."""
+
+    KIND_CHOICES = [
+        ("work", "Labor & Equipment (client, project, date, hours, asset, notes)"),
+        ("materials", "Materials (client, project, date, description, quantity, unit_cost, markup_percent)"),
+        ("payments", "Payments (client, project, date, amount, notes)"),
+    ]
+
+    kind = forms.ChoiceField(choices=KIND_CHOICES)
+    file = forms.FileField(label="CSV file")
+    allow_partial = forms.BooleanField(
+        required=False, label="Import valid rows even if some rows have errors"
+    )
+
+    def clean_file(self):
+        # why: the import reads the file as UTF-8; an Excel/cp1252 export would fail halfway through
+        upload = self.cleaned_data["file"]
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        try:
+            for chunk in upload.chunks():
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            raise forms.ValidationError(importers.NOT_UTF8)
+        upload.seek(0)
+        return upload
 
 
 class WorkEntryForm(forms.ModelForm):
-    project = ProjectChoiceField(queryset=Project.objects.filter(active=True))
+    project = ProjectChoiceField()
 
     class Meta:
         model = WorkEntry
@@ -39,36 +222,156 @@ class WorkEntryForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields["asset"].queryset = Asset.objects.filter(active=True)
         # Filter assets by selected project's client
-        proj = None
+        client_id = None
         if self.data.get("project"):
-            try:
-                proj = Project.objects.select_related("client").get(pk=self.data.get("project"))
-            except Project.DoesNotExist:
-                proj = None
+            client_id = choices.client_for_project(self.data.get("project"))
         elif self.instance and self.instance.pk:
-            proj = self.instance.project
+            client_id = choices.client_for_project(self.instance.project_id)
+            if client_id is None:  # why: inactive jobs are not in the cached list
+                client_id = Project.objects.values_list("client_id", flat=True).get(pk=self.instance.project_id)
         elif self.initial.get("project"):
-            try:
-                proj = Project.objects.select_related("client").get(pk=self.initial.get("project"))
-            except Project.DoesNotExist:
-                proj = None
-        if proj:
-            self.fields["asset"].queryset = Asset.objects.filter(client=proj.client, active=True)
+            client_id = choices.client_for_project(self.initial.get("project"))
+
+        field = self.fields["asset"]
+        if client_id is None:
+            field.queryset = Asset.objects.filter(active=True)
+        else:
+            field.queryset = Asset.objects.filter(client_id=client_id, active=True)
+        field.choices = [("", field.empty_label)] + choices.assets_for_client(client_id)
 
 
 class MaterialEntryForm(forms.ModelForm):
-    project = ProjectChoiceField(queryset=Project.objects.filter(active=True))
+    project = ProjectChoiceField()
 
     class Meta:
         model = MaterialEntry
-        fields = ["project", "date", "description", "quantity", "unit_cost"]
+        fields = ["project", "date", "description", "quantity", "unit_cost", "markup_percent"]
         widgets = {"date": USDateInput()}
+        help_texts = {"markup_percent": "Leave blank to use the job’s default markup."}
+
+
+class TimesheetForm(forms.Form):
+    """The job and day a timesheet grid logs entries for."""
+
+    project = ProjectChoiceField()
+    date = forms.DateField(widget=USDateInput(), input_formats=[DATE_FMT, "%Y-%m-%d"], initial=timezone.localdate)
+
+
+class PrefetchedChoiceField(forms.ModelChoiceField):
+    """Model choice validated against objects loaded once for a whole formset, not one query per row."""
+
+    def __init__(self, objects: Dict[int, models.Model], **kwargs):
+        self.objects = objects
+        super().__init__(**kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.objects[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise forms.ValidationError(self.error_messages["invalid_choice"], code="invalid_choice")
+
+
+class WorkRowForm(forms.ModelForm):
+    """One asset/worker line of a labor timesheet."""
+
+    class Meta:
+        model = WorkEntry
+        fields = ["asset", "hours", "notes"]
+        widgets = {"notes": forms.TextInput()}
+        labels = {"asset": "Asset"}
+
+    def __init__(self, *args, client_id: Optional[int] = None, assets: Optional[Dict[int, Asset]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # why: every row shares the client's asset list, loaded once by the formset
+        field = PrefetchedChoiceField(assets or {}, queryset=Asset.objects.none(), required=False, label="Asset")
+        field.choices = [("", field.empty_label)] + choices.assets_for_client(client_id)
+        self.fields["asset"] = field
+
+    def _get_validation_exclusions(self):
+        # why: the asset was already checked against the prefetched map; skip the per-row existence query
+        return super()._get_validation_exclusions() | {"asset"}
+
+
+class MaterialRowForm(forms.ModelForm):
+    """One line of a materials timesheet."""
+
+    class Meta:
+        model = MaterialEntry
+        fields = ["description", "quantity", "unit_cost", "markup_percent"]
+
+
+class BaseTimesheetFormSet(forms.BaseFormSet):
+    """Rows of a one-job, one-day timesheet, validated together and saved in one statement.
+
+    Blank rows are ignored. :meth:`save` writes every filled row with a
+    single ``bulk_create`` and refreshes the job's totals once, in one
+    transaction, instead of a save (and totals refresh) per entry.
+    """
+
+    model: type = models.Model
+
+    def __init__(self, *args, project: Optional[Project] = None, **kwargs):
+        self.project = project
+        super().__init__(*args, **kwargs)
+
+    def filled_forms(self) -> List[forms.ModelForm]:
+        return [form for form in self.forms if form.has_changed()]
+
+    def clean(self):
+        if not any(form.errors for form in self.forms) and not self.filled_forms():
+            raise forms.ValidationError("Fill in at least one row.")
+
+    def save(self, day: date) -> List[models.Model]:
+        entries = []
+        for form in self.filled_forms():
+            entry = form.save(commit=False)
+            entry.project = self.project
+            entry.date = day
+            entries.append(entry)
+        with transaction.atomic():
+            self.model.objects.bulk_create(entries)
+            # bulk_create skips model signals; refresh derived totals once.
+            projects_changed([self.project.pk], [COMPONENT_BY_MODEL[self.model]], [day])
+        return entries
+
+
+class WorkTimesheetFormSet(BaseTimesheetFormSet):
+    model = WorkEntry
+
+    def get_form_kwargs(self, index):
+        kwargs = super().get_form_kwargs(index)
+        kwargs["client_id"] = self.project.client_id
+        kwargs["assets"] = self.assets
+        return kwargs
+
+    @cached_property
+    def assets(self) -> Dict[int, Asset]:
+        return Asset.objects.filter(client_id=self.project.client_id, active=True).in_bulk()
+
+
+class MaterialTimesheetFormSet(BaseTimesheetFormSet):
+    model = MaterialEntry
+
+
+TIMESHEET_ROWS = 15
+TIMESHEET_MAX_ROWS = 200
+WorkTimesheet = forms.formset_factory(
+    WorkRowForm, formset=WorkTimesheetFormSet, extra=TIMESHEET_ROWS, max_num=TIMESHEET_MAX_ROWS, validate_max=True
+)
+MaterialTimesheet = forms.formset_factory(
+    MaterialRowForm,
+    formset=MaterialTimesheetFormSet,
+    extra=TIMESHEET_ROWS,
+    max_num=TIMESHEET_MAX_ROWS,
+    validate_max=True,
+)
 
 
 class PaymentForm(forms.ModelForm):
-    project = ProjectChoiceField(queryset=Project.objects.filter(active=True))
+    project = ProjectChoiceField()
 
     class Meta:
         model = Payment
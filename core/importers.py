@@ -0,0 +1,217 @@
+"""Bulk CSV import of work, material and payment entries.
+
+Rows are validated in batches: every job and asset named in a batch is
+resolved with one query each, valid rows are written with ``bulk_create``
+and the whole import runs in one transaction. Invalid rows are reported by
+line number instead of aborting the batch they appear in.
+"""
+
+from __future__ import annotations
+
+import csv
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+
+from .models import Asset, MaterialEntry, Payment, Project, WorkEntry
+from .signals import COMPONENT_BY_MODEL, projects_changed
+
+BATCH_SIZE = 1000
+DATE_FORMATS = ("%m/%d/%Y", "%Y-%m-%d")
+# Files are read as UTF-8; shown when one is not (typically an Excel "CSV" in cp1252).
+NOT_UTF8 = "The file is not UTF-8 text. In Excel, save it as “CSV UTF-8 (Comma delimited)”."
+
+
+@dataclass
+class ImportKind:
+    model: type
+    columns: Tuple[str, ...]
+    required: Tuple[str, ...]
+    decimals: Tuple[str, ...]
+    uses_assets: bool = False
+
+
+KINDS: Dict[str, ImportKind] = {
+    "work": ImportKind(
+        WorkEntry,
+        columns=("client", "project", "date", "hours", "asset", "notes"),
+        required=("client", "project", "date", "hours"),
+        decimals=("hours",),
+        uses_assets=True,
+    ),
+    "materials": ImportKind(
+        MaterialEntry,
+        columns=("client", "project", "date", "description", "quantity", "unit_cost", "markup_percent"),
+        required=("client", "project", "date", "description"),
+        decimals=("quantity", "unit_cost", "markup_percent"),
+    ),
+    "payments": ImportKind(
+        Payment,
+        columns=("client", "project", "date", "amount", "notes"),
+        required=("client", "project", "date", "amount"),
+        decimals=("amount",),
+    ),
+}
+
+
+@dataclass
+class RowError:
+    line: int
+    message: str
+
+
+@dataclass
+class ImportResult:
+    kind: str
+    created: int = 0
+    errors: List[RowError] = field(default_factory=list)
+    committed: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def _parse_date(value: str) -> date:
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValidationError(f"Invalid date {value!r}; use MM/DD/YYYY.")
+
+
+def _parse_decimal(name: str, value: str) -> Decimal:
+    try:
+        return Decimal(value.replace(",", "").replace("$", ""))
+    except InvalidOperation:
+        raise ValidationError(f"Invalid number for {name}: {value!r}.")
+
+
+def _batches(rows: Iterable[Tuple[int, Dict[str, str]]], size: int) -> Iterator[List[Tuple[int, Dict[str, str]]]]:
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _lookup_maps(kind: ImportKind, batch: List[Tuple[int, Dict[str, str]]]):
+    """Resolve every job (and asset) named in ``batch`` with one query each."""
+    client_names = {row.get("client", "") for _, row in batch}
+    project_names = {row.get("project", "") for _, row in batch}
+    projects = {
+        (p.client.name, p.name): p
+        for p in Project.objects.select_related("client").filter(
+            client__name__in=client_names, name__in=project_names
+        )
+    }
+    assets: Dict[Tuple[int, str], Asset] = {}
+    if kind.uses_assets:
+        asset_names = {row.get("asset", "") for _, row in batch} - {""}
+        if asset_names:
+            assets = {
+                (a.client_id, a.name): a
+                for a in Asset.objects.filter(
+                    client_id__in={p.client_id for p in projects.values()}, name__in=asset_names
+                )
+            }
+    return projects, assets
+
+
+def _build(kind: ImportKind, row: Dict[str, str], projects, assets) -> models.Model:
+    missing = [name for name in kind.required if not row.get(name)]
+    if missing:
+        raise ValidationError(f"Missing {', '.join(missing)}.")
+
+    project = projects.get((row["client"], row["project"]))
+    if project is None:
+        raise ValidationError(f"Unknown job {row['project']!r} for client {row['client']!r}.")
+
+    values: Dict[str, object] = {"project": project, "date": _parse_date(row["date"])}
+    for name in kind.decimals:
+        if row.get(name):
+            values[name] = _parse_decimal(name, row[name])
+    for name in ("notes", "description"):
+        if name in kind.columns and row.get(name):
+            values[name] = row[name]
+    if kind.uses_assets and row.get("asset"):
+        asset = assets.get((project.client_id, row["asset"]))
+        if asset is None:
+            raise ValidationError(f"Unknown asset {row['asset']!r} for client {project.client.name!r}.")
+        values["asset"] = asset
+
+    obj = kind.model(**values)
+    obj.clean_fields(exclude=["project", "asset"])  # FKs were resolved above
+    obj.clean()  # rejects archived jobs
+    return obj
+
+
+def _error_text(exc: ValidationError) -> str:
+    if hasattr(exc, "error_dict"):
+        return " ".join(f"{name}: {' '.join(msgs)}" for name, msgs in exc.message_dict.items())
+    return " ".join(exc.messages)
+
+
+def read_csv(handle: Iterable[str]) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Yield ``(line_number, row)`` with normalized headers and stripped values."""
+    reader = csv.DictReader(handle)
+    reader.fieldnames = [(name or "").strip().lower().replace(" ", "_") for name in reader.fieldnames or []]
+    for row in reader:
+        yield reader.line_num, {k: (v or "").strip() for k, v in row.items() if k}
+
+
+def import_rows(
+    kind_name: str,
+    rows: Iterable[Tuple[int, Dict[str, str]]],
+    *,
+    allow_partial: bool = False,
+    batch_size: int = BATCH_SIZE,
+    dry_run: bool = False,
+) -> ImportResult:
+    """Validate and insert ``rows`` of ``kind_name`` entries.
+
+    Nothing is written if any row fails, unless ``allow_partial`` is set, in
+    which case the valid rows are kept and the failures reported.
+    """
+    kind = KINDS[kind_name]
+    result = ImportResult(kind=kind_name)
+    touched = set()
+    dates = set()
+
+    with transaction.atomic():
+        for batch in _batches(rows, batch_size):
+            projects, assets = _lookup_maps(kind, batch)
+            valid = []
+            for line, row in batch:
+                try:
+                    valid.append(_build(kind, row, projects, assets))
+                except ValidationError as exc:
+                    result.errors.append(RowError(line, _error_text(exc)))
+            # why: once the import is doomed to roll back, keep validating but stop writing
+            if not dry_run and (allow_partial or not result.errors):
+                kind.model.objects.bulk_create(valid, batch_size=batch_size)
+            result.created += len(valid)
+            touched.update(obj.project_id for obj in valid)
+            dates.update(obj.date for obj in valid)
+
+        if dry_run or (result.errors and not allow_partial):
+            transaction.set_rollback(True)
+            return result
+
+        # bulk_create skips model signals; refresh derived totals once.
+        projects_changed(touched, [COMPONENT_BY_MODEL[kind.model]], dates)
+        result.committed = True
+    return result
+
+
+def import_csv(kind_name: str, handle: Iterable[str], **options) -> ImportResult:
+    return import_rows(kind_name, read_csv(handle), **options)
+
+
+def describe(result: ImportResult, limit: Optional[int] = None) -> List[str]:
+    errors = result.errors if limit is None else result.errors[:limit]
+    return [f"Line {e.line}: {e.message}" for e in errors]
@@ -0,0 +1,200 @@
+"""Batch generation of invoice snapshots.
+
+:func:`generate_invoices` bills every selected job for its unbilled entries
+dated up to a cut-off day, in one pass. Each entry records the invoice
+that billed it, so an entry back-dated into an already invoiced period is
+still picked up by the next run. One UPDATE per entry table claims the
+rows of all jobs at once, a grouped query per table turns them into lines,
+running totals come from :meth:`ProjectTotals.for_projects`, and invoices
+and lines are written in bulk. Labor is grouped per asset at its effective rate and
+materials per description and unit cost, which keeps the stored lines
+compact however many entries they cover.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from .exports import Row
+from .models import (
+    AMOUNT_PLACES,
+    Invoice,
+    InvoiceLine,
+    MaterialEntry,
+    Project,
+    ProjectTotals,
+    WorkEntry,
+)
+
+LINE_BATCH_SIZE = 1000
+ZERO = Decimal("0.00")
+
+
+def generate_invoices(
+    projects: models.QuerySet, through: date, issued_on: Optional[date] = None
+) -> List[Invoice]:
+    """Create one invoice per job in ``projects`` with unbilled entries dated up to ``through``.
+
+    Jobs with nothing new to bill are skipped. The selected projects are
+    locked for the duration so two runs cannot bill the same entries, and
+    the entries are claimed (their ``invoice`` set) before the lines are
+    read from them, so an entry saved meanwhile is either on this invoice
+    or left for the next one.
+    """
+    issued_on = issued_on or timezone.localdate()
+    with transaction.atomic():
+        locked = list(
+            Project.objects.select_for_update(of=("self",))
+            .filter(pk__in=projects.order_by().values("pk"))
+            .select_related("client")
+            .order_by("pk")
+        )
+        selected = [project.pk for project in locked]
+        billable = set()
+        for model in (WorkEntry, MaterialEntry):
+            billable.update(_unbilled(model.objects.all(), selected, through).values_list("project_id", flat=True))
+        if not billable:
+            return []
+
+        previous = dict(
+            Invoice.objects.filter(project_id__in=billable)
+            .values("project_id")
+            .annotate(last=models.Max("period_end"))
+            .values_list("project_id", "last")
+        )
+        invoices = [
+            Invoice(
+                project=project,
+                client_name=project.client.name,
+                project_name=project.name,
+                issued_on=issued_on,
+                period_end=through,
+            )
+            for project in locked
+            if project.pk in billable
+        ]
+        Invoice.objects.bulk_create(invoices)
+        by_project = {invoice.project_id: invoice for invoice in invoices}
+
+        new_invoice = Invoice.objects.filter(
+            pk__in=[invoice.pk for invoice in invoices], project_id=models.OuterRef("project_id")
+        )
+        for model in (WorkEntry, MaterialEntry):
+            _unbilled(model.objects.all(), list(by_project), through).update(
+                invoice_id=models.Subquery(new_invoice.values("pk")[:1])
+            )
+        lines = _claimed_lines(list(by_project), [invoice.pk for invoice in invoices])
+
+        running = ProjectTotals.for_projects(Project.objects.filter(pk__in=list(by_project)), as_of=through)
+        issued, pending = [], []
+        for project_id, invoice in by_project.items():
+            own = lines.get(invoice.pk)
+            if not own:
+                # Its entries were deleted before they could be claimed.
+                invoice.delete()
+                continue
+            invoice.labor = sum((line.amount for line in own if line.kind == InvoiceLine.LABOR), ZERO)
+            invoice.materials = sum((line.amount for line in own if line.kind == InvoiceLine.MATERIAL), ZERO)
+            invoice.total = invoice.labor + invoice.materials
+            invoice.payments_to_date = running[project_id].payments.quantize(AMOUNT_PLACES)
+            invoice.balance_due = running[project_id].balance.quantize(AMOUNT_PLACES)
+            last = previous.get(project_id)
+            # why: a back-dated entry can fall before the previous period_end
+            invoice.period_start = min(last + timedelta(days=1), *(line.first_date for line in own)) if last else None
+            for line in own:
+                line.invoice = invoice
+                pending.append(line)
+            issued.append(invoice)
+        Invoice.objects.bulk_update(
+            issued, ["period_start", "labor", "materials", "total", "payments_to_date", "balance_due"]
+        )
+        InvoiceLine.objects.bulk_create(pending, batch_size=LINE_BATCH_SIZE)
+    return issued
+
+
+def _unbilled(queryset: models.QuerySet, project_ids: List[int], through: date) -> models.QuerySet:
+    return queryset.filter(project_id__in=project_ids, invoice__isnull=True, date__lte=through).order_by()
+
+
+def _claimed_lines(project_ids: List[int], invoice_ids: List[int]) -> Dict[int, List[InvoiceLine]]:
+    """The entries just claimed by ``invoice_ids`` grouped into invoice lines, keyed by invoice id."""
+
+    def claimed(queryset: models.QuerySet) -> models.QuerySet:
+        # project_id__in keeps the lookup on the (project, date) index
+        return queryset.filter(project_id__in=project_ids, invoice_id__in=invoice_ids).order_by()
+
+    span = {"first": models.Min("date"), "last": models.Max("date")}
+    labor = (
+        claimed(WorkEntry.objects.with_cost())
+        .values("invoice_id", "asset__name", "rate")
+        .annotate(quantity=models.Sum("hours"), amount=models.Sum("cost"), **span)
+        .order_by("invoice_id", "asset__name", "rate")
+    )
+    # Materials are billed at sell price, so the markup is part of the line.
+    materials = (
+        claimed(MaterialEntry.objects.with_cost())
+        .values("invoice_id", "description", "unit_cost", "markup")
+        .annotate(quantity=models.Sum("quantity"), amount=models.Sum("sell_price"), **span)
+        .order_by("invoice_id", "description", "unit_cost", "markup")
+    )
+
+    lines: Dict[int, List[InvoiceLine]] = {}
+    for row in labor:
+        lines.setdefault(row["invoice_id"], []).append(
+            _line(InvoiceLine.LABOR, row["asset__name"] or "Labor", row["rate"], row)
+        )
+    for row in materials:
+        lines.setdefault(row["invoice_id"], []).append(
+            _line(InvoiceLine.MATERIAL, row["description"], _unit_price(row["unit_cost"], row["markup"]), row)
+        )
+    return lines
+
+
+def _unit_price(unit_cost: Optional[Decimal], markup: Optional[Decimal]) -> Decimal:
+    unit_cost = unit_cost or ZERO
+    return unit_cost + unit_cost * (markup or ZERO) / 100
+
+
+def _line(kind: str, description: str, rate, row: Dict[str, object]) -> InvoiceLine:
+    return InvoiceLine(
+        kind=kind,
+        description=description,
+        first_date=row["first"],
+        last_date=row["last"],
+        quantity=(row["quantity"] or ZERO).quantize(AMOUNT_PLACES),
+        rate=(rate or ZERO).quantize(AMOUNT_PLACES),
+        amount=(row["amount"] or ZERO).quantize(AMOUNT_PLACES),
+    )
+
+
+INVOICE_HEADER = ["Type", "Description", "From", "To", "Quantity", "Rate", "Amount"]
+
+
+def invoice_rows(invoice: Invoice, lines: List[InvoiceLine]) -> Iterator[Row]:
+    """CSV/XLSX rows for an issued invoice."""
+    yield ["Invoice", invoice.number, "Issued", invoice.issued_on]
+    yield ["Client", invoice.client_name, "Job", invoice.project_name]
+    yield ["Period", invoice.period_start or "", "through", invoice.period_end]
+    yield []
+    yield INVOICE_HEADER
+    for line in lines:
+        yield [
+            line.get_kind_display(),
+            line.description,
+            line.first_date,
+            line.last_date,
+            line.quantity,
+            line.rate,
+            line.amount,
+        ]
+    yield []
+    yield ["Labor & Equipment", "", "", "", "", "", invoice.labor]
+    yield ["Materials", "", "", "", "", "", invoice.materials]
+    yield ["Invoice Total", "", "", "", "", "", invoice.total]
+    yield ["Payments to Date", "", "", "", "", "", invoice.payments_to_date]
+    yield ["Balance Due", "", "", "", "", "", invoice.balance_due]
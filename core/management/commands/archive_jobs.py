@@ -0,0 +1,70 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef
+
+from core import archive
+from core.models import MaterialEntry, Payment, Project, WorkEntry
+
+
+class Command(BaseCommand):
+    """Archive the entries of closed jobs, or restore them (see core/archive.py).
+
+    Without ``--project`` every inactive, unarchived job is archived,
+    optionally only those whose last entry is older than ``--before``.
+    """
+
+    help = "Move inactive jobs' entries into the archive tables (or back with --restore)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, action="append", help="Job id; repeat for several.")
+        parser.add_argument(
+            "--before", type=date.fromisoformat, help="Only jobs with no entries on or after this date (YYYY-MM-DD)."
+        )
+        parser.add_argument("--restore", action="store_true", help="Restore the given archived jobs instead.")
+        parser.add_argument("--dry-run", action="store_true", help="List the jobs without changing anything.")
+        parser.add_argument(
+            "--batch-size", type=int, default=archive.DEFAULT_BATCH_SIZE, help="Rows copied per insert."
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        if options["restore"]:
+            if not options["project"]:
+                raise CommandError("--restore needs at least one --project.")
+            projects = Project.objects.filter(pk__in=options["project"], archived_at__isnull=False)
+        elif options["project"]:
+            projects = Project.objects.filter(pk__in=options["project"])
+        else:
+            projects = Project.objects.filter(active=False, archived_at__isnull=True)
+            if options["before"]:
+                for model in (WorkEntry, MaterialEntry, Payment):
+                    recent = model.objects.filter(project=OuterRef("pk"), date__gte=options["before"])
+                    projects = projects.exclude(Exists(recent))
+
+        projects = projects.select_related("client").order_by("pk")
+        done = 0
+        for project in projects:
+            if options["dry_run"]:
+                action = "restore" if options["restore"] else "archive"
+                self.stdout.write(f"Would {action} #{project.pk} {project}")
+                continue
+            try:
+                if options["restore"]:
+                    counts = archive.restore_project(project.pk, batch_size=options["batch_size"])
+                    moved = ", ".join(f"{count:,} {name}" for name, count in counts.items())
+                    self.stdout.write(f"Restored #{project.pk} {project}: {moved}")
+                else:
+                    summary = archive.archive_project(project.pk, batch_size=options["batch_size"])
+                    self.stdout.write(
+                        f"Archived #{project.pk} {project}: {summary.work_entries:,} labor, "
+                        f"{summary.material_entries:,} material and {summary.payment_entries:,} payment rows"
+                    )
+            except archive.ArchiveError as exc:
+                self.stderr.write(self.style.WARNING(str(exc)))
+                continue
+            done += 1
+        if not options["dry_run"]:
+            verb = "Restored" if options["restore"] else "Archived"
+            self.stdout.write(self.style.SUCCESS(f"{verb} {done} job(s)."))
@@ -0,0 +1,170 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client as HttpClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import MaterialEntry, Payment, Project, ProjectTotals, WorkEntry
+
+BENCH_USER = "jobtool-benchmark"
+
+
+class Command(BaseCommand):
+    """Time the JobTool hot paths and count their queries.
+
+    Results are JSON so runs can be stored per commit and compared with
+    ``--compare baseline.json``. Views are exercised through Django's test
+    client as a staff user (created on first run with an unusable password).
+    """
+
+    help = "Benchmark totals, report, dashboard, entry forms and admin changelists."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (after one warm-up).")
+        parser.add_argument("--project", type=int, help="Project id for per-job cases (default: largest job).")
+        parser.add_argument("--only", action="append", help="Run only cases whose name contains this text.")
+        parser.add_argument("--output", help="Write JSON results to this file instead of stdout.")
+        parser.add_argument("--compare", help="Baseline JSON file to compare against.")
+        parser.add_argument("--threshold", type=float, default=20.0, help="Regression threshold in percent.")
+
+    def handle(self, *args, **options):
+        project = self._project(options["project"])
+        http = self._http_client()
+
+        cases = {
+            "totals.for_project": lambda: ProjectTotals.for_project(project),
+            "totals.for_projects": lambda: ProjectTotals.for_projects(Project.objects.filter(active=True)),
+            "view.report": self._get(http, reverse("core:report", args=[project.pk])),
+            "view.dashboard": self._get(http, reverse("core:dashboard")),
+            "form.work_entry": self._get(http, reverse("core:work_new") + f"?project={project.pk}"),
+            "form.material_entry": self._get(http, reverse("core:material_new")),
+            "form.payment": self._get(http, reverse("core:payment_new")),
+        }
+        for model in ("workentry", "materialentry", "payment", "project", "asset", "rateoverride"):
+            cases[f"admin.{model}_changelist"] = self._get(http, reverse(f"admin:core_{model}_changelist"))
+        if options["only"]:
+            cases = {k: v for k, v in cases.items() if any(part in k for part in options["only"])}
+
+        results = {name: self._measure(fn, options["repeat"]) for name, fn in cases.items()}
+        payload = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "commit": self._commit(),
+                "vendor": connection.vendor,
+                "python": platform.python_version(),
+                "project": project.pk,
+                "rows": {
+                    "work": WorkEntry.objects.count(),
+                    "materials": MaterialEntry.objects.count(),
+                    "payments": Payment.objects.count(),
+                    "projects": Project.objects.count(),
+                },
+            },
+            "results": results,
+        }
+
+        text = json.dumps(payload, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                handle.write(text)
+            self.stdout.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(text)
+
+        if options["compare"]:
+            self._compare(results, options["compare"], options["threshold"])
+
+    def _measure(self, fn, repeat):
+        fn()  # warm-up: template and URL caches, connection setup
+        timings = []
+        queries = 0
+        for _ in range(max(repeat, 1)):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                fn()
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = len(ctx.captured_queries)
+        return {
+            "median_ms": round(statistics.median(timings), 3),
+            "min_ms": round(min(timings), 3),
+            "max_ms": round(max(timings), 3),
+            "queries": queries,
+        }
+
+    def _get(self, http, url):
+        def run():
+            response = http.get(url)
+            if response.status_code != 200:
+                raise CommandError(f"GET {url} returned {response.status_code}")
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+        return run
+
+    def _http_client(self):
+        User = get_user_model()
+        user, created = User.objects.get_or_create(
+            username=BENCH_USER, defaults={"is_staff": True, "is_superuser": True}
+        )
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=["password"])
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else "localhost"
+        http = HttpClient(HTTP_HOST=host)
+        http.force_login(user)
+        return http
+
+    def _project(self, project_id):
+        if project_id:
+            try:
+                return Project.objects.get(pk=project_id)
+            except Project.DoesNotExist:
+                raise CommandError(f"Project {project_id} does not exist.")
+        project = Project.objects.annotate(n=Count("work")).order_by("-n").first()
+        if project is None:
+            raise CommandError("No projects found; run generate_synthetic_data first.")
+        return project
+
+    def _commit(self):
+        try:
+            out = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return out.stdout.strip()
+
+    def _compare(self, results, path, threshold):
+        with open(path) as handle:
+            baseline = json.load(handle)["results"]
+        regressions = 0
+        for name, current in results.items():
+            before = baseline.get(name)
+            if not before:
+                continue
+            change = (current["median_ms"] - before["median_ms"]) / before["median_ms"] * 100 if before["median_ms"] else 0.0
+            line = (
+                f"{name}: {before['median_ms']} → {current['median_ms']} ms ({change:+.1f}%), "
+                f"queries {before['queries']} → {current['queries']}"
+            )
+            if change > threshold or current["queries"] > before["queries"]:
+                regressions += 1
+                self.stderr.write(self.style.ERROR(line))
+            else:
+                self.stderr.write(line)
+        if regressions:
+            raise CommandError(f"{regressions} case(s) regressed against {path}.")
@@ -0,0 +1,81 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Sum
+
+from core.models import Asset, MaterialEntry, Payment, Project, RateOverride, WorkEntry
+
+
+class Command(BaseCommand):
+    """Print query plans and timings for the report, portfolio and admin queries.
+
+    Run it before and after ``migrate core 0004`` (or any index change) on a
+    realistically sized database to compare plans.
+    """
+
+    help = "EXPLAIN the hot-path queries against the current database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, help="Project id to use (default: the one with most work entries).")
+        parser.add_argument("--analyze", action="store_true", help="Use EXPLAIN ANALYZE where supported (Postgres).")
+        parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON.")
+
+    def handle(self, *args, **options):
+        project = self._project(options["project"])
+        cursor_row = WorkEntry.objects.filter(project=project).order_by("-date", "id")[100:101].first()
+
+        queries = {
+            "report_work_page": WorkEntry.objects.filter(project=project).with_cost().order_by("-date", "id")[:201],
+            "report_materials_page": MaterialEntry.objects.filter(project=project).order_by("-date", "id")[:201],
+            "report_payments_page": Payment.objects.filter(project=project).order_by("-date", "id")[:201],
+            "labor_total": (
+                WorkEntry.objects.filter(project=project).with_cost().order_by()
+                .values("project_id").annotate(total=Sum("cost"))
+            ),
+            "payments_total": (
+                Payment.objects.filter(project=project).order_by()
+                .values("project_id").annotate(total=Sum("amount"))
+            ),
+            "rate_override_lookup": RateOverride.objects.filter(project=project, asset_id=1),
+            "active_projects": Project.objects.filter(active=True).select_related("client"),
+            "client_assets": Asset.objects.filter(client_id=project.client_id, active=True),
+            "admin_work_changelist": WorkEntry.objects.select_related("project", "asset").order_by("-date", "id")[:100],
+            "admin_work_by_project": WorkEntry.objects.filter(project=project).order_by("-date", "id")[:100],
+        }
+        if cursor_row is not None:
+            queries["report_work_keyset"] = (
+                WorkEntry.objects.filter(project=project, date__lte=cursor_row.date)
+                .exclude(date=cursor_row.date, pk__lte=cursor_row.pk)
+                .order_by("-date", "id")[:201]
+            )
+
+        explain_options = {"analyze": True} if options["analyze"] and connection.vendor == "postgresql" else {}
+        results = {}
+        for name, queryset in queries.items():
+            plan = queryset.explain(**explain_options)
+            started = time.perf_counter()
+            list(queryset)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            results[name] = {"sql": str(queryset.query), "plan": plan, "ms": round(elapsed_ms, 3)}
+
+        if options["json"]:
+            payload = {"vendor": connection.vendor, "project": project.pk, "queries": results}
+            self.stdout.write(json.dumps(payload, indent=2))
+            return
+        for name, result in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({result['ms']} ms)"))
+            self.stdout.write(result["plan"])
+            self.stdout.write("")
+
+    def _project(self, project_id):
+        if project_id:
+            try:
+                return Project.objects.get(pk=project_id)
+            except Project.DoesNotExist:
+                raise CommandError(f"Project {project_id} does not exist.")
+        project = Project.objects.annotate(n=Count("work")).order_by("-n").first()
+        if project is None:
+            raise CommandError("No projects to explain; load or generate data first.")
+        return project
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
-from django.db import connection
+
+from core import online_schema
 
 
 TABLES = [
@@ -14,30 +15,19 @@ TABLES = [
 
 
 class Command(BaseCommand):
-    """Drop legacy customer_id column from all known tables if present."""
+    """Drop legacy customer_id column from all known tables if present.
+
+    Each table is altered in its own short transaction with a lock timeout
+    (see core/online_schema.py), so a busy table is retried rather than
+    holding up writers to every table while it waits.
+    """
 
     def handle(self, *args, **options):
-        with connection.cursor() as cursor:
-            for table in TABLES:
-                cursor.execute(
-                    """
-                    SELECT 1
-                    FROM information_schema.columns
-                    WHERE table_schema = 'public'
-                      AND table_name = %s
-                      AND column_name = 'customer_id'
-                    """,
-                    [table],
-                )
-                exists = cursor.fetchone() is not None
-                if not exists:
-                    self.stdout.write(self.style.NOTICE(f"{table}.customer_id: not found"))
-                    continue
-
-                self.stdout.write(f"Dropping {table}.customer_id …")
-                cursor.execute(
-                    f"ALTER TABLE {table} DROP COLUMN IF EXISTS customer_id CASCADE;"
-                )
+        for table in TABLES:
+            self.stdout.write(f"Checking {table}.customer_id …")
+            if online_schema.drop_column(table, "customer_id"):
                 self.stdout.write(self.style.SUCCESS(f"Dropped {table}.customer_id"))
+            else:
+                self.stdout.write(self.style.NOTICE(f"{table}.customer_id: not found"))
 
         self.stdout.write(self.style.SUCCESS("Legacy customer_id cleanup complete."))
@@ -0,0 +1,42 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.invoicing import generate_invoices
+from core.models import Project
+
+
+class Command(BaseCommand):
+    """Issue invoices for every active job's unbilled entries in one batched pass."""
+
+    help = "Generate invoice snapshots for unbilled entries dated up to --through (default: today)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--through", help="Last entry date to bill, YYYY-MM-DD (default: today).")
+        parser.add_argument("--issued-on", help="Invoice date, YYYY-MM-DD (default: today).")
+        parser.add_argument("--client", type=int, help="Limit to one client id.")
+        parser.add_argument("--project", type=int, action="append", dest="projects", help="Limit to project id (repeatable).")
+
+    def handle(self, *args, **options):
+        through = self._date(options["through"]) or timezone.localdate()
+        issued_on = self._date(options["issued_on"])
+
+        projects = Project.objects.filter(active=True)
+        if options["client"]:
+            projects = projects.filter(client_id=options["client"])
+        if options["projects"]:
+            projects = projects.filter(pk__in=options["projects"])
+
+        invoices = generate_invoices(projects, through, issued_on)
+        for invoice in invoices:
+            self.stdout.write(f"{invoice.number}: {invoice.client_name} / {invoice.project_name} {invoice.total}")
+        self.stdout.write(self.style.SUCCESS(f"Generated {len(invoices)} invoice(s) through {through:%Y-%m-%d}."))
+
+    def _date(self, value):
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Invalid date {value!r}; use YYYY-MM-DD.")
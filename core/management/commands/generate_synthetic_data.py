@@ -0,0 +1,146 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import choices
+from core.models import (
+    Asset,
+    Client,
+    MaterialEntry,
+    Payment,
+    Project,
+    ProjectLedger,
+    RateOverride,
+    WorkEntry,
+)
+
+MATERIALS = ["Gravel", "Rebar", "Concrete", "Lumber", "Pipe", "Fuel", "Fill", "Asphalt", "Sand", "Wire"]
+ASSETS = ["Excavator", "Loader", "Dozer", "Dump Truck", "Skid Steer", "Crane", "Laborer", "Operator", "Foreman"]
+
+
+class Command(BaseCommand):
+    """Generate realistic synthetic clients, jobs, assets and entries for benchmarking.
+
+    Entries are produced lazily and written with ``bulk_create`` in batches, so
+    multi-million-row datasets never sit in memory at once.
+    """
+
+    help = "Populate the database with synthetic JobTool data at a configurable scale."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=10)
+        parser.add_argument("--assets-per-client", type=int, default=12)
+        parser.add_argument("--projects-per-client", type=int, default=10)
+        parser.add_argument("--work", type=int, default=100_000, help="Total work entries.")
+        parser.add_argument("--materials", type=int, default=40_000, help="Total material entries.")
+        parser.add_argument("--payments", type=int, default=5_000, help="Total payments.")
+        parser.add_argument("--override-ratio", type=float, default=0.3, help="Share of job/asset pairs with a rate override.")
+        parser.add_argument("--years", type=int, default=3, help="Spread entry dates over this many years.")
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--prefix", default="Synthetic", help="Name prefix for generated clients.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        prefix = options["prefix"]
+        if Client.objects.filter(name__startswith=f"{prefix} ").exists():
+            raise CommandError(f"Clients named '{prefix} …' already exist; pass a different --prefix.")
+
+        with transaction.atomic():
+            clients = Client.objects.bulk_create(
+                Client(name=f"{prefix} Client {i:04d}") for i in range(options["clients"])
+            )
+            assets = Asset.objects.bulk_create(
+                Asset(client=client, name=f"{ASSETS[j % len(ASSETS)]} #{j:03d}")
+                for client in clients
+                for j in range(options["assets_per_client"])
+            )
+            # bulk_create skips post_save, so ledger rows are rebuilt below.
+            projects = Project.objects.bulk_create(
+                Project(
+                    client=client,
+                    name=f"Job {j:04d}",
+                    location=f"Site {rng.randint(1, 999)}",
+                    hourly_rate=Decimal(rng.randint(4000, 15000)) / 100,
+                    active=rng.random() < 0.8,
+                )
+                for client in clients
+                for j in range(options["projects_per_client"])
+            )
+            # why: the job and asset pickers are cached with no timeout and bulk_create sends no post_save
+            choices.invalidate()
+        self.stdout.write(f"Created {len(clients)} clients, {len(assets)} assets, {len(projects)} jobs.")
+
+        assets_by_client = {}
+        for asset in assets:
+            assets_by_client.setdefault(asset.client_id, []).append(asset)
+        overrides = [
+            RateOverride(project=p, asset=a, hourly_rate=Decimal(rng.randint(5000, 25000)) / 100)
+            for p in projects
+            for a in assets_by_client.get(p.client_id, [])
+            if rng.random() < options["override_ratio"]
+        ]
+        RateOverride.objects.bulk_create(overrides, batch_size=options["batch_size"])
+        self.stdout.write(f"Created {len(overrides)} rate overrides.")
+
+        start = date.today() - timedelta(days=365 * options["years"])
+        span = 365 * options["years"]
+
+        def when():
+            return start + timedelta(days=rng.randint(0, span))
+
+        def work():
+            for _ in range(options["work"]):
+                project = rng.choice(projects)
+                client_assets = assets_by_client.get(project.client_id) or [None]
+                yield WorkEntry(
+                    project=project,
+                    date=when(),
+                    hours=Decimal(rng.randint(25, 1200)) / 100,
+                    asset=rng.choice(client_assets) if rng.random() < 0.9 else None,
+                    notes=rng.choice(["", "", "Overtime", "Rain delay", "Site prep", "Hauling"]),
+                )
+
+        def materials():
+            for _ in range(options["materials"]):
+                yield MaterialEntry(
+                    project=rng.choice(projects),
+                    date=when(),
+                    description=rng.choice(MATERIALS),
+                    quantity=Decimal(rng.randint(100, 50000)) / 100,
+                    unit_cost=Decimal(rng.randint(100, 50000)) / 100,
+                )
+
+        def payments():
+            for _ in range(options["payments"]):
+                yield Payment(
+                    project=rng.choice(projects),
+                    date=when(),
+                    amount=Decimal(rng.randint(10000, 5000000)) / 100,
+                    notes=f"Check {rng.randint(1000, 99999)}",
+                )
+
+        for label, model, rows in (
+            ("work entries", WorkEntry, work()),
+            ("material entries", MaterialEntry, materials()),
+            ("payments", Payment, payments()),
+        ):
+            written = self._bulk_write(model, rows, options["batch_size"])
+            self.stdout.write(f"Created {written} {label}.")
+
+        for project in projects:
+            ProjectLedger.rebuild(project)
+        self.stdout.write(self.style.SUCCESS("Synthetic data ready; ledger rebuilt for generated jobs."))
+
+    def _bulk_write(self, model, rows, batch_size):
+        written = 0
+        while batch := list(islice(rows, batch_size)):
+            model.objects.bulk_create(batch)
+            written += len(batch)
+            if written % (batch_size * 20) == 0:
+                self.stdout.write(f"  … {written}")
+        return written
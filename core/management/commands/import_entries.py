@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import BATCH_SIZE, KINDS, NOT_UTF8, describe, import_csv
+
+
+class Command(BaseCommand):
+    """Bulk-import work, material or payment entries from a CSV file."""
+
+    help = "Import entries from CSV. Nothing is written if any row fails unless --allow-partial."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(KINDS))
+        parser.add_argument("path")
+        parser.add_argument("--allow-partial", action="store_true", help="Keep valid rows when others fail.")
+        parser.add_argument("--dry-run", action="store_true", help="Validate only; write nothing.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], newline="", encoding="utf-8-sig") as handle:
+                result = import_csv(
+                    options["kind"],
+                    handle,
+                    allow_partial=options["allow_partial"],
+                    dry_run=options["dry_run"],
+                    batch_size=options["batch_size"],
+                )
+        except UnicodeDecodeError:
+            raise CommandError(NOT_UTF8)
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for line in describe(result, limit=50):
+            self.stdout.write(self.style.WARNING(line))
+        if len(result.errors) > 50:
+            self.stdout.write(self.style.WARNING(f"… and {len(result.errors) - 50} more errors"))
+
+        if result.committed:
+            self.stdout.write(self.style.SUCCESS(f"Imported {result.created} {options['kind']} entries."))
+        elif options["dry_run"] and result.ok:
+            self.stdout.write(self.style.SUCCESS(f"Dry run: {result.created} rows valid."))
+        else:
+            raise CommandError(f"Nothing imported: {len(result.errors)} row(s) failed validation.")
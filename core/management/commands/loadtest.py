@@ -0,0 +1,103 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+
+LOADTEST_USER = "jobtool-benchmark"
+
+
+class Command(BaseCommand):
+    """Fire concurrent GETs at a running server and report throughput and latency.
+
+    Unlike ``benchmark``, which calls views in-process, this goes through the
+    real server stack (e.g. gunicorn with uvicorn workers), so it shows how
+    the sync and async views (``JOBTOOL_ASYNC_VIEWS``) behave under load.
+    Authenticated paths use a session created directly in the database for
+    ``--user``; the server must share this database.
+    """
+
+    help = "Load-test a running JobTool server with concurrent requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Paths to request, e.g. /dashboard/ /report/1/")
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="Server root URL.")
+        parser.add_argument("--requests", type=int, default=200, help="Total requests per path.")
+        parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight at once.")
+        parser.add_argument("--user", default=LOADTEST_USER, help="Username to authenticate as.")
+        parser.add_argument("--anonymous", action="store_true", help="Send requests without a session.")
+        parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds.")
+
+    def handle(self, *args, **options):
+        headers = {}
+        if not options["anonymous"]:
+            headers["Cookie"] = f"{settings.SESSION_COOKIE_NAME}={self._session_key(options['user'])}"
+
+        results = {}
+        for path in options["paths"]:
+            url = urljoin(options["base_url"], path)
+            results[path] = self._run(url, headers, options["requests"], options["concurrency"], options["timeout"])
+        self.stdout.write(json.dumps({
+            "base_url": options["base_url"],
+            "concurrency": options["concurrency"],
+            "results": results,
+        }, indent=2))
+
+    def _run(self, url, headers, total, concurrency, timeout):
+        def fetch(_):
+            request = urllib.request.Request(url, headers=headers)
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as exc:
+                status = exc.code
+            except (urllib.error.URLError, OSError):
+                status = None
+            return status, (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+            samples = list(pool.map(fetch, range(total)))
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(ms for status, ms in samples if status == 200)
+        errors = sum(1 for status, _ in samples if status != 200)
+        if not timings:
+            raise CommandError(f"{url}: no successful responses ({errors} errors).")
+        return {
+            "requests": total,
+            "errors": errors,
+            "rps": round(total / elapsed, 1),
+            "p50_ms": round(statistics.median(timings), 2),
+            "p95_ms": round(self._percentile(timings, 95), 2),
+            "p99_ms": round(self._percentile(timings, 99), 2),
+            "max_ms": round(timings[-1], 2),
+        }
+
+    def _percentile(self, timings, pct):
+        index = min(len(timings) - 1, round(pct / 100 * (len(timings) - 1)))
+        return timings[index]
+
+    def _session_key(self, username):
+        User = get_user_model()
+        user, created = User.objects.get_or_create(
+            username=username, defaults={"is_staff": True, "is_superuser": True}
+        )
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=["password"])
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session.session_key
@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import report_cache
+from core.models import LEDGER_COMPONENTS, MonthlyRollup, Project, ProjectLedger, ProjectTotals
+
+
+FIELDS = ("labor", "materials", "payments", "balance")
+
+
+class Command(BaseCommand):
+    """Rebuild ProjectLedger rows from the live totals, or verify they match.
+
+    With ``--rollups`` the MonthlyRollup table is rebuilt or verified too.
+    """
+
+    help = "Rebuild or verify the per-project ledger (and optionally monthly rollups) against ProjectTotals."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verify", action="store_true", help="Compare only; do not write.")
+        parser.add_argument("--project", type=int, action="append", dest="projects", help="Limit to project id (repeatable).")
+        parser.add_argument("--rollups", action="store_true", help="Also rebuild or verify the monthly rollups.")
+
+    def handle(self, *args, **options):
+        projects = Project.objects.order_by("pk")
+        if options["projects"]:
+            projects = projects.filter(pk__in=options["projects"])
+        ledgers = ProjectLedger.objects.in_bulk()
+
+        mismatched = 0
+        for project in projects.iterator():
+            live = ProjectTotals.for_project(project)
+            ledger = ledgers.get(project.pk)
+            stale = ledger is None or any(getattr(ledger, f) != getattr(live, f) for f in FIELDS)
+            if not stale:
+                continue
+            mismatched += 1
+            if options["verify"]:
+                stored = "missing" if ledger is None else ", ".join(f"{f}={getattr(ledger, f)}" for f in FIELDS)
+                expected = ", ".join(f"{f}={getattr(live, f)}" for f in FIELDS)
+                self.stdout.write(self.style.WARNING(f"Project {project.pk}: stored {stored}; live {expected}"))
+            else:
+                ProjectLedger.rebuild(project, live)
+                # why: cached report totals would otherwise keep the old figures until they expire
+                report_cache.bump_project_versions([project.pk])
+                self.stdout.write(f"Rebuilt ledger for project {project.pk}")
+
+        if options["rollups"]:
+            mismatched += self._rollups(projects, options["verify"])
+
+        if options["verify"] and mismatched:
+            raise CommandError(f"{mismatched} row(s) out of date.")
+        verb = "verified" if options["verify"] else "rebuilt"
+        self.stdout.write(self.style.SUCCESS(f"Ledger {verb}; {mismatched} row(s) needed attention."))
+
+    def _rollups(self, projects, verify):
+        mismatched = 0
+        for project_id in projects.values_list("pk", flat=True).iterator():
+            live = {
+                month: tuple(amounts.get(name, 0) for name in LEDGER_COMPONENTS)
+                for (_pid, month), amounts in MonthlyRollup.live([project_id]).items()
+            }
+            stored = {
+                month: tuple(amounts)
+                for month, *amounts in MonthlyRollup.objects.filter(project_id=project_id).values_list(
+                    "month", *LEDGER_COMPONENTS
+                )
+            }
+            if stored == live:
+                continue
+            mismatched += 1
+            if verify:
+                months = sorted(month for month in set(stored) | set(live) if stored.get(month) != live.get(month))
+                listed = ", ".join(f"{month:%Y-%m}" for month in months)
+                self.stdout.write(self.style.WARNING(f"Project {project_id}: rollups differ for {listed}"))
+            else:
+                MonthlyRollup.refresh([project_id])
+                report_cache.bump_project_versions([project_id])
+                self.stdout.write(f"Rebuilt monthly rollups for project {project_id}")
+        return mismatched
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import backfill
+from core.models import BackfillRun
+
+
+class Command(BaseCommand):
+    """Run, resume or inspect a chunked backfill (see core/backfill.py).
+
+    Safe to interrupt: rerunning the same name continues after the last
+    chunk that committed.
+    """
+
+    help = "Run a resumable, throttled backfill in primary-key chunks; --list shows what is available."
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", nargs="?", help="Backfill to run.")
+        parser.add_argument("--list", action="store_true", help="List backfills and their checkpoints.")
+        parser.add_argument("--batch-size", type=int, help="Rows per chunk (default: the backfill's own).")
+        parser.add_argument(
+            "--sleep", type=float, default=backfill.DEFAULT_SLEEP, help="Seconds to pause between chunks."
+        )
+        parser.add_argument("--max-batches", type=int, help="Stop after this many chunks; rerun to resume.")
+        parser.add_argument("--restart", action="store_true", help="Discard the checkpoint and start over.")
+
+    def handle(self, *args, **options):
+        if options["list"] or not options["name"]:
+            return self._list()
+        job = backfill.BACKFILLS.get(options["name"])
+        if job is None:
+            raise CommandError(f"Unknown backfill {options['name']!r}; choose from {', '.join(backfill.BACKFILLS)}.")
+        if options["batch_size"] is not None and options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        state = backfill.run(
+            job,
+            batch_size=options["batch_size"],
+            sleep=options["sleep"],
+            max_batches=options["max_batches"],
+            restart=options["restart"],
+            on_batch=self._report,
+        )
+        if state.finished_at:
+            self.stdout.write(
+                self.style.SUCCESS(f"{job.name}: complete; {state.rows:,} row(s) in {state.batches:,} chunk(s).")
+            )
+        else:
+            self.stdout.write(self.style.WARNING(f"{job.name}: paused at pk {state.last_pk}; rerun to resume."))
+
+    def _report(self, state, size, seconds):
+        percent = "" if state.percent is None else f" ({state.percent}%)"
+        self.stdout.write(
+            f"{state.name}: through pk {state.last_pk} of {state.max_pk}{percent}, "
+            f"{state.rows:,} row(s); chunk of {size} in {seconds:.2f}s"
+        )
+
+    def _list(self):
+        runs = BackfillRun.objects.in_bulk(list(backfill.BACKFILLS), field_name="name")
+        for name, job in backfill.BACKFILLS.items():
+            state = runs.get(name)
+            if state is None:
+                status = "not started"
+            elif state.finished_at:
+                status = f"finished {state.finished_at:%Y-%m-%d %H:%M}"
+            else:
+                status = f"{state.percent or 0}% (through pk {state.last_pk})"
+            self.stdout.write(f"{name:<20} {job.model._meta.verbose_name:<12} {status:<28} {job.description}")
@@ -0,0 +1,64 @@
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import tasks
+
+# Seconds between clean-ups of stale and expired tasks.
+HOUSEKEEPING_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    """Claim and run queued background tasks until stopped (see core/tasks.py).
+
+    Run one or more of these next to the web service. SIGTERM/SIGINT let the
+    current task finish before the worker exits.
+    """
+
+    help = "Run queued background tasks (exports, totals rebuilds) off the request path."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--max-tasks", type=int, help="Exit after running this many tasks.")
+        parser.add_argument("--name", help="Worker name shown on tasks (default: host:pid).")
+
+    def handle(self, *args, **options):
+        worker = options["name"] or f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = False
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._stop)
+
+        ran = 0
+        housekeeping_at = 0.0
+        self.stdout.write(f"Worker {worker} waiting for tasks.")
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - housekeeping_at >= HOUSEKEEPING_INTERVAL:
+                housekeeping_at = time.monotonic()
+                requeued, pruned = tasks.requeue_stale(), tasks.prune()
+                if requeued or pruned:
+                    self.stdout.write(f"Requeued {requeued} stale and deleted {pruned} expired task(s).")
+
+            task = tasks.claim(worker)
+            if task is None:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+
+            started = time.monotonic()
+            self.stdout.write(f"Running {task.name} #{task.pk} (attempt {task.attempts} of {task.max_attempts})")
+            tasks.run(task)
+            self.stdout.write(f"{task.name} #{task.pk}: {task.status} in {time.monotonic() - started:.1f}s")
+            ran += 1
+            if options["max_tasks"] and ran >= options["max_tasks"]:
+                break
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker} stopped after {ran} task(s)."))
+
+    def _stop(self, signum, frame):
+        self.stopping = True
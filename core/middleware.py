@@ -0,0 +1,137 @@
+"""Opt-in per-request query and latency instrumentation.
+
+Enabled by setting ``JOBTOOL_INSTRUMENT=1`` (see ``config/settings.py``).
+For every request it records wall time, query count and SQL time, flags
+repeated identical statements (the N+1 signature), adds a ``Server-Timing``
+header, logs one structured line, and folds the numbers into per-view
+aggregates served by :func:`core.views.request_stats`.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from typing import Callable, Dict, List
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+
+logger = logging.getLogger("core.instrumentation")
+
+# A statement repeated at least this many times in one request is flagged.
+DEFAULT_N_PLUS_ONE_THRESHOLD = 10
+
+
+class _QueryRecorder:
+    """``execute_wrapper`` that counts and times every statement."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.sql_seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - started
+            self.count += 1
+            # Parameters are bound separately, so the SQL text is its shape.
+            self.shapes[sql] += 1
+
+    def repeated(self, threshold: int) -> List[Dict[str, object]]:
+        return [
+            {"count": n, "sql": sql[:200]}
+            for sql, n in self.shapes.most_common()
+            if n >= threshold
+        ]
+
+
+class RequestStats:
+    """Thread-safe per-view aggregates kept in process memory."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._views: Dict[str, Dict[str, float]] = {}
+
+    def record(self, view: str, wall_ms: float, queries: int, sql_ms: float, flagged: bool) -> None:
+        with self._lock:
+            row = self._views.setdefault(
+                view,
+                {"requests": 0, "wall_ms": 0.0, "max_wall_ms": 0.0, "queries": 0, "sql_ms": 0.0, "n_plus_one": 0},
+            )
+            row["requests"] += 1
+            row["wall_ms"] += wall_ms
+            row["max_wall_ms"] = max(row["max_wall_ms"], wall_ms)
+            row["queries"] += queries
+            row["sql_ms"] += sql_ms
+            row["n_plus_one"] += int(flagged)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            out = {}
+            for view, row in self._views.items():
+                n = row["requests"] or 1
+                out[view] = {
+                    "requests": row["requests"],
+                    "avg_wall_ms": round(row["wall_ms"] / n, 2),
+                    "max_wall_ms": round(row["max_wall_ms"], 2),
+                    "avg_queries": round(row["queries"] / n, 1),
+                    "avg_sql_ms": round(row["sql_ms"] / n, 2),
+                    "n_plus_one_requests": row["n_plus_one"],
+                }
+            return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+
+stats = RequestStats()
+
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+        self.threshold = getattr(settings, "INSTRUMENT_N_PLUS_ONE_THRESHOLD", DEFAULT_N_PLUS_ONE_THRESHOLD)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        recorder = _QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - started) * 1000
+        sql_ms = recorder.sql_seconds * 1000
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match and match.view_name else "unresolved"
+        repeated = recorder.repeated(self.threshold)
+
+        response["Server-Timing"] = (
+            f'app;dur={wall_ms:.1f}, db;dur={sql_ms:.1f};desc="{recorder.count} queries"'
+        )
+        stats.record(view, wall_ms, recorder.count, sql_ms, bool(repeated))
+
+        line = {
+            "view": view,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "wall_ms": round(wall_ms, 2),
+            "queries": recorder.count,
+            "sql_ms": round(sql_ms, 2),
+        }
+        if repeated:
+            line["n_plus_one"] = repeated[:3]
+            logger.warning(json.dumps(line))
+        else:
+            logger.info(json.dumps(line))
+        return response
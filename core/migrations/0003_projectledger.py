@@ -0,0 +1,33 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0002_asset_client_fk"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectLedger",
+            fields=[
+                (
+                    "project",
+                    models.OneToOneField(
+                        on_delete=models.CASCADE,
+                        primary_key=True,
+                        related_name="ledger",
+                        serialize=False,
+                        to="core.project",
+                    ),
+                ),
+                ("labor", models.DecimalField(decimal_places=4, default=Decimal("0.00"), max_digits=20)),
+                ("materials", models.DecimalField(decimal_places=4, default=Decimal("0.00"), max_digits=20)),
+                ("payments", models.DecimalField(decimal_places=4, default=Decimal("0.00"), max_digits=20)),
+                ("balance", models.DecimalField(decimal_places=4, default=Decimal("0.00"), max_digits=20)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={"verbose_name": "Job ledger"},
+        ),
+    ]
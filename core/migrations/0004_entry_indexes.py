@@ -0,0 +1,74 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Composite indexes for the report, portfolio and admin access paths.
+
+    The (project, -date, id) composites serve both per-job filtering and the
+    models' ordering, so they replace the single-column project FK indexes,
+    which are dropped only after the composites exist. Partial indexes on
+    ``active=True`` are created on backends that support them (Postgres,
+    SQLite) and skipped elsewhere.
+    """
+
+    dependencies = [
+        ("core", "0003_projectledger"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="workentry",
+            index=models.Index(fields=["project", "-date", "id"], name="workentry_project_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="workentry",
+            index=models.Index(fields=["-date", "id"], name="workentry_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="materialentry",
+            index=models.Index(fields=["project", "-date", "id"], name="materialentry_project_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="materialentry",
+            index=models.Index(fields=["-date", "id"], name="materialentry_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(fields=["project", "-date", "id"], name="payment_project_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(fields=["-date", "id"], name="payment_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(fields=["client", "active"], name="project_client_active_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(condition=models.Q(active=True), fields=["name"], name="project_active_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="asset",
+            index=models.Index(fields=["client", "active"], name="asset_client_active_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="asset",
+            index=models.Index(condition=models.Q(active=True), fields=["client", "name"], name="asset_active_idx"),
+        ),
+        migrations.AlterField(
+            model_name="workentry",
+            name="project",
+            field=models.ForeignKey(db_index=False, on_delete=models.CASCADE, related_name="work", to="core.project"),
+        ),
+        migrations.AlterField(
+            model_name="materialentry",
+            name="project",
+            field=models.ForeignKey(db_index=False, on_delete=models.CASCADE, related_name="materials", to="core.project"),
+        ),
+        migrations.AlterField(
+            model_name="payment",
+            name="project",
+            field=models.ForeignKey(db_index=False, on_delete=models.CASCADE, related_name="payments", to="core.project"),
+        ),
+    ]
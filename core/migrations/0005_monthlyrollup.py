@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0004_entry_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlyRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("month", models.DateField()),
+                ("labor", models.DecimalField(decimal_places=4, default=Decimal("0.00"), max_digits=20)),
+                ("materials", models.DecimalField(decimal_places=4, default=Decimal("0.00"), max_digits=20)),
+                ("payments", models.DecimalField(decimal_places=4, default=Decimal("0.00"), max_digits=20)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=models.CASCADE,
+                        related_name="monthly_rollups",
+                        to="core.project",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Monthly rollup",
+                "ordering": ["project", "month"],
+                "indexes": [models.Index(fields=["month"], name="rollup_month_idx")],
+                "constraints": [
+                    models.UniqueConstraint(fields=("project", "month"), name="rollup_project_month_uniq")
+                ],
+            },
+        ),
+    ]
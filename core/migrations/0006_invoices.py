@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0005_monthlyrollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Invoice",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("client_name", models.CharField(max_length=200)),
+                ("project_name", models.CharField(max_length=200)),
+                ("issued_on", models.DateField(default=django.utils.timezone.localdate)),
+                ("period_start", models.DateField(blank=True, null=True)),
+                ("period_end", models.DateField()),
+                ("labor", models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=14)),
+                ("materials", models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=14)),
+                ("total", models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=14)),
+                ("payments_to_date", models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=14)),
+                ("balance_due", models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=14)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "project",
+                    models.ForeignKey(on_delete=models.PROTECT, related_name="invoices", to="core.project"),
+                ),
+            ],
+            options={
+                "ordering": ["-issued_on", "-id"],
+                "indexes": [models.Index(fields=["project", "-period_end"], name="invoice_project_period_idx")],
+            },
+        ),
+        migrations.CreateModel(
+            name="InvoiceLine",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("labor", "Labor & Equipment"), ("material", "Materials")], max_length=10
+                    ),
+                ),
+                ("description", models.CharField(max_length=200)),
+                ("first_date", models.DateField()),
+                ("last_date", models.DateField()),
+                ("quantity", models.DecimalField(decimal_places=2, max_digits=14)),
+                ("rate", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=14)),
+                (
+                    "invoice",
+                    models.ForeignKey(on_delete=models.CASCADE, related_name="lines", to="core.invoice"),
+                ),
+            ],
+            options={"ordering": ["invoice", "id"]},
+        ),
+    ]
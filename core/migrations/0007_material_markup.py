@@ -0,0 +1,28 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0006_invoices"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="material_markup_percent",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=Decimal("0.00"),
+                help_text="Default markup added to material cost; entries may override it.",
+                max_digits=6,
+                verbose_name="material markup %",
+            ),
+        ),
+        migrations.AddField(
+            model_name="materialentry",
+            name="markup_percent",
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True, verbose_name="markup %"),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+# GIN indexes over the same SearchVector expressions core.search queries with,
+# config included, so PostgreSQL can match them. Other backends skip this:
+# SQLite gets FTS5 tables from core.search.install_sqlite_index instead.
+CONFIG = "english"
+SEARCH_INDEXES = [
+    ("client", ("name",), "client_search_idx"),
+    ("project", ("name", "location"), "project_search_idx"),
+    ("asset", ("name",), "asset_search_idx"),
+    ("workentry", ("notes",), "workentry_search_idx"),
+    ("materialentry", ("description",), "materialentry_search_idx"),
+    ("payment", ("notes",), "payment_search_idx"),
+]
+
+
+def _indexes(apps):
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    for model_name, fields, name in SEARCH_INDEXES:
+        yield apps.get_model("core", model_name), GinIndex(SearchVector(*fields, config=CONFIG), name=name)
+
+
+def add_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for model, index in _indexes(apps):
+        schema_editor.add_index(model, index)
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for model, index in _indexes(apps):
+        schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0007_material_markup"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
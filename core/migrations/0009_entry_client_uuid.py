@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0008_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="workentry",
+            name="client_uuid",
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="materialentry",
+            name="client_uuid",
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="client_uuid",
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0010_backgroundtask"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BackfillRun",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("min_pk", models.BigIntegerField(blank=True, null=True)),
+                ("max_pk", models.BigIntegerField(blank=True, null=True)),
+                ("last_pk", models.BigIntegerField(blank=True, null=True)),
+                ("rows", models.PositiveBigIntegerField(default=0)),
+                ("batches", models.PositiveIntegerField(default=0)),
+                ("started_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={"verbose_name": "Backfill run", "ordering": ["name"]},
+        ),
+    ]
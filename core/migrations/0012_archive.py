@@ -0,0 +1,136 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0011_backfillrun"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="archived_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name="ArchivedProjectSummary",
+            fields=[
+                (
+                    "project",
+                    models.OneToOneField(
+                        on_delete=models.CASCADE,
+                        primary_key=True,
+                        related_name="archive",
+                        serialize=False,
+                        to="core.project",
+                    ),
+                ),
+                ("labor", models.DecimalField(decimal_places=4, default=Decimal("0.00"), max_digits=20)),
+                ("materials", models.DecimalField(decimal_places=4, default=Decimal("0.00"), max_digits=20)),
+                ("payments", models.DecimalField(decimal_places=4, default=Decimal("0.00"), max_digits=20)),
+                ("balance", models.DecimalField(decimal_places=4, default=Decimal("0.00"), max_digits=20)),
+                ("work_entries", models.PositiveIntegerField(default=0)),
+                ("material_entries", models.PositiveIntegerField(default=0)),
+                ("payment_entries", models.PositiveIntegerField(default=0)),
+                ("first_date", models.DateField(blank=True, null=True)),
+                ("last_date", models.DateField(blank=True, null=True)),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={"verbose_name": "Archived job summary", "verbose_name_plural": "Archived job summaries"},
+        ),
+        migrations.CreateModel(
+            name="ArchivedWorkEntry",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("date", models.DateField()),
+                ("hours", models.DecimalField(decimal_places=2, max_digits=7)),
+                ("notes", models.TextField(blank=True)),
+                ("client_uuid", models.UUIDField(blank=True, editable=False, null=True)),
+                ("rate", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("cost", models.DecimalField(decimal_places=4, max_digits=20)),
+                (
+                    "asset",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=models.SET_NULL,
+                        related_name="+",
+                        to="core.asset",
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=models.CASCADE,
+                        related_name="archived_work",
+                        to="core.project",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archived labor & equipment entry",
+                "ordering": ["-date", "id"],
+                "indexes": [models.Index(fields=["project", "-date", "id"], name="archivedwork_project_date_idx")],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedMaterialEntry",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("date", models.DateField()),
+                ("description", models.CharField(max_length=200)),
+                ("quantity", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("unit_cost", models.DecimalField(decimal_places=2, max_digits=10)),
+                (
+                    "markup_percent",
+                    models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True, verbose_name="markup %"),
+                ),
+                ("client_uuid", models.UUIDField(blank=True, editable=False, null=True)),
+                ("markup", models.DecimalField(decimal_places=2, max_digits=6)),
+                ("cost", models.DecimalField(decimal_places=4, max_digits=20)),
+                ("sell_price", models.DecimalField(decimal_places=4, max_digits=20)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=models.CASCADE,
+                        related_name="archived_materials",
+                        to="core.project",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archived material entry",
+                "ordering": ["-date", "id"],
+                "indexes": [models.Index(fields=["project", "-date", "id"], name="archivedmat_project_date_idx")],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedPayment",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("date", models.DateField()),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("notes", models.TextField(blank=True)),
+                ("client_uuid", models.UUIDField(blank=True, editable=False, null=True)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=models.CASCADE,
+                        related_name="archived_payments",
+                        to="core.project",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archived payment",
+                "ordering": ["-date", "id"],
+                "indexes": [models.Index(fields=["project", "-date", "id"], name="archivedpay_project_date_idx")],
+            },
+        ),
+    ]
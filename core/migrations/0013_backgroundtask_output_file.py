@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0012_archive"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="backgroundtask",
+            name="output",
+        ),
+        migrations.AddField(
+            model_name="backgroundtask",
+            name="output_file",
+            field=models.FileField(blank=True, editable=False, max_length=255, upload_to="tasks/%Y/%m/"),
+        ),
+    ]
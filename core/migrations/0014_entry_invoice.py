@@ -0,0 +1,60 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0013_backgroundtask_output_file"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="workentry",
+            name="invoice",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                editable=False,
+                null=True,
+                on_delete=models.SET_NULL,
+                related_name="work_entries",
+                to="core.invoice",
+            ),
+        ),
+        migrations.AddField(
+            model_name="materialentry",
+            name="invoice",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                editable=False,
+                null=True,
+                on_delete=models.SET_NULL,
+                related_name="material_entries",
+                to="core.invoice",
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedworkentry",
+            name="invoice",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=models.SET_NULL,
+                related_name="+",
+                to="core.invoice",
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedmaterialentry",
+            name="invoice",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=models.SET_NULL,
+                related_name="+",
+                to="core.invoice",
+            ),
+        ),
+    ]
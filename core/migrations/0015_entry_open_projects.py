@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0014_entry_invoice"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="workentry",
+            name="project",
+            field=models.ForeignKey(
+                db_index=False,
+                limit_choices_to={"archived_at__isnull": True},
+                on_delete=models.CASCADE,
+                related_name="work",
+                to="core.project",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="materialentry",
+            name="project",
+            field=models.ForeignKey(
+                db_index=False,
+                limit_choices_to={"archived_at__isnull": True},
+                on_delete=models.CASCADE,
+                related_name="materials",
+                to="core.project",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="payment",
+            name="project",
+            field=models.ForeignKey(
+                db_index=False,
+                limit_choices_to={"archived_at__isnull": True},
+                on_delete=models.CASCADE,
+                related_name="payments",
+                to="core.project",
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def link_invoices(apps, schema_editor):
+    """Fill the entries' invoice links with the chunked backfills in core/backfill.py.
+
+    Each chunk commits with its checkpoint, so the entry tables are never
+    locked for the whole run and an interrupted ``migrate`` resumes where
+    it stopped (``run_backfill`` shows the progress).
+    """
+
+    from core import backfill
+
+    for name in backfill.INVOICE_LINKS:
+        backfill.run(backfill.BACKFILLS[name])
+
+
+def forget_checkpoints(apps, schema_editor):
+    from core import backfill
+
+    apps.get_model("core", "BackfillRun").objects.filter(name__in=list(backfill.INVOICE_LINKS)).delete()
+
+
+class Migration(migrations.Migration):
+    # why: the backfill commits chunk by chunk
+    atomic = False
+
+    dependencies = [
+        ("core", "0015_entry_open_projects"),
+    ]
+
+    operations = [
+        migrations.RunPython(link_invoices, forget_checkpoints),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+
+from core import online_schema
+
+# Built with CREATE INDEX CONCURRENTLY on PostgreSQL (see core/online_schema.py),
+# so the entry tables stay writable while they build.
+INDEXES = [
+    (
+        "workentry",
+        models.Index(
+            condition=models.Q(invoice__isnull=True), fields=["project", "date"], name="workentry_unbilled_idx"
+        ),
+    ),
+    (
+        "materialentry",
+        models.Index(
+            condition=models.Q(invoice__isnull=True), fields=["project", "date"], name="materialentry_unbilled_idx"
+        ),
+    ),
+]
+
+
+def add_indexes(apps, schema_editor):
+    for model_name, index in INDEXES:
+        online_schema.add_index(apps.get_model("core", model_name), index, using=schema_editor.connection.alias)
+
+
+def remove_indexes(apps, schema_editor):
+    for model_name, index in INDEXES:
+        schema_editor.remove_index(apps.get_model("core", model_name), index)
+
+
+class Migration(migrations.Migration):
+    # why: concurrent index builds can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("core", "0016_link_entry_invoices"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(add_indexes, remove_indexes)],
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index) for model_name, index in INDEXES
+            ],
+        ),
+    ]
@@ -1,12 +1,29 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
+from datetime import date
 from decimal import Decimal
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, TruncMonth
 from django.utils import timezone
 
+# Output types for SQL-side costing. Hours and rates both carry two decimal
+# places, so their product carries four; keeping it avoids rounding drift
+# against the Decimal arithmetic the totals have always used.
+RATE_FIELD = models.DecimalField(max_digits=10, decimal_places=2)
+MONEY_FIELD = models.DecimalField(max_digits=20, decimal_places=4)
+PERCENT_FIELD = models.DecimalField(max_digits=6, decimal_places=2)
+ZERO = models.Value(Decimal("0"), output_field=RATE_FIELD)
+HUNDRED = models.Value(Decimal("100"), output_field=RATE_FIELD)
+COST_PLACES = Decimal("0.0001")
+AMOUNT_PLACES = Decimal("0.01")
+
 
 class Client(models.Model):
     name = models.CharField(max_length=200, unique=True)
@@ -36,6 +53,11 @@ class Asset(models.Model):
         verbose_name = "Asset"
         verbose_name_plural = "Assets"
         unique_together = ("client", "name")
+        indexes = [
+            models.Index(fields=["client", "active"], name="asset_client_active_idx"),
+            # why: the work-entry asset dropdown lists a client's active assets by name
+            models.Index(fields=["client", "name"], condition=models.Q(active=True), name="asset_active_idx"),
+        ]
         ordering = ["name"]
 
     def __str__(self) -> str:  # pragma: no cover
@@ -48,9 +70,15 @@ class Project(models.Model):  # UI name: Job
     name = models.CharField(max_length=200)
     location = models.CharField(max_length=200, blank=True)
     hourly_rate = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
+    material_markup_percent = models.DecimalField(
+        "material markup %", max_digits=6, decimal_places=2, default=Decimal("0.00"),
+        help_text="Default markup added to material cost; entries may override it.",
+    )
     start_date = models.DateField(null=True, blank=True)
     end_date = models.DateField(null=True, blank=True)
     active = models.BooleanField(default=True)
+    # Set while the job's entries live in the archive tables (see core/archive.py).
+    archived_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Job"
@@ -59,12 +87,28 @@ class Project(models.Model):  # UI name: Job
                 fields=["client", "name"], name="uniq_project_per_client"
             )
         ]
+        indexes = [
+            models.Index(fields=["client", "active"], name="project_client_active_idx"),
+            # why: job pickers and the portfolio only ever list active jobs
+            models.Index(fields=["name"], condition=models.Q(active=True), name="project_active_idx"),
+        ]
         ordering = ["client__name", "name"]
 
     def __str__(self) -> str:  # pragma: no cover
         return f"{self.name} — {self.client.name}"
 
 
+# Entry job pickers (admin forms and autocomplete) leave out archived jobs: their
+# entries live in the archive tables, which reports and totals read as frozen.
+OPEN_PROJECTS = {"archived_at__isnull": True}
+
+
+def check_project_open(entry: models.Model) -> None:
+    """Reject an entry for an archived job (see core/archive.py)."""
+    if entry.project_id and entry.project.archived_at:
+        raise ValidationError({"project": f"{entry.project} is archived; restore it before adding entries."})
+
+
 class RateOverride(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     asset = models.ForeignKey(Asset, on_delete=models.CASCADE)
@@ -77,26 +121,135 @@ class RateOverride(models.Model):
         return f"{self.project} / {self.asset}: {self.hourly_rate}"
 
 
+class WorkEntryQuerySet(models.QuerySet):
+    def with_cost(self) -> "WorkEntryQuerySet":
+        """Annotate each entry with its effective ``rate`` and ``cost``.
+
+        The rate is the per-asset ``RateOverride`` for the entry's project when
+        one exists, otherwise the project's ``hourly_rate``. Both are resolved
+        in SQL so costing a job is a single query regardless of its size.
+        """
+        override = RateOverride.objects.filter(
+            project=models.OuterRef("project_id"), asset=models.OuterRef("asset_id")
+        ).values("hourly_rate")[:1]
+        rate = Coalesce(
+            models.Subquery(override, output_field=RATE_FIELD),
+            models.F("project__hourly_rate"),
+            output_field=RATE_FIELD,
+        )
+        return self.annotate(rate=rate).annotate(
+            cost=models.ExpressionWrapper(
+                Coalesce(models.F("hours"), ZERO) * models.F("rate"), output_field=MONEY_FIELD
+            )
+        )
+
+
 class WorkEntry(models.Model):  # UI name: Labor & Equipment Log
-    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="work")
+    # Indexed by the (project, -date, id) composite below rather than on its own.
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="work", db_index=False, limit_choices_to=OPEN_PROJECTS
+    )
     date = models.DateField(default=timezone.now)
     hours = models.DecimalField(max_digits=7, decimal_places=2)
     asset = models.ForeignKey(Asset, on_delete=models.SET_NULL, null=True, blank=True)
     notes = models.TextField(blank=True)
+    # Set by the device that recorded the entry offline; makes sync retries idempotent.
+    client_uuid = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+    # The invoice that billed this entry (see core.invoicing); only unbilled rows
+    # are indexed, for the next invoice run.
+    invoice = models.ForeignKey(
+        "Invoice",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=False,
+        related_name="work_entries",
+    )
+
+    objects = WorkEntryQuerySet.as_manager()
 
     class Meta:
         ordering = ["-date", "id"]
+        indexes = [
+            models.Index(fields=["project", "-date", "id"], name="workentry_project_date_idx"),
+            models.Index(fields=["-date", "id"], name="workentry_date_idx"),
+            models.Index(
+                fields=["project", "date"], condition=models.Q(invoice__isnull=True), name="workentry_unbilled_idx"
+            ),
+        ]
+
+    def clean(self) -> None:
+        check_project_open(self)
+
+
+class MaterialEntryQuerySet(models.QuerySet):
+    def with_cost(self) -> "MaterialEntryQuerySet":
+        """Annotate each entry with its ``cost``, ``markup``, ``sell_price`` and ``margin``.
+
+        ``cost`` is quantity × unit cost; ``markup`` is the entry's own
+        ``markup_percent`` when set, otherwise the project's default. The
+        sell price (cost plus markup) is what the client is billed, and
+        all four are computed in SQL.
+        """
+        markup = Coalesce(
+            models.F("markup_percent"), models.F("project__material_markup_percent"), ZERO, output_field=PERCENT_FIELD
+        )
+        return (
+            self.annotate(
+                cost=models.ExpressionWrapper(
+                    Coalesce(models.F("quantity"), ZERO) * Coalesce(models.F("unit_cost"), ZERO),
+                    output_field=MONEY_FIELD,
+                ),
+                markup=markup,
+            )
+            .annotate(
+                sell_price=models.ExpressionWrapper(
+                    models.F("cost") + models.F("cost") * models.F("markup") / HUNDRED, output_field=MONEY_FIELD
+                )
+            )
+            .annotate(
+                margin=models.ExpressionWrapper(models.F("sell_price") - models.F("cost"), output_field=MONEY_FIELD)
+            )
+        )
 
 
 class MaterialEntry(models.Model):  # UI name: Material Log
-    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="materials")
+    # Indexed by the (project, -date, id) composite below rather than on its own.
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="materials", db_index=False, limit_choices_to=OPEN_PROJECTS
+    )
     date = models.DateField(default=timezone.now)
     description = models.CharField(max_length=200)
     quantity = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("1"))
     unit_cost = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
+    # Blank uses the project's material_markup_percent.
+    markup_percent = models.DecimalField("markup %", max_digits=6, decimal_places=2, null=True, blank=True)
+    client_uuid = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+    invoice = models.ForeignKey(
+        "Invoice",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=False,
+        related_name="material_entries",
+    )
+
+    objects = MaterialEntryQuerySet.as_manager()
 
     class Meta:
         ordering = ["-date", "id"]
+        indexes = [
+            models.Index(fields=["project", "-date", "id"], name="materialentry_project_date_idx"),
+            models.Index(fields=["-date", "id"], name="materialentry_date_idx"),
+            models.Index(
+                fields=["project", "date"], condition=models.Q(invoice__isnull=True), name="materialentry_unbilled_idx"
+            ),
+        ]
+
+    def clean(self) -> None:
+        check_project_open(self)
 
     @property
     def total(self) -> Decimal:
@@ -104,47 +257,775 @@ class MaterialEntry(models.Model):  # UI name: Material Log
 
 
 class Payment(models.Model):  # UI name: Payment Received
-    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="payments")
+    # Indexed by the (project, -date, id) composite below rather than on its own.
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="payments", db_index=False, limit_choices_to=OPEN_PROJECTS
+    )
     date = models.DateField(default=timezone.now)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     notes = models.TextField(blank=True)
+    client_uuid = models.UUIDField(null=True, blank=True, unique=True, editable=False)
 
     class Meta:
         ordering = ["-date", "id"]
+        indexes = [
+            models.Index(fields=["project", "-date", "id"], name="payment_project_date_idx"),
+            models.Index(fields=["-date", "id"], name="payment_date_idx"),
+        ]
+
+    def clean(self) -> None:
+        check_project_open(self)
 
 
 @dataclass
 class ProjectTotals:
     labor: Decimal
+    # Billed at sell price: cost plus the entry's (or project's) markup.
     materials: Decimal
     payments: Decimal
     balance: Decimal
 
     @classmethod
-    def for_project(cls, project: Project) -> "ProjectTotals":
-        # Labor: hours * rate (override per-asset if exists)
-        labor_total = Decimal("0.00")
-        q = WorkEntry.objects.filter(project=project).select_related("asset")
-        for w in q:
-            rate = project.hourly_rate
-            if w.asset_id:
-                ro = RateOverride.objects.filter(project=project, asset=w.asset).first()
-                if ro:
-                    rate = ro.hourly_rate
-            labor_total += (w.hours or Decimal("0")) * (rate or Decimal("0"))
-
-        # Materials
-        materials_total = Decimal("0.00")
-        for m in MaterialEntry.objects.filter(project=project):
-            materials_total += m.total
-
-        # Payments
-        payments_total = (
-            Payment.objects.filter(project=project)
-            .aggregate(s=models.Sum("amount"))
-            .get("s")
-            or Decimal("0.00")
-        )
+    def for_project(
+        cls,
+        project: Project,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        as_of: Optional[date] = None,
+    ) -> "ProjectTotals":
+        """Totals for one project, optionally limited to entries dated ``start``–``end``.
+
+        ``as_of`` gives the running totals through that day, i.e. ``end``
+        with no ``start``. Bounds are range scans on the entries'
+        ``(project, -date, id)`` indexes.
+        """
+        start, end = _period(start, end, as_of)
+        labor_total = labor_total_for(project.pk, start, end)
+        materials_total = materials_total_for(project.pk, start, end)
+        payments_total = payments_total_for(project.pk, start, end)
+        if project.archived_at:
+            archived = archived_totals([project.pk], start, end).get(project.pk, {})
+            labor_total += archived.get("labor", 0)
+            materials_total += archived.get("materials", 0)
+            payments_total += archived.get("payments", 0)
+
+        balance = labor_total + materials_total - payments_total
+        return cls(labor=labor_total, materials=materials_total, payments=payments_total, balance=balance)
 
+    @classmethod
+    async def afor_project(
+        cls,
+        project: Project,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        as_of: Optional[date] = None,
+    ) -> "ProjectTotals":
+        """Async :meth:`for_project`; the three aggregates are awaited together."""
+        start, end = _period(start, end, as_of)
+        work = _in_range(WorkEntry.objects.filter(project_id=project.pk), start, end)
+        materials = _in_range(MaterialEntry.objects.filter(project_id=project.pk), start, end)
+        payments = _in_range(Payment.objects.filter(project_id=project.pk), start, end)
+        labor_total, materials_total, payments_total = await asyncio.gather(
+            _asum(work.with_cost(), "cost", COST_PLACES),
+            _asum(materials.with_cost(), "sell_price", COST_PLACES),
+            _asum(payments, "amount", AMOUNT_PLACES),
+        )
+        if project.archived_at:
+            archived = (await aarchived_totals([project.pk], start, end)).get(project.pk, {})
+            labor_total += archived.get("labor", 0)
+            materials_total += archived.get("materials", 0)
+            payments_total += archived.get("payments", 0)
         balance = labor_total + materials_total - payments_total
         return cls(labor=labor_total, materials=materials_total, payments=payments_total, balance=balance)
+
+    @classmethod
+    def for_projects(
+        cls,
+        projects: models.QuerySet,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        as_of: Optional[date] = None,
+    ) -> Dict[int, "ProjectTotals"]:
+        """Totals for every project in ``projects``, keyed by project id.
+
+        Runs one grouped aggregate per entry table (plus the project id
+        lookup and one read of the archived jobs' summaries) however many
+        projects are included. Date bounds work as in :meth:`for_project`.
+        """
+        start, end = _period(start, end, as_of)
+        selected = projects.order_by().values("pk")
+        labor = _sum_by_project(
+            _in_range(WorkEntry.objects.filter(project_id__in=selected), start, end).with_cost(),
+            "cost",
+            COST_PLACES,
+        )
+        materials = _sum_by_project(
+            _in_range(MaterialEntry.objects.filter(project_id__in=selected), start, end).with_cost(),
+            "sell_price",
+            COST_PLACES,
+        )
+        payments = _sum_by_project(
+            _in_range(Payment.objects.filter(project_id__in=selected), start, end), "amount", AMOUNT_PLACES
+        )
+
+        archived = archived_totals(selected, start, end)
+        return cls._assemble(selected.values_list("pk", flat=True), labor, materials, payments, archived)
+
+    @classmethod
+    async def afor_projects(
+        cls,
+        projects: models.QuerySet,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        as_of: Optional[date] = None,
+    ) -> Dict[int, "ProjectTotals"]:
+        """Async :meth:`for_projects`; the grouped aggregates are awaited together."""
+        start, end = _period(start, end, as_of)
+        selected = projects.order_by().values("pk")
+        project_ids, labor, materials, payments, archived = await asyncio.gather(
+            alist(selected.values_list("pk", flat=True)),
+            _asum_by_project(
+                _in_range(WorkEntry.objects.filter(project_id__in=selected), start, end).with_cost(),
+                "cost",
+                COST_PLACES,
+            ),
+            _asum_by_project(
+                _in_range(MaterialEntry.objects.filter(project_id__in=selected), start, end).with_cost(),
+                "sell_price",
+                COST_PLACES,
+            ),
+            _asum_by_project(
+                _in_range(Payment.objects.filter(project_id__in=selected), start, end), "amount", AMOUNT_PLACES
+            ),
+            aarchived_totals(selected, start, end),
+        )
+        return cls._assemble(project_ids, labor, materials, payments, archived)
+
+    @classmethod
+    def _assemble(
+        cls,
+        project_ids: Iterable[int],
+        labor: Dict[int, Decimal],
+        materials: Dict[int, Decimal],
+        payments: Dict[int, Decimal],
+        archived: Dict[int, Dict[str, Decimal]],
+    ) -> Dict[int, "ProjectTotals"]:
+        zero = Decimal("0.00")
+        totals = {}
+        for pid in project_ids:
+            frozen = archived.get(pid, {})
+            labor_total = labor.get(pid, zero) + frozen.get("labor", 0)
+            materials_total = materials.get(pid, zero) + frozen.get("materials", 0)
+            payments_total = payments.get(pid, zero) + frozen.get("payments", 0)
+            totals[pid] = cls(
+                labor=labor_total,
+                materials=materials_total,
+                payments=payments_total,
+                balance=labor_total + materials_total - payments_total,
+            )
+        return totals
+
+
+def labor_total_for(project_id: int, start: Optional[date] = None, end: Optional[date] = None) -> Decimal:
+    # Labor: hours * rate (override per-asset if exists), costed in SQL
+    queryset = _in_range(WorkEntry.objects.filter(project_id=project_id), start, end)
+    return _sum(queryset.with_cost(), "cost", COST_PLACES)
+
+
+def materials_total_for(project_id: int, start: Optional[date] = None, end: Optional[date] = None) -> Decimal:
+    queryset = _in_range(MaterialEntry.objects.filter(project_id=project_id), start, end)
+    return _sum(queryset.with_cost(), "sell_price", COST_PLACES)
+
+
+def payments_total_for(project_id: int, start: Optional[date] = None, end: Optional[date] = None) -> Decimal:
+    queryset = _in_range(Payment.objects.filter(project_id=project_id), start, end)
+    return _sum(queryset, "amount", AMOUNT_PLACES)
+
+
+def archived_totals(
+    project_ids: Iterable[int], start: Optional[date] = None, end: Optional[date] = None
+) -> Dict[int, Dict[str, Decimal]]:
+    """Labor, materials and payments of the archived jobs among ``project_ids``.
+
+    Whole-job totals are one read of :class:`ArchivedProjectSummary`; a date
+    range sums the frozen amounts on the archive tables instead.
+    """
+    if start is None and end is None:
+        rows = ArchivedProjectSummary.objects.filter(project_id__in=project_ids).values_list(
+            "project_id", "labor", "materials", "payments"
+        )
+        return {pid: _archived_row(labor, materials, payments) for pid, labor, materials, payments in rows}
+    totals: Dict[int, Dict[str, Decimal]] = {}
+    for name, (queryset, field, places) in _archived_sources(project_ids, start, end).items():
+        for pid, total in _sum_by_project(queryset, field, places).items():
+            totals.setdefault(pid, {})[name] = total
+    return totals
+
+
+async def aarchived_totals(
+    project_ids: Iterable[int], start: Optional[date] = None, end: Optional[date] = None
+) -> Dict[int, Dict[str, Decimal]]:
+    if start is None and end is None:
+        rows = ArchivedProjectSummary.objects.filter(project_id__in=project_ids).values_list(
+            "project_id", "labor", "materials", "payments"
+        )
+        return {pid: _archived_row(labor, materials, payments) async for pid, labor, materials, payments in rows}
+    sources = _archived_sources(project_ids, start, end)
+    sums = await asyncio.gather(*(_asum_by_project(*source) for source in sources.values()))
+    totals: Dict[int, Dict[str, Decimal]] = {}
+    for name, by_project in zip(sources, sums):
+        for pid, total in by_project.items():
+            totals.setdefault(pid, {})[name] = total
+    return totals
+
+
+def _archived_row(labor: Decimal, materials: Decimal, payments: Decimal) -> Dict[str, Decimal]:
+    return {
+        "labor": labor.quantize(COST_PLACES),
+        "materials": materials.quantize(COST_PLACES),
+        "payments": payments.quantize(AMOUNT_PLACES),
+    }
+
+
+def _archived_sources(
+    project_ids: Iterable[int], start: Optional[date], end: Optional[date]
+) -> Dict[str, Tuple[models.QuerySet, str, Decimal]]:
+    return {
+        "labor": (
+            _in_range(ArchivedWorkEntry.objects.filter(project_id__in=project_ids), start, end),
+            "cost",
+            COST_PLACES,
+        ),
+        "materials": (
+            _in_range(ArchivedMaterialEntry.objects.filter(project_id__in=project_ids), start, end),
+            "sell_price",
+            COST_PLACES,
+        ),
+        "payments": (
+            _in_range(ArchivedPayment.objects.filter(project_id__in=project_ids), start, end),
+            "amount",
+            AMOUNT_PLACES,
+        ),
+    }
+
+
+def _period(
+    start: Optional[date], end: Optional[date], as_of: Optional[date]
+) -> Tuple[Optional[date], Optional[date]]:
+    if as_of is None:
+        return start, end
+    if start is not None or end is not None:
+        raise ValueError("as_of cannot be combined with start or end.")
+    return None, as_of
+
+
+def _in_range(queryset: models.QuerySet, start: Optional[date], end: Optional[date]) -> models.QuerySet:
+    if start is not None:
+        queryset = queryset.filter(date__gte=start)
+    if end is not None:
+        queryset = queryset.filter(date__lte=end)
+    return queryset
+
+
+def _sum(queryset: models.QuerySet, field: str, places: Decimal) -> Decimal:
+    """Aggregate ``field`` over ``queryset`` in one query, ``0.00`` when empty.
+
+    The result is quantized to ``places`` so SQLite's float-backed sums come
+    back with the same exponent Postgres (and plain Decimal math) produces.
+    """
+    total = queryset.order_by().aggregate(s=models.Sum(field)).get("s")
+    if total is None:
+        return Decimal("0.00")
+    return total.quantize(places)
+
+
+def _sum_by_project(queryset: models.QuerySet, field: str, places: Decimal) -> Dict[int, Decimal]:
+    """Like :func:`_sum` but grouped by project in a single query."""
+    rows = queryset.order_by().values("project_id").annotate(s=models.Sum(field)).values_list("project_id", "s")
+    return {pid: total.quantize(places) for pid, total in rows if total is not None}
+
+
+async def _asum(queryset: models.QuerySet, field: str, places: Decimal) -> Decimal:
+    total = (await queryset.order_by().aaggregate(s=models.Sum(field))).get("s")
+    if total is None:
+        return Decimal("0.00")
+    return total.quantize(places)
+
+
+async def _asum_by_project(queryset: models.QuerySet, field: str, places: Decimal) -> Dict[int, Decimal]:
+    rows = queryset.order_by().values("project_id").annotate(s=models.Sum(field)).values_list("project_id", "s")
+    return {pid: total.quantize(places) async for pid, total in rows if total is not None}
+
+
+async def alist(queryset: models.QuerySet) -> list:
+    return [row async for row in queryset]
+
+
+LEDGER_COMPONENTS = {
+    "labor": labor_total_for,
+    "materials": materials_total_for,
+    "payments": payments_total_for,
+}
+
+
+class ProjectLedger(models.Model):
+    """Denormalized running totals for one project.
+
+    Rows are kept current by the write hooks in ``core.signals``; each save or
+    delete recomputes only the component it touched. ``ProjectTotals`` remains
+    the source of truth and ``manage.py rebuild_ledger`` reconciles the two.
+    """
+
+    project = models.OneToOneField(
+        Project, on_delete=models.CASCADE, primary_key=True, related_name="ledger"
+    )
+    labor = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal("0.00"))
+    materials = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal("0.00"))
+    payments = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal("0.00"))
+    balance = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal("0.00"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Job ledger"
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"Ledger for {self.project}"
+
+    def totals(self) -> ProjectTotals:
+        return ProjectTotals(
+            labor=self.labor, materials=self.materials, payments=self.payments, balance=self.balance
+        )
+
+    @classmethod
+    def totals_for(cls, project: Project) -> ProjectTotals:
+        """Return ledger totals with one primary-key read, building the row if missing."""
+        try:
+            return cls.objects.get(pk=project.pk).totals()
+        except cls.DoesNotExist:
+            return cls.rebuild(project).totals()
+
+    @classmethod
+    async def atotals_for(cls, project: Project) -> ProjectTotals:
+        try:
+            return (await cls.objects.aget(pk=project.pk)).totals()
+        except cls.DoesNotExist:
+            return (await sync_to_async(cls.rebuild)(project)).totals()
+
+    @classmethod
+    def rebuild(cls, project: Project, totals: Optional[ProjectTotals] = None) -> "ProjectLedger":
+        totals = totals or ProjectTotals.for_project(project)
+        ledger, _ = cls.objects.update_or_create(
+            project=project,
+            defaults={
+                "labor": totals.labor,
+                "materials": totals.materials,
+                "payments": totals.payments,
+                "balance": totals.balance,
+            },
+        )
+        return ledger
+
+    @classmethod
+    def refresh(cls, project_id: int, components: Iterable[str] = LEDGER_COMPONENTS) -> None:
+        """Recompute ``components`` for an existing ledger row in place.
+
+        Only rows that already exist are updated, so hooks fired while a
+        project is being cascade-deleted never resurrect its ledger. An
+        archived job's frozen summary is added to its live entries.
+
+        The row is locked before the sums are read, so concurrent refreshes
+        of one job run one after the other and the last one to write has
+        seen every committed entry.
+        """
+        components = tuple(components)
+        if not components:
+            return
+        with transaction.atomic():
+            if not cls.objects.select_for_update().filter(pk=project_id).values_list("pk", flat=True):
+                return
+            values = {name: LEDGER_COMPONENTS[name](project_id) for name in components}
+            frozen = ArchivedProjectSummary.objects.filter(pk=project_id)
+            values = {
+                name: value + Coalesce(models.Subquery(frozen.values(name)[:1]), ZERO, output_field=MONEY_FIELD)
+                for name, value in values.items()
+            }
+            amount = {name: values.get(name, models.F(name)) for name in LEDGER_COMPONENTS}
+            cls.objects.filter(pk=project_id).update(
+                balance=amount["labor"] + amount["materials"] - amount["payments"],
+                updated_at=timezone.now(),
+                **values,
+            )
+
+
+def _sum_by_month(queryset: models.QuerySet, field: str, places: Decimal) -> Dict[Tuple[int, object], Decimal]:
+    """Like :func:`_sum_by_project` but grouped by project and calendar month."""
+    rows = (
+        queryset.order_by()
+        .annotate(month=TruncMonth("date"))
+        .values("project_id", "month")
+        .annotate(s=models.Sum(field))
+        .values_list("project_id", "month", "s")
+    )
+    return {(pid, month): total.quantize(places) for pid, month, total in rows if total is not None}
+
+
+ROLLUP_SOURCES = {
+    "labor": lambda where: _sum_by_month(WorkEntry.objects.filter(where).with_cost(), "cost", COST_PLACES),
+    "materials": lambda where: _sum_by_month(
+        MaterialEntry.objects.filter(where).with_cost(), "sell_price", COST_PLACES
+    ),
+    "payments": lambda where: _sum_by_month(Payment.objects.filter(where), "amount", AMOUNT_PLACES),
+}
+
+
+def _month_starts(days: Iterable[date]) -> List[date]:
+    return sorted({day.replace(day=1) for day in days})
+
+
+def _in_months(months: Iterable[date]) -> models.Q:
+    """Entries dated inside any of ``months`` (first days of months)."""
+    where = models.Q()
+    for month in months:
+        following = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        where |= models.Q(date__gte=month, date__lt=following)
+    return where
+
+
+class MonthlyRollup(models.Model):
+    """Billed and paid amounts for one project and calendar month.
+
+    Optional: maintained by the write hooks in ``core.signals`` only when
+    ``settings.RECEIVABLES_ROLLUP`` is on, after which the receivables report
+    reads monthly summaries from here instead of scanning the entries.
+    ``manage.py rebuild_ledger --rollups`` fills or reconciles the table.
+    """
+
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="monthly_rollups", db_index=False
+    )
+    month = models.DateField()
+    labor = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal("0.00"))
+    materials = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal("0.00"))
+    payments = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal("0.00"))
+
+    class Meta:
+        verbose_name = "Monthly rollup"
+        ordering = ["project", "month"]
+        constraints = [
+            # Also serves per-project lookups, so the FK needs no index of its own.
+            models.UniqueConstraint(fields=["project", "month"], name="rollup_project_month_uniq"),
+        ]
+        indexes = [models.Index(fields=["month"], name="rollup_month_idx")]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.project} {self.month:%Y-%m}"
+
+    @classmethod
+    def live(
+        cls,
+        project_ids: Iterable[int],
+        components: Iterable[str] = LEDGER_COMPONENTS,
+        months: Optional[Iterable[date]] = None,
+    ) -> Dict[Tuple[int, object], Dict[str, Decimal]]:
+        """Month totals computed from the entries, one grouped query per component.
+
+        ``months`` (first days of months) limits the sums to those months.
+        """
+        where = models.Q(project_id__in=list(project_ids))
+        if months is not None:
+            where &= _in_months(months)
+        totals: Dict[Tuple[int, object], Dict[str, Decimal]] = {}
+        for name in components:
+            for key, total in ROLLUP_SOURCES[name](where).items():
+                totals.setdefault(key, {})[name] = total
+        return totals
+
+    @classmethod
+    def refresh(
+        cls,
+        project_ids: Iterable[int],
+        components: Iterable[str] = LEDGER_COMPONENTS,
+        dates: Optional[Iterable[date]] = None,
+    ) -> None:
+        """Recompute ``components`` of ``project_ids`` in place.
+
+        With ``dates`` (the entry dates a write touched) only their months
+        are recomputed; otherwise every month is. Months that no longer
+        have entries are zeroed and then dropped. Like
+        :meth:`ProjectLedger.refresh`, a project whose entries are being
+        cascade-deleted only ever loses months, so nothing is resurrected.
+        """
+        project_ids = list(project_ids)
+        components = tuple(components)
+        months = None if dates is None else _month_starts(dates)
+        if not project_ids or not components or months == []:
+            return
+        live = cls.live(project_ids, components, months)
+        stored = cls.objects.filter(project_id__in=project_ids)
+        if months is not None:
+            stored = stored.filter(month__in=months)
+        keys = set(live).union(stored.values_list("project_id", "month"))
+        zero = Decimal("0.00")
+        rows = []
+        for pid, month in keys:
+            amounts = live.get((pid, month), {})
+            rows.append(cls(project_id=pid, month=month, **{name: amounts.get(name, zero) for name in components}))
+        cls.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=["project", "month"], update_fields=list(components)
+        )
+        stored.filter(labor=0, materials=0, payments=0).delete()
+
+
+class Invoice(models.Model):
+    """A frozen bill for one job's unbilled entries dated through ``period_end``.
+
+    Lines and totals are written once by :func:`core.invoicing.generate_invoices`,
+    with labor priced at the effective rate of the day, and are never
+    recomputed, so later rate changes do not move an issued invoice. Each
+    billed entry points at its invoice; an entry back-dated into an invoiced
+    period stays unbilled and goes on the next invoice.
+    """
+
+    project = models.ForeignKey(Project, on_delete=models.PROTECT, related_name="invoices")
+    client_name = models.CharField(max_length=200)
+    project_name = models.CharField(max_length=200)
+    issued_on = models.DateField(default=timezone.localdate)
+    # None: from the job's first entry
+    period_start = models.DateField(null=True, blank=True)
+    period_end = models.DateField()
+    labor = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    materials = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    # Running figures for the job through period_end, for the "balance due" line.
+    payments_to_date = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    balance_due = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-issued_on", "-id"]
+        indexes = [models.Index(fields=["project", "-period_end"], name="invoice_project_period_idx")]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.number} — {self.client_name} / {self.project_name}"
+
+    @property
+    def number(self) -> str:
+        return f"INV-{self.pk:06d}"
+
+
+class InvoiceLine(models.Model):
+    """One compact line of an invoice: an asset at its rate, or a material at its unit cost."""
+
+    LABOR = "labor"
+    MATERIAL = "material"
+    KIND_CHOICES = [(LABOR, "Labor & Equipment"), (MATERIAL, "Materials")]
+
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name="lines")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    description = models.CharField(max_length=200)
+    first_date = models.DateField()
+    last_date = models.DateField()
+    quantity = models.DecimalField(max_digits=14, decimal_places=2)
+    rate = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        ordering = ["invoice", "id"]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.invoice.number}: {self.description}"
+
+
+class BackgroundTask(models.Model):
+    """A unit of slow work queued by a view and run by ``manage.py run_tasks``.
+
+    ``name`` picks the function registered in :mod:`core.tasks` and
+    ``params`` are its keyword arguments. Workers claim queued rows one at a
+    time, report progress into the row as they go, and leave any file they
+    produce in the default storage, named in ``output_file``, for the status
+    page to download.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    name = models.CharField(max_length=100)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    # Not claimed before this; pushed back after a failed attempt.
+    run_after = models.DateTimeField(default=timezone.now)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=200, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    # Refreshed by progress reports; a running task that stops reporting is requeued.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    output_name = models.CharField(max_length=200, blank=True)
+    output_type = models.CharField(max_length=100, blank=True)
+    output_file = models.FileField(upload_to="tasks/%Y/%m/", max_length=255, blank=True, editable=False)
+
+    class Meta:
+        verbose_name = "Background task"
+        ordering = ["-created_at", "-id"]
+        indexes = [models.Index(fields=["status", "run_after"], name="task_status_run_after_idx")]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.name} #{self.pk} ({self.status})"
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.DONE, self.FAILED)
+
+    @property
+    def percent(self) -> Optional[int]:
+        if not self.total:
+            return 100 if self.status == self.DONE else None
+        return min(100, self.progress * 100 // self.total)
+
+
+class BackfillRun(models.Model):
+    """Checkpoint of one named backfill in :mod:`core.backfill`.
+
+    Written in the same transaction as each chunk, so an interrupted run
+    resumes right after the last chunk that committed.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    # Rows with pk in (min_pk, max_pk] as of the first chunk are covered.
+    min_pk = models.BigIntegerField(null=True, blank=True)
+    max_pk = models.BigIntegerField(null=True, blank=True)
+    last_pk = models.BigIntegerField(null=True, blank=True)
+    rows = models.PositiveBigIntegerField(default=0)
+    batches = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Backfill run"
+        ordering = ["name"]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return self.name
+
+    @property
+    def percent(self) -> Optional[int]:
+        if self.finished_at:
+            return 100
+        if self.max_pk is None or self.min_pk is None:
+            return None
+        done = (self.last_pk if self.last_pk is not None else self.min_pk) - self.min_pk
+        return min(100, done * 100 // max(self.max_pk - self.min_pk, 1))
+
+
+# ---------- Archive of closed jobs (see core/archive.py) ----------
+class ArchivedProjectSummary(models.Model):
+    """Frozen totals of an archived job, taken when its entries were archived.
+
+    Whole-job totals of archived jobs are read from here, so they don't
+    depend on the archive tables or on rates changed after archiving.
+    """
+
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name="archive")
+    labor = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal("0.00"))
+    materials = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal("0.00"))
+    payments = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal("0.00"))
+    balance = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal("0.00"))
+    work_entries = models.PositiveIntegerField(default=0)
+    material_entries = models.PositiveIntegerField(default=0)
+    payment_entries = models.PositiveIntegerField(default=0)
+    first_date = models.DateField(null=True, blank=True)
+    last_date = models.DateField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archived job summary"
+        verbose_name_plural = "Archived job summaries"
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"Archive of {self.project}"
+
+
+class ArchivedWorkEntry(models.Model):
+    """A :class:`WorkEntry` of an archived job, priced at its rate on the day it was archived."""
+
+    # The original entry's id, kept so a restore puts the row back unchanged.
+    id = models.BigIntegerField(primary_key=True)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="archived_work", db_index=False)
+    date = models.DateField()
+    hours = models.DecimalField(max_digits=7, decimal_places=2)
+    # why: cold rows; an asset delete may scan them rather than every insert paying for an index
+    asset = models.ForeignKey(Asset, on_delete=models.SET_NULL, null=True, blank=True, db_index=False, related_name="+")
+    notes = models.TextField(blank=True)
+    client_uuid = models.UUIDField(null=True, blank=True, editable=False)
+    invoice = models.ForeignKey(
+        Invoice, on_delete=models.SET_NULL, null=True, blank=True, db_index=False, related_name="+"
+    )
+    rate = models.DecimalField(max_digits=10, decimal_places=2)
+    cost = models.DecimalField(max_digits=20, decimal_places=4)
+
+    class Meta:
+        verbose_name = "Archived labor & equipment entry"
+        ordering = ["-date", "id"]
+        indexes = [models.Index(fields=["project", "-date", "id"], name="archivedwork_project_date_idx")]
+
+
+class ArchivedMaterialEntry(models.Model):
+    """A :class:`MaterialEntry` of an archived job, with its markup and sell price frozen."""
+
+    id = models.BigIntegerField(primary_key=True)
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="archived_materials", db_index=False
+    )
+    date = models.DateField()
+    description = models.CharField(max_length=200)
+    quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    markup_percent = models.DecimalField("markup %", max_digits=6, decimal_places=2, null=True, blank=True)
+    client_uuid = models.UUIDField(null=True, blank=True, editable=False)
+    invoice = models.ForeignKey(
+        Invoice, on_delete=models.SET_NULL, null=True, blank=True, db_index=False, related_name="+"
+    )
+    # The effective markup (entry's own or the job's default) and the amounts it gave.
+    markup = models.DecimalField(max_digits=6, decimal_places=2)
+    cost = models.DecimalField(max_digits=20, decimal_places=4)
+    sell_price = models.DecimalField(max_digits=20, decimal_places=4)
+
+    class Meta:
+        verbose_name = "Archived material entry"
+        ordering = ["-date", "id"]
+        indexes = [models.Index(fields=["project", "-date", "id"], name="archivedmat_project_date_idx")]
+
+    @property
+    def margin(self) -> Decimal:
+        return self.sell_price - self.cost
+
+
+class ArchivedPayment(models.Model):
+    """A :class:`Payment` of an archived job."""
+
+    id = models.BigIntegerField(primary_key=True)
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="archived_payments", db_index=False
+    )
+    date = models.DateField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    notes = models.TextField(blank=True)
+    client_uuid = models.UUIDField(null=True, blank=True, editable=False)
+
+    class Meta:
+        verbose_name = "Archived payment"
+        ordering = ["-date", "id"]
+        indexes = [models.Index(fields=["project", "-date", "id"], name="archivedpay_project_date_idx")]
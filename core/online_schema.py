@@ -0,0 +1,142 @@
+"""Schema changes that keep big tables writable while they run.
+
+Plain ``ALTER TABLE`` waits in the lock queue behind any long query and
+blocks every writer that queues up after it, so even an instant change can
+stall the entry tables for minutes. The helpers here:
+
+* run each statement in its own short transaction with a ``lock_timeout``
+  (PostgreSQL) and retry with backoff when the lock isn't granted, instead
+  of queueing indefinitely;
+* build indexes with ``CREATE INDEX CONCURRENTLY``, dropping the invalid
+  leftover of an interrupted build before retrying (migration 0017).
+
+Other backends get the plain statement. Helpers that must run outside a
+transaction (concurrent index builds) refuse to run inside one: call them
+from ``RunPython`` in a migration with ``atomic = False``, or from a
+management command. Data changes that go with a schema change belong in
+:mod:`core.backfill`.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Optional, Sequence
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, models, transaction
+
+LOCK_TIMEOUT_MS = 2000
+RETRIES = 8
+# First wait after a lock timeout, in seconds; doubled on each retry.
+RETRY_BACKOFF = 0.5
+# SQLSTATE lock_not_available, raised when lock_timeout expires.
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+def run_ddl(
+    sql: str,
+    params: Optional[Sequence[object]] = None,
+    using: str = DEFAULT_DB_ALIAS,
+    lock_timeout_ms: int = LOCK_TIMEOUT_MS,
+    retries: int = RETRIES,
+) -> None:
+    """Execute one DDL statement, giving up on its lock quickly and retrying later."""
+    conn = connections[using]
+    for attempt in range(retries + 1):
+        try:
+            with transaction.atomic(using=using), conn.cursor() as cursor:
+                if conn.vendor == "postgresql":
+                    _set_timeouts(cursor, lock_timeout_ms, local=True)
+                cursor.execute(sql, params)
+            return
+        except OperationalError as exc:
+            if attempt == retries or not _lock_timed_out(exc):
+                raise
+            time.sleep(RETRY_BACKOFF * 2**attempt)
+
+
+def column_exists(table: str, column: str, using: str = DEFAULT_DB_ALIAS) -> bool:
+    conn = connections[using]
+    with conn.cursor() as cursor:
+        if table not in conn.introspection.table_names(cursor):
+            return False
+        return column in {c.name for c in conn.introspection.get_table_description(cursor, table)}
+
+
+def index_exists(table: str, name: str, using: str = DEFAULT_DB_ALIAS) -> bool:
+    conn = connections[using]
+    with conn.cursor() as cursor:
+        return name in conn.introspection.get_constraints(cursor, table)
+
+
+def drop_column(table: str, column: str, using: str = DEFAULT_DB_ALIAS) -> bool:
+    """Drop ``table.column`` if present; returns whether it existed."""
+    if not column_exists(table, column, using):
+        return False
+    conn = connections[using]
+    qn = conn.ops.quote_name
+    # PostgreSQL also drops the column's constraints and indexes; SQLite refuses if any exist.
+    cascade = " CASCADE" if conn.vendor == "postgresql" else ""
+    run_ddl(f"ALTER TABLE {qn(table)} DROP COLUMN {qn(column)}{cascade}", using=using)
+    return True
+
+
+def add_index(model: type, index: models.Index, using: str = DEFAULT_DB_ALIAS) -> bool:
+    """Create ``index`` on ``model`` without blocking writes; returns False if it already exists."""
+    conn = connections[using]
+    table = model._meta.db_table
+    if conn.vendor != "postgresql":
+        if index_exists(table, index.name, using):
+            return False
+        with conn.schema_editor() as editor:
+            editor.add_index(model, index)
+        return True
+    if conn.in_atomic_block:
+        raise RuntimeError("CREATE INDEX CONCURRENTLY can't run in a transaction; use a non-atomic migration.")
+    qn = conn.ops.quote_name
+    with conn.schema_editor(atomic=False) as editor:
+        create = str(index.create_sql(model, editor, concurrently=True))
+    if _index_state(conn, index.name) == "valid":
+        return False
+    for attempt in range(RETRIES + 1):
+        with conn.cursor() as cursor:
+            try:
+                _set_timeouts(cursor, LOCK_TIMEOUT_MS, local=False)
+                # why: an interrupted concurrent build leaves an invalid index behind
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {qn(index.name)}")
+                cursor.execute(create)
+                return True
+            except OperationalError as exc:
+                if attempt == RETRIES or not _lock_timed_out(exc):
+                    raise
+            finally:
+                cursor.execute("RESET lock_timeout")
+                cursor.execute("RESET statement_timeout")
+        time.sleep(RETRY_BACKOFF * 2**attempt)
+    return True  # pragma: no cover - the loop returns or raises
+
+
+def _set_timeouts(cursor, lock_timeout_ms: int, local: bool) -> None:
+    # Statement timeouts are for web requests; a DDL step is bounded by its lock timeout instead.
+    cursor.execute(
+        "SELECT set_config('lock_timeout', %s, %s), set_config('statement_timeout', '0', %s)",
+        [f"{lock_timeout_ms}ms", local, local],
+    )
+
+
+def _index_state(conn, name: str) -> Optional[str]:
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = %s AND pg_catalog.pg_table_is_visible(c.oid)",
+            [name],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return "valid" if row[0] else "invalid"
+
+
+def _lock_timed_out(exc: OperationalError) -> bool:
+    cause = exc.__cause__
+    code = getattr(cause, "pgcode", None) or getattr(cause, "sqlstate", None)
+    return code == LOCK_NOT_AVAILABLE or "database is locked" in str(exc)
@@ -0,0 +1,125 @@
+"""Pagination for the entry logs.
+
+Every entry model orders by ``(-date, id)``; a cursor is the ``(date, id)`` of
+the last row shown, encoded as ``YYYY-MM-DD.<id>``. Fetching the next page is
+an index range scan from that point, so page 500 costs the same as page 1.
+
+The admin changelists page by number instead, and use
+:class:`EstimatedCountPaginator` so they don't count millions of rows per page.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.utils.functional import cached_property
+
+
+@dataclass
+class KeysetPage:
+    items: List[models.Model]
+    next_cursor: Optional[str]
+    is_first: bool
+
+
+def encode_cursor(obj: models.Model) -> str:
+    return f"{obj.date.isoformat()}.{obj.pk}"
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[date, int]]:
+    """Parse a cursor, returning ``None`` for missing or malformed values."""
+    if not cursor:
+        return None
+    day, _, pk = cursor.partition(".")
+    try:
+        return date.fromisoformat(day), int(pk)
+    except ValueError:
+        return None
+
+
+def normalize_cursor(cursor: Optional[str]) -> str:
+    """The canonical spelling of ``cursor``, or ``""`` for missing or malformed values."""
+    position = decode_cursor(cursor)
+    if position is None:
+        return ""
+    day, pk = position
+    return f"{day.isoformat()}.{pk}"
+
+
+def after_cursor(queryset: models.QuerySet, cursor: Optional[str]) -> models.QuerySet:
+    """Rows that follow ``cursor`` in ``(-date, id)`` order."""
+    position = decode_cursor(cursor)
+    if position is None:
+        return queryset
+    day, pk = position
+    return queryset.filter(models.Q(date__lt=day) | models.Q(date=day, pk__gt=pk))
+
+
+def keyset_page(queryset: models.QuerySet, cursor: Optional[str], per_page: int) -> KeysetPage:
+    """Return up to ``per_page`` rows after ``cursor`` plus the next cursor."""
+    rows = list(after_cursor(queryset.order_by("-date", "id"), cursor)[: per_page + 1])
+    return _page(rows, cursor, per_page)
+
+
+async def akeyset_page(queryset: models.QuerySet, cursor: Optional[str], per_page: int) -> KeysetPage:
+    """Async :func:`keyset_page`."""
+    rows = [obj async for obj in after_cursor(queryset.order_by("-date", "id"), cursor)[: per_page + 1]]
+    return _page(rows, cursor, per_page)
+
+
+def _page(rows: List[models.Model], cursor: Optional[str], per_page: int) -> KeysetPage:
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+    return KeysetPage(
+        items=items,
+        next_cursor=encode_cursor(items[-1]) if has_more else None,
+        is_first=decode_cursor(cursor) is None,
+    )
+
+
+def estimated_count(queryset: models.QuerySet) -> Optional[int]:
+    """PostgreSQL's row estimate for ``queryset``, or ``None`` where there isn't one.
+
+    An unfiltered queryset reads ``pg_class.reltuples`` (kept current by
+    autovacuum/ANALYZE); a filtered one asks the planner via ``EXPLAIN``.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+            # -1 until the table has been vacuumed or analyzed once.
+            return row[0] if row and row[0] >= 0 else None
+        sql, params = queryset.order_by().values("pk").query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that uses the planner's estimate instead of ``COUNT(*)`` for big results.
+
+    Above ``settings.ADMIN_COUNT_ESTIMATE_THRESHOLD`` rows the count (and so
+    the page links) is approximate; smaller results and other databases are
+    counted exactly.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        if isinstance(self.object_list, models.QuerySet):
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate > settings.ADMIN_COUNT_ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
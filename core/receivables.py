@@ -0,0 +1,245 @@
+"""Accounts-receivable summaries across clients and jobs.
+
+Billed amounts (labor plus materials at sell price) and payments are grouped by period
+with ``TruncMonth``/``TruncWeek``, and each job's balance is aged into
+0–30/31–60/61–90/90+ day buckets with conditional aggregation, so the work
+is done by the database however much history there is. Payments are applied
+to the oldest billed amounts first.
+
+Aging only scans the last 90 days of entries; everything older comes from
+the ledger. Monthly summaries read :class:`~core.models.MonthlyRollup`
+when ``settings.RECEIVABLES_ROLLUP`` is on.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.db import models
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .models import (
+    AMOUNT_PLACES,
+    COST_PLACES,
+    MaterialEntry,
+    MonthlyRollup,
+    Payment,
+    Project,
+    ProjectLedger,
+    ProjectTotals,
+    WorkEntry,
+)
+
+GRANULARITIES = {"month": TruncMonth, "week": TruncWeek}
+
+# (name, label, newest age in days, oldest age in days); ages are as_of - date.
+AGING_BUCKETS = [
+    ("current", "0–30 days", 0, 30),
+    ("days_31_60", "31–60 days", 31, 60),
+    ("days_61_90", "61–90 days", 61, 90),
+]
+OVER_90 = "over_90"
+BUCKET_NAMES = [name for name, *_ in AGING_BUCKETS] + [OVER_90]
+BUCKET_LABELS = [label for _name, label, *_ in AGING_BUCKETS] + ["Over 90 days"]
+
+ZERO = Decimal("0.00")
+
+
+@dataclass
+class PeriodTotals:
+    labor: Decimal = ZERO
+    materials: Decimal = ZERO
+    payments: Decimal = ZERO
+
+    @property
+    def billed(self) -> Decimal:
+        return self.labor + self.materials
+
+    @property
+    def net(self) -> Decimal:
+        return self.billed - self.payments
+
+    def add(self, other: "PeriodTotals") -> None:
+        self.labor += other.labor
+        self.materials += other.materials
+        self.payments += other.payments
+
+
+@dataclass
+class ProjectPeriods:
+    project: Project
+    periods: List[Tuple[date, PeriodTotals]]
+    total: PeriodTotals
+
+
+@dataclass
+class ClientPeriods:
+    client_name: str
+    projects: List[ProjectPeriods] = field(default_factory=list)
+    total: PeriodTotals = field(default_factory=PeriodTotals)
+
+
+@dataclass
+class AgingRow:
+    project: Project
+    buckets: Dict[str, Decimal]
+    # Payments beyond everything billed, shown as a credit on the account.
+    credit: Decimal
+
+    @property
+    def balance(self) -> Decimal:
+        return sum(self.buckets.values(), ZERO) - self.credit
+
+    @property
+    def bucket_list(self) -> List[Decimal]:
+        return [self.buckets[name] for name in BUCKET_NAMES]
+
+
+def period_bounds(start: date, end: date, granularity: str) -> Tuple[date, date]:
+    """Widen ``start``/``end`` to whole periods, so rollups and entries agree."""
+    if granularity == "week":
+        return start - timedelta(days=start.weekday()), end + timedelta(days=6 - end.weekday())
+    next_month = (end.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return start.replace(day=1), next_month - timedelta(days=1)
+
+
+def period_summary(
+    projects: models.QuerySet, start: date, end: date, granularity: str = "month"
+) -> List[ClientPeriods]:
+    """Billed and paid amounts per client, job and period between ``start`` and ``end``."""
+    selected = projects.order_by().values("pk")
+    start, end = period_bounds(start, end, granularity)
+    if granularity == "month" and settings.RECEIVABLES_ROLLUP:
+        cells = _rollup_cells(selected, start, end)
+    else:
+        cells = _entry_cells(selected, start, end, GRANULARITIES[granularity])
+
+    by_project: Dict[int, Dict[date, PeriodTotals]] = {}
+    for (pid, period), totals in cells.items():
+        by_project.setdefault(pid, {})[period] = totals
+
+    clients: Dict[int, ClientPeriods] = {}
+    for project in projects.filter(pk__in=by_project).select_related("client").order_by("client__name", "name"):
+        periods = sorted(by_project[project.pk].items())
+        total = PeriodTotals()
+        for _period, totals in periods:
+            total.add(totals)
+        group = clients.setdefault(project.client_id, ClientPeriods(client_name=project.client.name))
+        group.projects.append(ProjectPeriods(project=project, periods=periods, total=total))
+        group.total.add(total)
+    return list(clients.values())
+
+
+def _entry_cells(selected, start: date, end: date, trunc) -> Dict[Tuple[int, date], PeriodTotals]:
+    sources = {
+        "labor": (WorkEntry.objects.with_cost(), "cost", COST_PLACES),
+        "materials": (MaterialEntry.objects.with_cost(), "sell_price", COST_PLACES),
+        "payments": (Payment.objects.all(), "amount", AMOUNT_PLACES),
+    }
+    cells: Dict[Tuple[int, date], PeriodTotals] = {}
+    for name, (queryset, amount, places) in sources.items():
+        rows = (
+            queryset.filter(project_id__in=selected, date__range=(start, end))
+            .order_by()
+            .annotate(period=trunc("date"))
+            .values("project_id", "period")
+            .annotate(s=models.Sum(amount))
+            .values_list("project_id", "period", "s")
+        )
+        for pid, period, total in rows:
+            if total is not None:
+                setattr(cells.setdefault((pid, period), PeriodTotals()), name, total.quantize(places))
+    return cells
+
+
+def _rollup_cells(selected, start: date, end: date) -> Dict[Tuple[int, date], PeriodTotals]:
+    rows = MonthlyRollup.objects.filter(project_id__in=selected, month__range=(start, end)).values_list(
+        "project_id", "month", "labor", "materials", "payments"
+    )
+    return {
+        (pid, month): PeriodTotals(labor=labor, materials=materials, payments=payments)
+        for pid, month, labor, materials, payments in rows
+    }
+
+
+def aging(projects: models.QuerySet, as_of: date) -> List[AgingRow]:
+    """Outstanding balance per job as of ``as_of``, aged by entry date.
+
+    Billed amounts newer than 90 days are bucketed with one conditional
+    aggregate per entry table; the 90+ bucket is the ledger total minus
+    those buckets and anything dated after ``as_of``. Payments made by
+    ``as_of`` are then applied oldest bucket first.
+    """
+    selected = projects.order_by().values("pk")
+    window = models.Q(date__gte=as_of - timedelta(days=AGING_BUCKETS[-1][3]))
+    bucket_filters = {
+        name: models.Q(date__lte=as_of - timedelta(days=newest), date__gte=as_of - timedelta(days=oldest))
+        for name, _label, newest, oldest in AGING_BUCKETS
+    }
+    bucket_filters["later"] = models.Q(date__gt=as_of)
+
+    recent: Dict[int, Dict[str, Decimal]] = {}
+    billed = [(WorkEntry.objects.with_cost(), "cost"), (MaterialEntry.objects.with_cost(), "sell_price")]
+    for queryset, amount in billed:
+        rows = (
+            queryset.filter(window, project_id__in=selected)
+            .order_by()
+            .values("project_id")
+            .annotate(**{name: models.Sum(amount, filter=q) for name, q in bucket_filters.items()})
+        )
+        for row in rows:
+            sums = recent.setdefault(row.pop("project_id"), {})
+            for name, total in row.items():
+                sums[name] = sums.get(name, ZERO) + (total or ZERO)
+
+    paid_later = dict(
+        Payment.objects.filter(project_id__in=selected, date__gt=as_of)
+        .order_by()
+        .values("project_id")
+        .annotate(s=models.Sum("amount"))
+        .values_list("project_id", "s")
+    )
+
+    project_list = list(projects.select_related("client").order_by("client__name", "name"))
+    totals = _ledger_totals(project_list)
+    rows = []
+    for project in project_list:
+        job = totals[project.pk]
+        sums = recent.get(project.pk, {})
+        buckets = {name: sums.get(name, ZERO) for name, *_ in AGING_BUCKETS}
+        buckets[OVER_90] = job.labor + job.materials - sum(buckets.values(), ZERO) - sums.get("later", ZERO)
+        paid = job.payments - (paid_later.get(project.pk) or ZERO)
+        for name in reversed(BUCKET_NAMES):
+            applied = min(paid, buckets[name]) if buckets[name] > 0 else ZERO
+            buckets[name] -= applied
+            paid -= applied
+        rows.append(
+            AgingRow(
+                project=project,
+                buckets={name: amount.quantize(AMOUNT_PLACES) for name, amount in buckets.items()},
+                credit=max(paid, ZERO).quantize(AMOUNT_PLACES),
+            )
+        )
+    return rows
+
+
+def _ledger_totals(projects: List[Project]) -> Dict[int, ProjectTotals]:
+    """Ledger totals for ``projects``, computing live ones for any missing row."""
+    ids = [p.pk for p in projects]
+    totals = {ledger.pk: ledger.totals() for ledger in ProjectLedger.objects.filter(pk__in=ids)}
+    missing = [pid for pid in ids if pid not in totals]
+    if missing:
+        totals.update(ProjectTotals.for_projects(Project.objects.filter(pk__in=missing)))
+    return totals
+
+
+def aging_summary(rows: List[AgingRow]) -> Dict[str, object]:
+    return {
+        "bucket_list": [sum((row.buckets[name] for row in rows), ZERO) for name in BUCKET_NAMES],
+        "credit": sum((row.credit for row in rows), ZERO),
+        "balance": sum((row.balance for row in rows), ZERO),
+    }
@@ -0,0 +1,173 @@
+"""Per-project cache for report totals and rendered report fragments.
+
+Every cached value is keyed by a per-project version stamp. The write hooks
+in :mod:`core.signals` replace the stamp whenever anything that feeds a
+job's report changes, which orphans all of that job's entries at once; the
+orphans simply age out. Stamps are random rather than counters so an evicted
+stamp can never be recreated with a value that matches stale fragments.
+
+Totals for closed periods (ones that ended before the current month) are
+kept under a separate per-project history stamp instead, which only changes
+when a write touches an entry dated before the current month (or when the
+dates involved are unknown, e.g. a rate change). Everyday entry keeps those
+snapshots warm.
+
+Values are built on the primary even inside a replica-routed view (see
+:mod:`core.routers`), so replica lag never ends up in the cache.
+
+Use a shared backend (``JOBTOOL_CACHE=db`` or ``file``) when running more
+than one worker process, otherwise each process keeps its own stamps.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import date
+from typing import Awaitable, Callable, Iterable, Optional, TypeVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .routers import primary_reads
+
+T = TypeVar("T")
+
+KEY_PREFIX = "jobtool:project"
+
+
+def _version_key(project_id: int) -> str:
+    return f"{KEY_PREFIX}:{project_id}:version"
+
+
+def _history_key(project_id: int) -> str:
+    return f"{KEY_PREFIX}:{project_id}:history"
+
+
+def _stamp(key: str) -> str:
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        # add() so two racing requests settle on a single stamp
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key) or version
+    return version
+
+
+def project_version(project_id: int) -> str:
+    return _stamp(_version_key(project_id))
+
+
+def closed_before() -> date:
+    """Periods ending before this day (the first of the current month) are closed."""
+    return timezone.localdate().replace(day=1)
+
+
+def is_closed(end: Optional[date]) -> bool:
+    return end is not None and end < closed_before()
+
+
+def bump_project_versions(project_ids: Iterable[int], earliest: Optional[date] = None) -> None:
+    """Invalidate every cached fragment for ``project_ids``.
+
+    ``earliest`` is the oldest entry date the write touched; when it falls
+    in a closed period, or is unknown, closed-period snapshots go too.
+
+    The stamps are replaced immediately and again when the surrounding
+    transaction commits, so a report rebuilt from not-yet-committed data by
+    a concurrent request cannot outlive the commit.
+    """
+    project_ids = list(project_ids)
+    if not project_ids:
+        return
+    keys = [_version_key(pid) for pid in project_ids]
+    if earliest is None or earliest < closed_before():
+        keys += [_history_key(pid) for pid in project_ids]
+
+    def bump() -> None:
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, timeout=None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+async def _astamp(key: str) -> str:
+    version = await cache.aget(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not await cache.aadd(key, version, timeout=None):
+            version = await cache.aget(key) or version
+    return version
+
+
+async def aproject_version(project_id: int) -> str:
+    return await _astamp(_version_key(project_id))
+
+
+def for_project(project_id: int, name: str, build: Callable[[], T], timeout: Optional[int] = None) -> T:
+    """Return the cached ``name`` for the project's current version, building it on a miss."""
+    key = f"{KEY_PREFIX}:{project_id}:{project_version(project_id)}:{name}"
+    value = cache.get(key)
+    if value is None:
+        with primary_reads():
+            value = build()
+        cache.set(key, value, timeout=settings.REPORT_CACHE_TIMEOUT if timeout is None else timeout)
+    return value
+
+
+async def afor_project(
+    project_id: int, name: str, build: Callable[[], Awaitable[T]], timeout: Optional[int] = None
+) -> T:
+    """Async :func:`for_project`; ``build`` is a coroutine function."""
+    key = f"{KEY_PREFIX}:{project_id}:{await aproject_version(project_id)}:{name}"
+    value = await cache.aget(key)
+    if value is None:
+        with primary_reads():
+            value = await build()
+        await cache.aset(key, value, timeout=settings.REPORT_CACHE_TIMEOUT if timeout is None else timeout)
+    return value
+
+
+def _period_name(name: str, start: Optional[date], end: Optional[date]) -> str:
+    return f"{name}:{start or ''}:{end or ''}"
+
+
+def _closed_key(project_id: int, stamp: str, name: str) -> str:
+    return f"{KEY_PREFIX}:{project_id}:closed:{stamp}:{name}"
+
+
+def for_period(
+    project_id: int, name: str, start: Optional[date], end: Optional[date], build: Callable[[], T]
+) -> T:
+    """Like :func:`for_project` for a value computed over entries dated ``start``–``end``.
+
+    Snapshots of closed periods survive writes to current entries and are
+    kept for ``REPORT_CLOSED_PERIOD_TIMEOUT``.
+    """
+    name = _period_name(name, start, end)
+    if not is_closed(end):
+        return for_project(project_id, name, build)
+    key = _closed_key(project_id, _stamp(_history_key(project_id)), name)
+    value = cache.get(key)
+    if value is None:
+        with primary_reads():
+            value = build()
+        cache.set(key, value, timeout=settings.REPORT_CLOSED_PERIOD_TIMEOUT)
+    return value
+
+
+async def afor_period(
+    project_id: int, name: str, start: Optional[date], end: Optional[date], build: Callable[[], Awaitable[T]]
+) -> T:
+    """Async :func:`for_period`; ``build`` is a coroutine function."""
+    name = _period_name(name, start, end)
+    if not is_closed(end):
+        return await afor_project(project_id, name, build)
+    key = _closed_key(project_id, await _astamp(_history_key(project_id)), name)
+    value = await cache.aget(key)
+    if value is None:
+        with primary_reads():
+            value = await build()
+        await cache.aset(key, value, timeout=settings.REPORT_CLOSED_PERIOD_TIMEOUT)
+    return value
@@ -0,0 +1,112 @@
+"""Read-replica routing for report traffic.
+
+Reads of job data made inside :func:`use_replica` (a view decorator or a
+context manager) go to the ``replica`` database alias when one is
+configured (``DATABASE_REPLICA_URL``); everything else, and every write,
+uses ``default``. The flag lives in a context variable, so it follows a
+request through async views and ``sync_to_async`` calls without leaking
+into other requests. Sessions, auth and the cache table always stay on the
+primary, so logins and report version stamps never read stale rows.
+
+Values stored in the report cache are always built on the primary (see
+:func:`primary_reads`): a write bumps the job's cache stamp at commit, and
+a replica that has not replayed the write yet would otherwise cache its
+stale rows under the new stamp until the next write.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import AsyncIterator, Iterator, Optional
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+REPLICA = "replica"
+ROUTED_APPS = {"core"}
+
+_use_replica: ContextVar[bool] = ContextVar("jobtool_use_replica", default=False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        if _use_replica.get() and model._meta.app_label in ROUTED_APPS and REPLICA in settings.DATABASES:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints) -> Optional[str]:
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
+        # The replica holds the same rows as the primary.
+        return True
+
+
+@contextmanager
+def replica_reads() -> Iterator[None]:
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+@contextmanager
+def primary_reads() -> Iterator[None]:
+    """Read from ``default`` inside a :func:`use_replica` block."""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def use_replica(view):
+    """Decorate a (sync or async) view so its reads, streamed content included, use the replica."""
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            with replica_reads():
+                response = await view(*args, **kwargs)
+            return _stream_from_replica(response)
+
+    else:
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            with replica_reads():
+                response = view(*args, **kwargs)
+            return _stream_from_replica(response)
+
+    return wrapper
+
+
+def _stream_from_replica(response):
+    # why: streamed rows are queried while the server iterates, after the view returned
+    if getattr(response, "streaming", False):
+        content = response.streaming_content
+        response.streaming_content = _achunks(content) if response.is_async else _chunks(content)
+    return response
+
+
+def _chunks(content: Iterator[bytes]) -> Iterator[bytes]:
+    content = iter(content)
+    while True:
+        with replica_reads():
+            chunk = next(content, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+async def _achunks(content: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    content = aiter(content)
+    while True:
+        with replica_reads():
+            chunk = await anext(content, None)
+        if chunk is None:
+            return
+        yield chunk
@@ -0,0 +1,181 @@
+"""Full-text search over names, notes and descriptions.
+
+Each searchable model lists the text columns it is matched on in
+:data:`SOURCES`. On PostgreSQL those columns are matched with a
+``SearchVector`` against a ``websearch`` query and ranked with
+``SearchRank``; migration ``0008_search_indexes`` adds a GIN index on the
+very same vector expression, so a search is an index lookup rather than a
+scan of every log line. On SQLite they are mirrored into FTS5 tables
+(``<table>_fts``) kept current by triggers and ranked with ``bm25``; the
+tables and triggers are installed after every ``migrate``. Any other
+backend, or an SQLite build without FTS5, falls back to ``icontains``.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections, models
+
+from .models import Asset, Client, MaterialEntry, Payment, Project, WorkEntry
+
+# Text search configuration; 0008_search_indexes builds its GIN indexes with the same one.
+CONFIG = "english"
+RESULTS_PER_KIND = 20
+
+
+@dataclass(frozen=True)
+class Source:
+    kind: str
+    label: str
+    model: type
+    fields: Tuple[str, ...]
+    related: Tuple[str, ...] = ()
+
+    @property
+    def fts_table(self) -> str:
+        return f"{self.model._meta.db_table}_fts"
+
+    @property
+    def columns(self) -> List[str]:
+        return [self.model._meta.get_field(name).column for name in self.fields]
+
+
+SOURCES = [
+    Source("clients", "Clients", Client, ("name",)),
+    Source("jobs", "Jobs", Project, ("name", "location"), ("client",)),
+    Source("assets", "Assets", Asset, ("name",), ("client",)),
+    Source("work", "Labor & Equipment", WorkEntry, ("notes",), ("project__client", "asset")),
+    Source("materials", "Materials", MaterialEntry, ("description",), ("project__client",)),
+    Source("payments", "Payments", Payment, ("notes",), ("project__client",)),
+]
+
+
+@dataclass
+class Hit:
+    obj: models.Model
+    # Higher is better; only comparable within one source.
+    rank: Optional[float]
+
+
+@dataclass
+class ResultGroup:
+    source: Source
+    hits: List[Hit]
+
+
+def search(query: str, limit: int = RESULTS_PER_KIND) -> List[ResultGroup]:
+    """The best ``limit`` matches for ``query`` from each source that has any."""
+    query = query.strip()
+    if not query:
+        return []
+    hits_for = _backend()
+    groups = []
+    for source in SOURCES:
+        hits = hits_for(source, query, limit)
+        if hits:
+            groups.append(ResultGroup(source=source, hits=hits))
+    return groups
+
+
+def _backend() -> Callable[[Source, str, int], List[Hit]]:
+    if connection.vendor == "postgresql":
+        return _postgres_hits
+    if connection.vendor == "sqlite" and _sqlite_index_installed():
+        return _sqlite_hits
+    return _fallback_hits
+
+
+def _postgres_hits(source: Source, query: str, limit: int) -> List[Hit]:
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+    vector = SearchVector(*source.fields, config=CONFIG)
+    search_query = SearchQuery(query, config=CONFIG, search_type="websearch")
+    rows = (
+        source.model.objects.select_related(*source.related)
+        .annotate(search=vector, rank=SearchRank(vector, search_query))
+        .filter(search=search_query)
+        .order_by("-rank", "-pk")[:limit]
+    )
+    return [Hit(obj=obj, rank=obj.rank) for obj in rows]
+
+
+def _sqlite_hits(source: Source, query: str, limit: int) -> List[Hit]:
+    match = _fts_query(query)
+    if not match:
+        return []
+    table = source.fts_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, bm25({table}) FROM {table} WHERE {table} MATCH %s ORDER BY bm25({table}) LIMIT %s",
+            [match, limit],
+        )
+        ranked = cursor.fetchall()
+    objs = source.model.objects.select_related(*source.related).in_bulk([pk for pk, _score in ranked])
+    # bm25() is lower-is-better, so flip the sign.
+    return [Hit(obj=objs[pk], rank=-score) for pk, score in ranked if pk in objs]
+
+
+def _fts_query(query: str) -> str:
+    """Quote each word so user input can't use (or break) FTS5 query syntax."""
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", query))
+
+
+def _fallback_hits(source: Source, query: str, limit: int) -> List[Hit]:
+    matches = models.Q()
+    for word in query.split():
+        any_field = models.Q()
+        for name in source.fields:
+            any_field |= models.Q(**{f"{name}__icontains": word})
+        matches &= any_field
+    rows = source.model.objects.select_related(*source.related).filter(matches).order_by("-pk")[:limit]
+    return [Hit(obj=obj, rank=None) for obj in rows]
+
+
+def _sqlite_index_installed() -> bool:
+    tables = set(connection.introspection.table_names(include_views=False))
+    return all(source.fts_table in tables for source in SOURCES)
+
+
+def install_sqlite_index(using: str = DEFAULT_DB_ALIAS, **kwargs) -> None:
+    """Create the FTS5 tables and their sync triggers on an SQLite database.
+
+    Connected to ``post_migrate``. Safe to run repeatedly: existing tables
+    and triggers are kept, and a table is only rebuilt from its source when
+    a trigger was missing (new install, or a migration that remade the
+    source table and dropped its triggers).
+    """
+    conn = connections[using]
+    if conn.vendor != "sqlite":
+        return
+    with conn.cursor() as cursor:
+        for source in SOURCES:
+            table, fts = source.model._meta.db_table, source.fts_table
+            cols = ", ".join(source.columns)
+            new = ", ".join(f"new.{col}" for col in source.columns)
+            old = ", ".join(f"old.{col}" for col in source.columns)
+            remove = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+            add = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});"
+            triggers = {
+                f"{fts}_ai": f"AFTER INSERT ON {table} BEGIN {add} END",
+                f"{fts}_ad": f"AFTER DELETE ON {table} BEGIN {remove} END",
+                f"{fts}_au": f"AFTER UPDATE ON {table} BEGIN {remove} {add} END",
+            }
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [table]
+            )
+            existing = {name for (name,) in cursor.fetchall()}
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                    f"{cols}, content='{table}', content_rowid='id', tokenize='porter unicode61')"
+                )
+            except OperationalError:
+                return  # no FTS5 in this SQLite build; search uses icontains
+            missing = [name for name in triggers if name not in existing]
+            for name in missing:
+                cursor.execute(f"CREATE TRIGGER {name} {triggers[name]}")
+            if missing:
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
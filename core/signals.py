@@ -0,0 +1,179 @@
+"""Write hooks that keep denormalized per-project data current.
+
+Every save or delete of an entry, rate override or project funnels into
+:func:`projects_changed`, which refreshes the ledger (and the monthly
+rollups, when enabled) and invalidates the project's cached report. Code
+paths that bypass model signals (``bulk_create``, ``QuerySet.update``) must
+call it themselves once they are done writing.
+
+Deletes are batched: a project or queryset delete sends ``post_delete``
+once per row, so each row only records its job, and every job is refreshed
+once when the transaction commits.
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import date
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import choices, report_cache
+from .models import (
+    LEDGER_COMPONENTS,
+    Asset,
+    Client,
+    MaterialEntry,
+    MonthlyRollup,
+    Payment,
+    Project,
+    ProjectLedger,
+    RateOverride,
+    WorkEntry,
+)
+
+# Which ledger component each model feeds.
+COMPONENT_BY_MODEL = {
+    WorkEntry: "labor",
+    RateOverride: "labor",
+    MaterialEntry: "materials",
+    Payment: "payments",
+}
+
+
+def projects_changed(
+    project_ids: Iterable[int],
+    components: Iterable[str] = LEDGER_COMPONENTS,
+    dates: Optional[Iterable[date]] = None,
+) -> None:
+    """Refresh derived data for ``project_ids`` after their entries changed.
+
+    Pass ``dates``, the entry dates written (old and new, for an edit), when
+    they are known: only those months' rollups are recomputed, and cached
+    totals of untouched closed periods are kept.
+    """
+    components = tuple(components)
+    project_ids = {pid for pid in project_ids if pid is not None}
+    dates = None if dates is None else {day for day in dates if day is not None}
+    for project_id in project_ids:
+        ProjectLedger.refresh(project_id, components)
+    if settings.RECEIVABLES_ROLLUP:
+        MonthlyRollup.refresh(project_ids, components, dates)
+    report_cache.bump_project_versions(project_ids, min(dates) if dates else None)
+
+
+def _entry_date(instance) -> Optional[date]:
+    # why: an unsaved default of timezone.now is a datetime; normalize it like the field does
+    value = getattr(instance, "date", None)
+    return None if value is None else instance._meta.get_field("date").to_python(value)
+
+
+@receiver(pre_save, sender=WorkEntry)
+@receiver(pre_save, sender=MaterialEntry)
+@receiver(pre_save, sender=Payment)
+@receiver(pre_save, sender=RateOverride)
+def _remember_previous_project(sender, instance, **kwargs) -> None:
+    # why: an edit can move a row to another job or date; both sides need refreshing
+    instance._previous_project_id = None
+    instance._previous_date = None
+    if instance.pk and not kwargs.get("raw"):
+        fields = ["project_id"] + (["date"] if sender is not RateOverride else [])
+        previous = sender.objects.filter(pk=instance.pk).values(*fields).first() or {}
+        instance._previous_project_id = previous.get("project_id")
+        instance._previous_date = previous.get("date")
+
+
+@receiver(post_save, sender=WorkEntry)
+@receiver(post_save, sender=MaterialEntry)
+@receiver(post_save, sender=Payment)
+@receiver(post_save, sender=RateOverride)
+def _entry_saved(sender, instance, raw=False, **kwargs) -> None:
+    if raw:
+        return
+    previous = getattr(instance, "_previous_project_id", None)
+    dates = [d for d in (_entry_date(instance), getattr(instance, "_previous_date", None)) if d is not None]
+    # Rate overrides have no date and reprice every entry, so every month is refreshed.
+    projects_changed({instance.project_id, previous}, [COMPONENT_BY_MODEL[sender]], dates or None)
+
+
+# Jobs with deleted rows awaiting a refresh, per thread: project id -> (components, dates),
+# where a None date means every month.
+_deletes = threading.local()
+
+
+@receiver(post_delete, sender=WorkEntry)
+@receiver(post_delete, sender=MaterialEntry)
+@receiver(post_delete, sender=Payment)
+@receiver(post_delete, sender=RateOverride)
+def _entry_deleted(sender, instance, **kwargs) -> None:
+    pending: Dict[int, Tuple[Set[str], Set[Optional[date]]]] = _deletes.__dict__.setdefault("pending", {})
+    components, dates = pending.setdefault(instance.project_id, (set(), set()))
+    components.add(COMPONENT_BY_MODEL[sender])
+    dates.add(_entry_date(instance))
+    if not _flush_scheduled():
+        transaction.on_commit(_flush_deletes)
+
+
+def _flush_scheduled() -> bool:
+    # why: a callback registered in a savepoint (or transaction) that rolled back is dropped from this list
+    live = set(connection.savepoint_ids)
+    return any(
+        callback[1] is _flush_deletes and set(callback[0]) <= live for callback in connection.run_on_commit
+    )
+
+
+def _flush_deletes() -> None:
+    pending = _deletes.__dict__.pop("pending", {})
+    for project_id, (components, dates) in pending.items():
+        # Rows of a deleted job are gone with its ledger; the refresh finds nothing to update.
+        projects_changed([project_id], components, None if None in dates else dates)
+
+
+@receiver(post_save, sender=Project)
+def _project_saved(sender, instance, created, raw=False, **kwargs) -> None:
+    if raw:
+        return
+    if created:
+        ProjectLedger.objects.get_or_create(project=instance)
+    else:
+        # why: the project's hourly_rate and material markup are the fallbacks
+        # for un-overridden labor and materials
+        projects_changed([instance.pk], ["labor", "materials"])
+
+
+@receiver(post_delete, sender=Project)
+def _project_deleted(sender, instance, **kwargs) -> None:
+    report_cache.bump_project_versions([instance.pk])
+
+
+@receiver(post_save, sender=Asset)
+@receiver(post_delete, sender=Asset)
+def _asset_changed(sender, instance, **kwargs) -> None:
+    # why: asset names are rendered into the cached labor rows of the client's jobs
+    if instance.client_id and not kwargs.get("raw"):
+        report_cache.bump_project_versions(
+            Project.objects.filter(client_id=instance.client_id).values_list("pk", flat=True)
+        )
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def _project_choices_changed(sender, **kwargs) -> None:
+    choices.invalidate(choices.PROJECTS_KEY)
+
+
+@receiver(post_save, sender=Asset)
+@receiver(post_delete, sender=Asset)
+def _asset_choices_changed(sender, **kwargs) -> None:
+    choices.invalidate(choices.ASSETS_KEY)
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def _client_choices_changed(sender, **kwargs) -> None:
+    # why: client names appear in both job and asset labels
+    choices.invalidate()
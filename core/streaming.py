@@ -0,0 +1,47 @@
+"""Helpers for streaming large responses without buffering them in memory."""
+
+from __future__ import annotations
+
+from typing import AsyncIterator, Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, StreamingHttpResponse
+
+# Rows are joined into chunks of this many before being handed to the server.
+CHUNK_ROWS = 500
+
+
+def chunked(parts: Iterable[str], size: int = CHUNK_ROWS) -> Iterator[str]:
+    """Join consecutive ``parts`` into strings of ``size`` parts each."""
+    batch = []
+    for part in parts:
+        batch.append(part)
+        if len(batch) >= size:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+async def _pull(chunks: Iterator[str]) -> AsyncIterator[str]:
+    # why: thread_sensitive keeps every step on the thread that owns the DB
+    # cursor behind the generator's queryset iterator
+    step = sync_to_async(next, thread_sensitive=True)
+    sentinel = object()
+    while True:
+        chunk = await step(chunks, sentinel)
+        if chunk is sentinel:
+            return
+        yield chunk
+
+
+def streaming_response(request: HttpRequest, chunks: Iterator[str], **kwargs) -> StreamingHttpResponse:
+    """Stream ``chunks`` in whichever form the running server consumes lazily.
+
+    Under ASGI Django buffers synchronous iterators in full before sending,
+    so the generator is wrapped in an async iterator that pulls one chunk at
+    a time from the sync thread. Under WSGI the generator is used as-is.
+    """
+    content = _pull(iter(chunks)) if isinstance(request, ASGIRequest) else chunks
+    return StreamingHttpResponse(content, **kwargs)
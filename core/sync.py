@@ -0,0 +1,194 @@
+"""Batched, idempotent upload of entries recorded offline.
+
+The offline entry page (``/offline/``) queues labor, material and payment
+entries in the browser, each with a UUID generated on the device, and
+posts them to ``/api/sync/`` in batches once it has a connection. A batch
+is validated in one pass (jobs and assets are looked up once for the whole
+batch), written with one ``bulk_create`` per entry table and followed by a
+single totals refresh per table. Each UUID is stored in the entry's
+``client_uuid``; an entry whose UUID is already stored is reported as a
+duplicate instead of being written again, so a retry after a lost response
+is harmless.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .models import Asset, MaterialEntry, Payment, Project, WorkEntry
+from .signals import COMPONENT_BY_MODEL, projects_changed
+
+MAX_BATCH = 500
+# Cap on the decompressed request body.
+MAX_BODY_BYTES = 5 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class SyncKind:
+    model: type
+    fields: Tuple[str, ...]
+    uses_assets: bool = False
+
+
+KINDS: Dict[str, SyncKind] = {
+    "work": SyncKind(WorkEntry, ("hours", "notes"), uses_assets=True),
+    "materials": SyncKind(MaterialEntry, ("description", "quantity", "unit_cost", "markup_percent")),
+    "payments": SyncKind(Payment, ("amount", "notes")),
+}
+
+
+class SyncError(ValueError):
+    """The request as a whole is unusable (bad encoding, JSON or size)."""
+
+
+@dataclass
+class SyncResult:
+    accepted: List[str] = field(default_factory=list)
+    duplicates: List[str] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, object]:
+        return {"accepted": self.accepted, "duplicates": self.duplicates, "errors": self.errors}
+
+
+def parse_body(body: bytes, encoding: str = "") -> List[Dict[str, object]]:
+    """Decode a (possibly gzip-compressed) ``{"entries": [...]}`` request body."""
+    if encoding.strip().lower() == "gzip":
+        try:
+            with gzip.GzipFile(fileobj=io.BytesIO(body)) as stream:
+                body = stream.read(MAX_BODY_BYTES + 1)
+        except (OSError, EOFError) as exc:
+            raise SyncError("Body is not valid gzip.") from exc
+    if len(body) > MAX_BODY_BYTES:
+        raise SyncError("Body is too large.")
+    try:
+        payload = json.loads(body)
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise SyncError("Body is not valid JSON.") from exc
+    entries = payload.get("entries") if isinstance(payload, dict) else None
+    if not isinstance(entries, list) or not all(isinstance(item, dict) for item in entries):
+        raise SyncError('Expected {"entries": [...]}.')
+    if len(entries) > MAX_BATCH:
+        raise SyncError(f"At most {MAX_BATCH} entries per request.")
+    return entries
+
+
+def apply_batch(entries: List[Dict[str, object]]) -> SyncResult:
+    """Validate ``entries`` and store the new ones; see the module docstring."""
+    result = SyncResult()
+    pending: Dict[str, Dict[uuid.UUID, Dict[str, object]]] = {name: {} for name in KINDS}
+    for item in entries:
+        key = str(item.get("id", ""))
+        try:
+            client_uuid = uuid.UUID(key)
+        except ValueError:
+            result.errors[key] = "Missing or malformed id."
+            continue
+        kind = item.get("kind")
+        if kind not in KINDS:
+            result.errors[key] = "Unknown kind."
+            continue
+        if any(client_uuid in batch for batch in pending.values()):
+            result.duplicates.append(key)
+            continue
+        pending[kind][client_uuid] = item
+
+    projects = Project.objects.filter(
+        pk__in=_ids(item.get("project") for batch in pending.values() for item in batch.values()),
+        active=True,
+        archived_at__isnull=True,
+    ).in_bulk()
+    assets = Asset.objects.filter(
+        pk__in=_ids(item.get("asset") for item in pending["work"].values()), active=True
+    ).in_bulk()
+
+    with transaction.atomic():
+        for name, batch in pending.items():
+            if not batch:
+                continue
+            kind = KINDS[name]
+            stored = set(kind.model.objects.filter(client_uuid__in=list(batch)).values_list("client_uuid", flat=True))
+            valid = []
+            for client_uuid, item in batch.items():
+                key = str(client_uuid)
+                if client_uuid in stored:
+                    result.duplicates.append(key)
+                    continue
+                try:
+                    valid.append(_build(kind, client_uuid, item, projects, assets))
+                except ValidationError as exc:
+                    result.errors[key] = _error_text(exc)
+            inserted = _insert_new(kind.model, valid)
+            result.accepted.extend(str(obj.client_uuid) for obj in inserted)
+            stored_now = {obj.client_uuid for obj in inserted}
+            result.duplicates.extend(str(obj.client_uuid) for obj in valid if obj.client_uuid not in stored_now)
+            if not inserted:
+                continue
+            # bulk_create skips model signals; refresh derived totals once.
+            dates = {obj.date for obj in inserted}
+            projects_changed({obj.project_id for obj in inserted}, [COMPONENT_BY_MODEL[kind.model]], dates)
+    return result
+
+
+def _insert_new(model: type, objects: List) -> List:
+    """``bulk_create`` ``objects`` and return them, minus any whose UUID got stored meanwhile."""
+    while objects:
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(objects)
+            return objects
+        except IntegrityError:
+            # why: a concurrent retry of the same batch may have stored some ids since the lookup
+            stored = set(
+                model.objects.filter(client_uuid__in=[obj.client_uuid for obj in objects]).values_list(
+                    "client_uuid", flat=True
+                )
+            )
+            if not stored:
+                raise
+            objects = [obj for obj in objects if obj.client_uuid not in stored]
+    return objects
+
+
+def _ids(values) -> List[int]:
+    return [pk for pk in map(_int_or_none, values) if pk is not None]
+
+
+def _build(kind: SyncKind, client_uuid: uuid.UUID, item: Dict[str, object], projects, assets):
+    project = projects.get(_int_or_none(item.get("project")))
+    if project is None:
+        raise ValidationError("Unknown or inactive job.")
+    obj = kind.model(project=project, client_uuid=client_uuid, date=item.get("date") or None)
+    for name in kind.fields:
+        value = item.get(name)
+        if value not in (None, ""):
+            setattr(obj, name, value)
+    if kind.uses_assets and item.get("asset") not in (None, ""):
+        asset = assets.get(_int_or_none(item.get("asset")))
+        if asset is None or asset.client_id != project.client_id:
+            raise ValidationError("Asset is not active for this job's client.")
+        obj.asset = asset
+    # Converts the submitted strings to dates/decimals and applies the model's field rules.
+    obj.full_clean(exclude=["project", "asset", "client_uuid"], validate_unique=False)
+    return obj
+
+
+def _error_text(exc: ValidationError) -> str:
+    if hasattr(exc, "error_dict"):
+        return "; ".join(f"{name}: {' '.join(messages)}" for name, messages in exc.message_dict.items())
+    return " ".join(exc.messages)
+
+
+def _int_or_none(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
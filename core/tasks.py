@@ -0,0 +1,254 @@
+"""Background tasks stored in the database and run by ``manage.py run_tasks``.
+
+Slow work (large exports, rebuilding every job's totals) is queued as a
+:class:`~core.models.BackgroundTask` row instead of running inside a web
+request. Task functions are registered by name with :func:`task` and take
+a :class:`TaskContext` plus the row's ``params`` as keyword arguments.
+
+Workers claim one queued row at a time. On PostgreSQL the claim is a
+``SELECT ... FOR UPDATE SKIP LOCKED``, so workers never wait on each other;
+on SQLite, which has no row locks, a worker flips the row from queued to
+running with a conditional ``UPDATE`` and moves on to the next candidate if
+another worker got there first. A failed attempt is retried with an
+exponential delay until ``max_attempts`` is used up, and a running task
+whose worker stops reporting progress for ``settings.TASK_STALE_AFTER``
+seconds is put back in the queue.
+"""
+
+from __future__ import annotations
+
+import logging
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connection, models, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import backfill, exports, report_cache
+from .models import BackgroundTask, MonthlyRollup, Project, ProjectLedger
+from .routers import replica_reads
+from .streaming import chunked
+
+logger = logging.getLogger("core.tasks")
+
+# Seconds between progress writes; the last one is always written.
+PROGRESS_INTERVAL = 1.0
+# First retry delay in seconds, doubled for each further attempt.
+RETRY_DELAY = 30
+# Queued rows a worker tries per claim when it has to compare-and-set.
+CLAIM_CANDIDATES = 10
+# Output larger than this is spooled to a temporary file on disk before it is stored.
+SPOOL_BYTES = 1024 * 1024
+
+TaskFunction = Callable[..., None]
+REGISTRY: Dict[str, TaskFunction] = {}
+
+
+def task(name: str) -> Callable[[TaskFunction], TaskFunction]:
+    """Register ``fn(context, **params)`` under ``name``."""
+
+    def register(fn: TaskFunction) -> TaskFunction:
+        REGISTRY[name] = fn
+        return fn
+
+    return register
+
+
+def enqueue(name: str, params: Optional[Dict[str, object]] = None, user=None, max_attempts: int = 3) -> BackgroundTask:
+    """Queue task ``name``; ``params`` must be JSON-serializable (pass dates as ISO strings)."""
+    if name not in REGISTRY:
+        raise ValueError(f"No task named {name!r}.")
+    return BackgroundTask.objects.create(
+        name=name, params=params or {}, created_by=user, max_attempts=max_attempts
+    )
+
+
+class TaskContext:
+    """Handed to a running task for progress reports and its output file."""
+
+    def __init__(self, task: BackgroundTask) -> None:
+        self.task = task
+        self._last_write = 0.0
+
+    def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None) -> None:
+        """Record ``done`` of ``total`` steps; also serves as the worker's heartbeat."""
+        fields: Dict[str, object] = {"progress": done}
+        if total is not None:
+            fields["total"] = total
+        if message is not None:
+            fields["message"] = message[:200]
+        final = total is not None and done >= total
+        if not final and time.monotonic() - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = time.monotonic()
+        self._update(heartbeat_at=timezone.now(), **fields)
+
+    def save_output(self, filename: str, content_type: str, chunks: Iterable[bytes]) -> None:
+        """Write ``chunks`` to the default storage as the task's download."""
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as spool:
+            for chunk in chunks:
+                spool.write(chunk)
+            spool.seek(0)
+            self.task.output_file.save(filename, File(spool), save=False)
+        self._update(output_name=filename, output_type=content_type, output_file=self.task.output_file.name)
+
+    def _update(self, **fields) -> None:
+        BackgroundTask.objects.filter(pk=self.task.pk).update(**fields)
+        for name, value in fields.items():
+            setattr(self.task, name, value)
+
+
+# ---------- worker side ----------
+def claim(worker: str) -> Optional[BackgroundTask]:
+    """Mark the oldest ready task as running for ``worker`` and return it, or None."""
+    now = timezone.now()
+    ready = BackgroundTask.objects.filter(status=BackgroundTask.QUEUED, run_after__lte=now).order_by("run_after", "pk")
+    running = {
+        "status": BackgroundTask.RUNNING,
+        "worker": worker,
+        "started_at": now,
+        "heartbeat_at": now,
+        "attempts": models.F("attempts") + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            pk = ready.select_for_update(skip_locked=True).values_list("pk", flat=True).first()
+            if pk is None:
+                return None
+            BackgroundTask.objects.filter(pk=pk).update(**running)
+        return BackgroundTask.objects.get(pk=pk)
+    for pk in ready.values_list("pk", flat=True)[:CLAIM_CANDIDATES]:
+        # why: no row locks here; only the worker whose UPDATE still sees the row queued gets it
+        if BackgroundTask.objects.filter(pk=pk, status=BackgroundTask.QUEUED).update(**running):
+            return BackgroundTask.objects.get(pk=pk)
+    return None
+
+
+def run(task: BackgroundTask) -> None:
+    """Run a claimed task and record how it ended."""
+    context = TaskContext(task)
+    fn = REGISTRY.get(task.name)
+    try:
+        if fn is None:
+            raise LookupError(f"No task named {task.name!r}.")
+        fn(context, **task.params)
+    except Exception as exc:
+        logger.exception("Task %s #%s failed (attempt %s of %s)", task.name, task.pk, task.attempts, task.max_attempts)
+        error = f"{type(exc).__name__}: {exc}"
+        if fn is not None and task.attempts < task.max_attempts:
+            delay = timedelta(seconds=RETRY_DELAY * 2 ** (task.attempts - 1))
+            context._update(status=BackgroundTask.QUEUED, run_after=timezone.now() + delay, worker="", error=error)
+        else:
+            context._update(status=BackgroundTask.FAILED, finished_at=timezone.now(), error=error)
+    else:
+        done = {"progress": task.total} if task.total is not None else {}
+        context._update(status=BackgroundTask.DONE, finished_at=timezone.now(), error="", **done)
+
+
+def requeue_stale() -> int:
+    """Retry (or fail, when out of attempts) running tasks whose worker went quiet."""
+    cutoff = timezone.now() - timedelta(seconds=settings.TASK_STALE_AFTER)
+    stale = BackgroundTask.objects.filter(status=BackgroundTask.RUNNING, heartbeat_at__lt=cutoff)
+    error = "The worker stopped responding."
+    failed = stale.filter(attempts__gte=models.F("max_attempts")).update(
+        status=BackgroundTask.FAILED, finished_at=timezone.now(), error=error
+    )
+    retried = stale.update(status=BackgroundTask.QUEUED, run_after=timezone.now(), worker="", error=error)
+    return failed + retried
+
+
+def prune() -> int:
+    """Delete finished tasks (and their files) older than ``settings.TASK_RETENTION_DAYS``."""
+    cutoff = timezone.now() - timedelta(days=settings.TASK_RETENTION_DAYS)
+    expired = BackgroundTask.objects.filter(
+        status__in=[BackgroundTask.DONE, BackgroundTask.FAILED], finished_at__lt=cutoff
+    )
+    storage = BackgroundTask._meta.get_field("output_file").storage
+    for name in expired.exclude(output_file="").values_list("output_file", flat=True):
+        storage.delete(name)
+    deleted, _ = expired.delete()
+    return deleted
+
+
+# ---------- tasks ----------
+def _counted(rows: Iterable[exports.Row], context: TaskContext, total: int) -> Iterator[exports.Row]:
+    for done, row in enumerate(rows):
+        # The first row is the header.
+        if done % exports.ITERATOR_CHUNK == 0:
+            context.progress(max(done - 1, 0), total)
+        yield row
+    context.progress(total, total)
+
+
+@task("export")
+def export_log(
+    context: TaskContext,
+    section: str,
+    format: str = "csv",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    project: Optional[int] = None,
+) -> None:
+    """The CSV/XLSX export of ``/export/`` or ``/report/<id>/export/``, built off the request path."""
+    start_date = date.fromisoformat(start) if start else None
+    end_date = date.fromisoformat(end) if end else None
+    with replica_reads():
+        job = Project.objects.select_related("client").get(pk=project) if project else None
+        if section == "totals":
+            if job is None:
+                raise ValueError("Totals can only be exported for a single job.")
+            rows: Iterable[exports.Row] = exports.totals_rows(job, ProjectLedger.totals_for(job))
+        else:
+            if job is not None:
+                queryset = exports.SECTIONS[section].for_project(job)
+            else:
+                queryset = exports.SECTIONS[section].queryset()
+            queryset = exports.filter_range(queryset, start_date, end_date)
+            total = queryset.count()
+            context.progress(0, total, message=f"Exporting {total:,} rows")
+            rows = _counted(exports.SECTIONS[section].rows(queryset), context, total)
+
+        if job is not None:
+            filename = f"{slugify(job.name)}-{section}"
+        else:
+            filename = f"{section}-{'-'.join(d for d in (start, end) if d) or 'all'}"
+        if format == "xlsx":
+            if not exports.xlsx_available():
+                raise RuntimeError("Excel export requires openpyxl to be installed.")
+            chunks: Iterable[bytes] = exports.xlsx_chunks(rows, title=filename)
+            content_type = exports.XLSX_CONTENT_TYPE
+        else:
+            chunks = (text.encode() for text in chunked(exports.csv_lines(rows)))
+            content_type = "text/csv; charset=utf-8"
+        # The rows are read as the file is written, so keep this inside replica_reads.
+        context.save_output(f"{filename}.{format}", content_type, chunks)
+
+
+@task("rebuild_ledger")
+def rebuild_ledger(context: TaskContext, rollups: bool = False) -> None:
+    """Recompute every job's ledger row (and monthly rollups) from the entries."""
+    project_ids = list(Project.objects.order_by("pk").values_list("pk", flat=True))
+    context.progress(0, len(project_ids), message=f"Rebuilding totals for {len(project_ids):,} jobs")
+    for done, project in enumerate(Project.objects.order_by("pk").iterator(), start=1):
+        ProjectLedger.rebuild(project)
+        if rollups:
+            MonthlyRollup.refresh([project.pk])
+        report_cache.bump_project_versions([project.pk])
+        context.progress(done, len(project_ids))
+
+
+@task("backfill")
+def run_backfill(context: TaskContext, name: str, batch_size: Optional[int] = None) -> None:
+    """A :mod:`core.backfill` run; a retry resumes from its checkpoint."""
+    job = backfill.BACKFILLS[name]
+    context.progress(0, 100, message=f"Backfill {name}")
+
+    def report(state, _size, _seconds):
+        context.progress(state.percent or 0, 100)
+
+    backfill.run(job, batch_size=batch_size, on_batch=report)
@@ -0,0 +1,472 @@
+import io
+import os
+import tempfile
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from . import archive, backfill, importers, report_cache, signals, sync, tasks
+from .forms import ImportForm
+from .invoicing import generate_invoices
+from .pagination import keyset_page, normalize_cursor
+from .models import (
+    Asset,
+    BackgroundTask,
+    Client,
+    Invoice,
+    MaterialEntry,
+    Payment,
+    Project,
+    ProjectLedger,
+    ProjectTotals,
+    RateOverride,
+    WorkEntry,
+)
+
+
+class ProjectTotalsTests(TestCase):
+    """Totals are costed in SQL with a fixed number of queries per call."""
+
+    @classmethod
+    def setUpTestData(cls):
+        client = Client.objects.create(name="Acme")
+        excavator = Asset.objects.create(client=client, name="Excavator")
+        truck = Asset.objects.create(client=client, name="Truck")
+        cls.job = Project.objects.create(
+            client=client, name="Main St", hourly_rate=Decimal("50.00"), material_markup_percent=Decimal("10.00")
+        )
+        cls.other = Project.objects.create(client=client, name="Elm St", hourly_rate=Decimal("40.00"))
+        RateOverride.objects.create(project=cls.job, asset=excavator, hourly_rate=Decimal("80.00"))
+
+        day = date(2024, 3, 1)
+        WorkEntry.objects.create(project=cls.job, date=day, hours=Decimal("2.00"), asset=excavator)  # override
+        WorkEntry.objects.create(project=cls.job, date=day, hours=Decimal("3.00"), asset=truck)  # job rate
+        WorkEntry.objects.create(project=cls.job, date=day, hours=Decimal("1.50"))  # no asset: job rate
+        MaterialEntry.objects.create(
+            project=cls.job, date=day, description="Gravel", quantity=Decimal("2"), unit_cost=Decimal("10.00")
+        )
+        MaterialEntry.objects.create(
+            project=cls.job,
+            date=day,
+            description="Pipe",
+            quantity=Decimal("1"),
+            unit_cost=Decimal("100.00"),
+            markup_percent=Decimal("25.00"),
+        )
+        Payment.objects.create(project=cls.job, date=day, amount=Decimal("200.00"))
+        # The excavator override belongs to the other job, so this is billed at 40.
+        WorkEntry.objects.create(project=cls.other, date=day, hours=Decimal("2.00"), asset=excavator)
+
+    def assertTotals(self, totals, labor, materials, payments, balance):
+        self.assertEqual(
+            (totals.labor, totals.materials, totals.payments, totals.balance),
+            tuple(Decimal(value) for value in (labor, materials, payments, balance)),
+        )
+
+    def test_for_project_costs_with_override_and_fallback_rates(self):
+        # 2h × 80 (override) + 3h × 50 + 1.5h × 50; materials at 10% and 25% markup.
+        with self.assertNumQueries(3):
+            totals = ProjectTotals.for_project(self.job)
+        self.assertTotals(totals, "385", "147", "200", "332")
+
+    def test_for_project_date_bounds(self):
+        with self.assertNumQueries(3):
+            totals = ProjectTotals.for_project(self.job, as_of=date(2024, 2, 29))
+        self.assertTotals(totals, "0", "0", "0", "0")
+
+    def test_for_projects_runs_one_query_per_table(self):
+        # The project id lookup, a grouped aggregate per entry table and the archive summaries.
+        with self.assertNumQueries(5):
+            totals = ProjectTotals.for_projects(Project.objects.all())
+        self.assertEqual(set(totals), {self.job.pk, self.other.pk})
+        self.assertTotals(totals[self.job.pk], "385", "147", "200", "332")
+        self.assertTotals(totals[self.other.pk], "80", "0", "0", "80")
+
+    def test_for_projects_query_count_does_not_grow_with_projects(self):
+        client = Client.objects.get(name="Acme")
+        for number in range(5):
+            job = Project.objects.create(client=client, name=f"Job {number}", hourly_rate=Decimal("30.00"))
+            WorkEntry.objects.create(project=job, date=date(2024, 3, 2), hours=Decimal("1.00"))
+        with self.assertNumQueries(5):
+            totals = ProjectTotals.for_projects(Project.objects.all())
+        self.assertEqual(len(totals), 7)
+        self.assertTotals(totals[job.pk], "30", "0", "0", "30")
+
+    def test_archived_job_keeps_frozen_totals(self):
+        Project.objects.filter(pk=self.other.pk).update(active=False)
+        archive.archive_project(self.other.pk)
+        job = Project.objects.get(pk=self.other.pk)
+        totals = ProjectTotals.for_project(job)
+        self.assertTotals(totals, "80", "0", "0", "80")
+        with self.assertNumQueries(5):
+            self.assertEqual(ProjectTotals.for_projects(Project.objects.all())[job.pk], totals)
+
+
+class ArchivedJobGuardTests(TestCase):
+    """No write path adds live entries to an archived job."""
+
+    @classmethod
+    def setUpTestData(cls):
+        client = Client.objects.create(name="Acme")
+        cls.job = Project.objects.create(client=client, name="Closed", active=False)
+        archive.archive_project(cls.job.pk)
+        cls.job.refresh_from_db()
+
+    def test_model_validation_rejects_archived_job(self):
+        with self.assertRaises(ValidationError) as caught:
+            Payment(project=self.job, date=date(2024, 3, 1), amount=Decimal("5.00")).full_clean()
+        self.assertIn("project", caught.exception.message_dict)
+
+    def test_import_reports_archived_job_rows(self):
+        handle = io.StringIO("client,project,date,hours\nAcme,Closed,03/01/2024,2\n")
+        result = importers.import_csv("work", handle, allow_partial=True)
+        self.assertEqual(result.created, 0)
+        self.assertEqual([error.line for error in result.errors], [2])
+        self.assertIn("archived", result.errors[0].message)
+        self.assertFalse(WorkEntry.objects.exists())
+
+    def test_sync_rejects_archived_job(self):
+        key = str(uuid.uuid4())
+        result = sync.apply_batch(
+            [{"id": key, "kind": "payments", "project": self.job.pk, "date": "2024-03-01", "amount": "5"}]
+        )
+        self.assertEqual(result.accepted, [])
+        self.assertIn(key, result.errors)
+        self.assertFalse(Payment.objects.exists())
+
+
+class ReportCacheTests(TestCase):
+    """Every write that changes a job's figures orphans its cached report values."""
+
+    @classmethod
+    def setUpTestData(cls):
+        client = Client.objects.create(name="Acme")
+        cls.job = Project.objects.create(client=client, name="Main St", hourly_rate=Decimal("50.00"))
+
+    def setUp(self):
+        cache.clear()
+
+    def cached(self, value):
+        return report_cache.for_project(self.job.pk, "totals", lambda: value)
+
+    def test_entry_save_invalidates(self):
+        self.assertEqual(self.cached("before"), "before")
+        self.assertEqual(self.cached("ignored"), "before")
+        WorkEntry.objects.create(project=self.job, date=date(2024, 3, 1), hours=Decimal("1.00"))
+        self.assertEqual(self.cached("after"), "after")
+
+    def test_rebuild_ledger_invalidates(self):
+        self.assertEqual(self.cached("before"), "before")
+        ProjectLedger.objects.filter(project=self.job).update(balance=Decimal("999.00"))
+        call_command("rebuild_ledger", stdout=io.StringIO())
+        self.assertEqual(ProjectLedger.objects.get(project=self.job).balance, Decimal("0"))
+        self.assertEqual(self.cached("after"), "after")
+
+
+class BackgroundExportTests(TestCase):
+    """Exports are written to the default storage by a worker and downloaded from there."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("clerk", password="pw")
+        client = Client.objects.create(name="Acme")
+        job = Project.objects.create(client=client, name="Main St", hourly_rate=Decimal("50.00"))
+        WorkEntry.objects.create(project=job, date=date(2024, 3, 1), hours=Decimal("2.00"), notes="=SUM(A1)")
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_export_is_claimed_once_and_downloadable(self):
+        queued = tasks.enqueue("export", {"section": "work"}, user=self.user)
+        claimed = tasks.claim("worker-1")
+        self.assertEqual(claimed.pk, queued.pk)
+        self.assertIsNone(tasks.claim("worker-2"))
+
+        tasks.run(claimed)
+        done = BackgroundTask.objects.get(pk=queued.pk)
+        self.assertEqual(done.status, BackgroundTask.DONE)
+        self.assertTrue(done.output_file.storage.exists(done.output_file.name))
+
+        self.client.force_login(self.user)
+        response = self.client.get(f"/tasks/{done.pk}/download/")
+        self.assertEqual(response.status_code, 200)
+        body = b"".join(response.streaming_content).decode()
+        self.assertTrue(body.startswith("Date,Client,Job"))
+        self.assertIn("'=SUM(A1)", body)
+
+        done.output_file.storage.delete(done.output_file.name)
+        self.assertEqual(self.client.get(f"/tasks/{done.pk}/download/").status_code, 404)
+
+
+class CsvImportTests(TestCase):
+    """CSV imports from the upload form and from ``manage.py import_entries``."""
+
+    CP1252 = "client,project,date,amount,notes\nAcme,Main St,03/01/2024,10,Caf\u00e9\n".encode("cp1252")
+
+    @classmethod
+    def setUpTestData(cls):
+        client = Client.objects.create(name="Acme")
+        cls.job = Project.objects.create(client=client, name="Main St")
+
+    def csv_file(self, content: bytes) -> str:
+        handle = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
+        self.addCleanup(os.unlink, handle.name)
+        with handle:
+            handle.write(content)
+        return handle.name
+
+    def test_upload_rejects_non_utf8(self):
+        upload = SimpleUploadedFile("payments.csv", self.CP1252, content_type="text/csv")
+        form = ImportForm(data={"kind": "payments"}, files={"file": upload})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors["file"], [importers.NOT_UTF8])
+
+    def test_command_rejects_non_utf8(self):
+        with self.assertRaisesMessage(CommandError, importers.NOT_UTF8):
+            call_command("import_entries", "payments", self.csv_file(self.CP1252), stdout=io.StringIO())
+        self.assertFalse(Payment.objects.exists())
+
+    def test_command_imports_utf8_with_bom(self):
+        content = "client,project,date,amount,notes\nAcme,Main St,03/01/2024,10,Caf\u00e9\n".encode("utf-8-sig")
+        call_command("import_entries", "payments", self.csv_file(content), stdout=io.StringIO())
+        payment = Payment.objects.get()
+        self.assertEqual((payment.amount, payment.notes), (Decimal("10.00"), "Caf\u00e9"))
+        self.assertEqual(ProjectLedger.objects.get(project=self.job).payments, Decimal("10.00"))
+
+    def test_invalid_rows_roll_back_the_import(self):
+        content = b"client,project,date,amount\nAcme,Main St,03/01/2024,10\nAcme,Nowhere,03/01/2024,5\n"
+        with self.assertRaises(CommandError):
+            call_command("import_entries", "payments", self.csv_file(content), stdout=io.StringIO())
+        self.assertFalse(Payment.objects.exists())
+
+
+class LedgerHookTests(TestCase):
+    """The write hooks keep each job's ledger row equal to its live totals."""
+
+    @classmethod
+    def setUpTestData(cls):
+        client = Client.objects.create(name="Acme")
+        cls.job = Project.objects.create(client=client, name="Main St", hourly_rate=Decimal("50.00"))
+        cls.other = Project.objects.create(client=client, name="Elm St", hourly_rate=Decimal("40.00"))
+
+    def ledger(self, job):
+        return ProjectLedger.objects.get(project=job)
+
+    def add_work(self, job, count, hours="1.00"):
+        for _ in range(count):
+            WorkEntry.objects.create(project=job, date=date(2024, 3, 1), hours=Decimal(hours))
+
+    def test_save_edit_and_move_refresh_both_jobs(self):
+        entry = WorkEntry.objects.create(project=self.job, date=date(2024, 3, 1), hours=Decimal("2.00"))
+        self.assertEqual(self.ledger(self.job).labor, Decimal("100"))
+        entry.project = self.other
+        entry.save()
+        self.assertEqual(self.ledger(self.job).labor, Decimal("0"))
+        self.assertEqual(self.ledger(self.other).labor, Decimal("80"))
+
+    def test_rate_change_reprices_labor(self):
+        self.add_work(self.job, 1)
+        self.job.hourly_rate = Decimal("60.00")
+        self.job.save()
+        self.assertEqual(self.ledger(self.job).labor, Decimal("60"))
+
+    def test_bulk_delete_refreshes_each_job_once_on_commit(self):
+        self.add_work(self.job, 3)
+        self.add_work(self.other, 2)
+        with mock.patch.object(signals, "projects_changed", wraps=signals.projects_changed) as changed:
+            with self.captureOnCommitCallbacks(execute=True):
+                WorkEntry.objects.all().delete()
+                changed.assert_not_called()
+        self.assertCountEqual([call.args[0] for call in changed.call_args_list], [[self.job.pk], [self.other.pk]])
+        self.assertEqual(self.ledger(self.job).labor, Decimal("0"))
+        self.assertEqual(self.ledger(self.other).labor, Decimal("0"))
+
+    def test_delete_after_rolled_back_savepoint_still_refreshes(self):
+        self.add_work(self.job, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    WorkEntry.objects.filter(project=self.job).first().delete()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            WorkEntry.objects.filter(project=self.job).first().delete()
+        self.assertEqual(self.ledger(self.job).labor, Decimal("50"))
+
+    def test_project_delete_does_not_refresh_per_entry(self):
+        self.add_work(self.job, 5)
+        with mock.patch.object(signals, "projects_changed", wraps=signals.projects_changed) as changed:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.job.delete()
+        self.assertEqual(changed.call_count, 1)
+        self.assertFalse(ProjectLedger.objects.filter(project_id=self.job.pk).exists())
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        client = Client.objects.create(name="Acme")
+        job = Project.objects.create(client=client, name="Main St")
+        for offset in (0, 0, 1, 1, 1, 2, 5):
+            Payment.objects.create(project=job, date=date(2024, 3, 1) - timedelta(days=offset), amount=Decimal("1"))
+
+    def test_pages_cover_every_row_once_in_order(self):
+        expected = list(Payment.objects.order_by("-date", "id").values_list("pk", flat=True))
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = keyset_page(Payment.objects.all(), cursor, 2)
+            self.assertEqual(page.is_first, cursor is None)
+            seen += [row.pk for row in page.items]
+            pages += 1
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 4)
+
+    def test_normalize_cursor(self):
+        self.assertEqual(normalize_cursor("2024-03-01.007"), "2024-03-01.7")
+        self.assertEqual(normalize_cursor("not-a-cursor"), "")
+        self.assertEqual(normalize_cursor(None), "")
+
+
+class SyncTests(TestCase):
+    """Offline uploads are idempotent per entry UUID."""
+
+    @classmethod
+    def setUpTestData(cls):
+        client = Client.objects.create(name="Acme")
+        cls.job = Project.objects.create(client=client, name="Main St")
+
+    def payment(self, key, project=None, amount="10"):
+        project = self.job.pk if project is None else project
+        return {"id": key, "kind": "payments", "project": project, "date": "2024-03-01", "amount": amount}
+
+    def test_batch_sorts_accepted_duplicates_and_errors(self):
+        first, second = str(uuid.uuid4()), str(uuid.uuid4())
+        result = sync.apply_batch(
+            [self.payment(first), self.payment(first), self.payment(second, project=0), {"id": "nope"}]
+        )
+        self.assertEqual(result.accepted, [first])
+        self.assertEqual(result.duplicates, [first])
+        self.assertEqual(set(result.errors), {second, "nope"})
+        self.assertEqual(ProjectLedger.objects.get(project=self.job).payments, Decimal("10.00"))
+
+    def test_retry_stores_nothing_twice(self):
+        key = str(uuid.uuid4())
+        self.assertEqual(sync.apply_batch([self.payment(key)]).accepted, [key])
+        retry = sync.apply_batch([self.payment(key)])
+        self.assertEqual((retry.accepted, retry.duplicates), ([], [key]))
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_parse_body_rejects_bad_requests(self):
+        with self.assertRaises(sync.SyncError):
+            sync.parse_body(b"{not json")
+        with self.assertRaises(sync.SyncError):
+            sync.parse_body(b'{"entries": {}}')
+        self.assertEqual(sync.parse_body(b'{"entries": []}'), [])
+
+
+class InvoicingTests(TestCase):
+    """Entries are billed exactly once, whatever their date."""
+
+    @classmethod
+    def setUpTestData(cls):
+        client = Client.objects.create(name="Acme")
+        cls.truck = Asset.objects.create(client=client, name="Truck")
+        cls.job = Project.objects.create(
+            client=client, name="Main St", hourly_rate=Decimal("50.00"), material_markup_percent=Decimal("10.00")
+        )
+        WorkEntry.objects.create(project=cls.job, date=date(2024, 3, 1), hours=Decimal("2.00"), asset=cls.truck)
+        WorkEntry.objects.create(project=cls.job, date=date(2024, 3, 2), hours=Decimal("1.00"), asset=cls.truck)
+        MaterialEntry.objects.create(
+            project=cls.job, date=date(2024, 3, 2), description="Pipe", quantity=Decimal("2"), unit_cost=Decimal("10")
+        )
+        Payment.objects.create(project=cls.job, date=date(2024, 3, 3), amount=Decimal("40.00"))
+
+    def invoice(self, through):
+        return generate_invoices(Project.objects.filter(pk=self.job.pk), through, issued_on=through)
+
+    def test_invoice_lines_totals_and_links(self):
+        (invoice,) = self.invoice(date(2024, 3, 31))
+        lines = {(line.kind, line.description): line for line in invoice.lines.all()}
+        self.assertEqual(lines["labor", "Truck"].quantity, Decimal("3.00"))
+        self.assertEqual(lines["labor", "Truck"].amount, Decimal("150.00"))
+        self.assertEqual(lines["material", "Pipe"].amount, Decimal("22.00"))
+        self.assertEqual((invoice.total, invoice.payments_to_date), (Decimal("172.00"), Decimal("40.00")))
+        self.assertEqual(invoice.balance_due, Decimal("132.00"))
+        self.assertIsNone(invoice.period_start)
+        self.assertFalse(WorkEntry.objects.filter(invoice__isnull=True).exists())
+        self.assertEqual(self.invoice(date(2024, 3, 31)), [])
+
+    def test_cut_off_leaves_later_entries_unbilled(self):
+        (invoice,) = self.invoice(date(2024, 3, 1))
+        self.assertEqual(invoice.total, Decimal("100.00"))
+        self.assertEqual(WorkEntry.objects.filter(invoice__isnull=True).count(), 1)
+
+    def test_back_dated_entry_goes_on_the_next_invoice(self):
+        self.invoice(date(2024, 3, 31))
+        WorkEntry.objects.create(project=self.job, date=date(2024, 2, 15), hours=Decimal("6.00"))
+        (invoice,) = self.invoice(date(2024, 4, 30))
+        self.assertEqual(invoice.total, Decimal("300.00"))
+        self.assertEqual(invoice.period_start, date(2024, 2, 15))
+
+    def test_backfill_links_entries_of_earlier_invoices(self):
+        for end in (date(2024, 3, 1), date(2024, 3, 2)):
+            Invoice.objects.create(project=self.job, client_name="Acme", project_name="Main St", period_end=end)
+        first, second = Invoice.objects.order_by("period_end")
+        backfill.link_invoices(WorkEntry.objects.all())
+        self.assertEqual(
+            list(WorkEntry.objects.order_by("date").values_list("invoice_id", flat=True)), [first.pk, second.pk]
+        )
+
+
+class ArchiveRoundTripTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        client = Client.objects.create(name="Acme")
+        cls.job = Project.objects.create(client=client, name="Main St", hourly_rate=Decimal("50.00"))
+        WorkEntry.objects.create(project=cls.job, date=date(2024, 3, 1), hours=Decimal("2.00"))
+        MaterialEntry.objects.create(
+            project=cls.job, date=date(2024, 3, 1), description="Pipe", quantity=Decimal("1"), unit_cost=Decimal("5")
+        )
+        Payment.objects.create(project=cls.job, date=date(2024, 3, 1), amount=Decimal("30.00"))
+        generate_invoices(Project.objects.filter(pk=cls.job.pk), date(2024, 3, 31))
+        Project.objects.filter(pk=cls.job.pk).update(active=False)
+
+    def test_archive_and_restore_keep_rows_links_and_totals(self):
+        before = {
+            model: sorted(model.objects.values_list("pk", "date"))
+            for model in (WorkEntry, MaterialEntry, Payment)
+        }
+        links = sorted(WorkEntry.objects.values_list("pk", "invoice_id"))
+        totals = ProjectTotals.for_project(self.job)
+
+        summary = archive.archive_project(self.job.pk)
+        self.assertEqual((summary.work_entries, summary.material_entries, summary.payment_entries), (1, 1, 1))
+        self.assertFalse(WorkEntry.objects.exists())
+        archived = Project.objects.get(pk=self.job.pk)
+        self.assertEqual(ProjectTotals.for_project(archived), totals)
+        self.assertEqual(ProjectLedger.objects.get(project=archived).balance, totals.balance)
+        with self.assertRaises(archive.ArchiveError):
+            archive.archive_project(self.job.pk)
+
+        counts = archive.restore_project(self.job.pk)
+        self.assertEqual(counts, {"work": 1, "materials": 1, "payments": 1})
+        for model, rows in before.items():
+            self.assertEqual(sorted(model.objects.values_list("pk", "date")), rows)
+        self.assertEqual(sorted(WorkEntry.objects.values_list("pk", "invoice_id")), links)
+        self.assertEqual(ProjectTotals.for_project(Project.objects.get(pk=self.job.pk)), totals)
@@ -1,5 +1,6 @@
 """URL patterns for core views."""
 
+from django.conf import settings
 from django.contrib.auth.views import LogoutView
 from django.urls import path
 
@@ -7,15 +8,38 @@ from . import views
 
 app_name = "core"
 
+# Async-native report/dashboard under ASGI when JOBTOOL_ASYNC_VIEWS=1; the sync views otherwise.
+dashboard_view = views.adashboard if settings.ASYNC_VIEWS else views.dashboard
+report_view = views.areport if settings.ASYNC_VIEWS else views.report
+
 urlpatterns = [
     path("healthz/", views.healthz, name="healthz"),
+    path("stats/requests/", views.request_stats, name="request_stats"),
     path("", views.root, name="root"),
     path("login/", views.BrandedLoginView.as_view(), name="login"),
     path("logout/", LogoutView.as_view(), name="logout"),
-    path("dashboard/", views.dashboard, name="dashboard"),
+    path("dashboard/", dashboard_view, name="dashboard"),
     path("work/new/", views.add_work_entry, name="work_new"),
+    path("api/projects/<int:project_id>/assets/", views.project_assets, name="project_assets"),
     path("materials/new/", views.add_material_entry, name="material_new"),
     path("payments/new/", views.add_payment, name="payment_new"),
-    path("report/<int:project_id>/", views.report, name="report"),
+    path("timesheet/", views.timesheet, name="timesheet"),
+    path("timesheet/materials/", views.material_timesheet, name="timesheet_materials"),
+    path("offline/", views.offline_entry, name="offline"),
+    path("offline/sw.js", views.offline_service_worker, name="offline_sw"),
+    path("api/sync/", views.sync_entries, name="sync"),
+    path("import/", views.import_entries, name="import"),
+    path("report/<int:project_id>/", report_view, name="report"),
+    path("report/<int:project_id>/full/", views.report_full, name="report_full"),
+    path("report/<int:project_id>/export/", views.export_project, name="report_export"),
+    path("export/", views.export_range, name="export"),
+    path("receivables/", views.receivables_report, name="receivables"),
+    path("search/", views.search_page, name="search"),
+    path("invoices/", views.invoice_list, name="invoices"),
+    path("invoices/<int:invoice_id>/", views.invoice_detail, name="invoice"),
+    path("invoices/<int:invoice_id>/export/", views.invoice_export, name="invoice_export"),
+    path("tasks/", views.task_list, name="tasks"),
+    path("tasks/<int:task_id>/", views.task_detail, name="task"),
+    path("tasks/<int:task_id>/download/", views.task_download, name="task_download"),
 ]
 
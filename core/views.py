@@ -5,22 +5,95 @@ Provides the dashboard, data-entry forms and project reports.
 
 from __future__ import annotations
 
-from typing import Dict, List
+import asyncio
+import hashlib
+import io
+import json
+import os
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlencode
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView
-from django.http import HttpRequest, HttpResponse
-from django.shortcuts import get_object_or_404, redirect, render
+from django.db.models import QuerySet
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
+from django.template.loader import get_template, render_to_string
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+from django.utils.text import slugify
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 
-from .forms import MaterialEntryForm, PaymentForm, ProjectPickerForm, WorkEntryForm
-from .models import MaterialEntry, Payment, Project, ProjectTotals, WorkEntry
+from . import choices, exports, importers, invoicing, receivables, report_cache, search, sync, tasks
+from . import middleware as instrumentation
+from .forms import (
+    BackgroundExportForm,
+    ExportForm,
+    ImportForm,
+    MaterialEntryForm,
+    MaterialTimesheet,
+    PaymentForm,
+    PortfolioFilterForm,
+    ProjectPickerForm,
+    ReceivablesForm,
+    ReportPeriodForm,
+    SearchForm,
+    TimesheetForm,
+    WorkEntryForm,
+    WorkTimesheet,
+)
+from .models import (
+    ArchivedMaterialEntry,
+    ArchivedPayment,
+    ArchivedWorkEntry,
+    BackgroundTask,
+    Invoice,
+    MaterialEntry,
+    Payment,
+    Project,
+    ProjectLedger,
+    ProjectTotals,
+    WorkEntry,
+    alist,
+)
+from .pagination import KeysetPage, akeyset_page, keyset_page, normalize_cursor
+from .routers import use_replica
+from .streaming import chunked, streaming_response
 
 
-def healthz(_request: HttpRequest) -> HttpResponse:
+async def healthz(_request: HttpRequest) -> HttpResponse:
     return HttpResponse("ok", content_type="text/plain")
 
 
+@staff_member_required
+def request_stats(request: HttpRequest) -> HttpResponse:
+    """Per-view timing aggregates from the instrumentation middleware.
+
+    Figures are per worker process. POST resets them.
+    """
+    if not settings.INSTRUMENT_REQUESTS:
+        raise Http404("Request instrumentation is disabled (set JOBTOOL_INSTRUMENT=1).")
+    if request.method == "POST":
+        instrumentation.stats.reset()
+    return JsonResponse({"pid": os.getpid(), "views": instrumentation.stats.snapshot()})
+
+
 def root(request: HttpRequest) -> HttpResponse:
     if request.user.is_authenticated:
         return redirect("core:dashboard")
@@ -40,7 +113,31 @@ class BrandedLoginView(LoginView):
         return super().form_valid(form)
 
 
+def _filtered_projects(filter_form: PortfolioFilterForm, valid: bool) -> Tuple[QuerySet, str]:
+    projects = Project.objects.filter(active=True).select_related("client")
+    sort = "-balance"
+    if valid:
+        if filter_form.cleaned_data["client"]:
+            projects = projects.filter(client=filter_form.cleaned_data["client"])
+        sort = filter_form.cleaned_data["sort"] or sort
+    return projects, sort
+
+
+def _portfolio_context(projects: Iterable[Project], totals: Dict[int, ProjectTotals], sort: str) -> Dict[str, object]:
+    portfolio = [{"project": p, "totals": totals[p.pk]} for p in projects]
+    if sort != "name":
+        portfolio.sort(key=lambda row: row["totals"].balance, reverse=sort == "-balance")
+
+    zero = Decimal("0.00")
+    summary = {
+        field: sum((getattr(row["totals"], field) for row in portfolio), zero)
+        for field in ("labor", "materials", "payments", "balance")
+    }
+    return {"portfolio": portfolio, "summary": summary}
+
+
 @login_required
+@use_replica
 def dashboard(request: HttpRequest) -> HttpResponse:
     if request.method == "POST":
         form = ProjectPickerForm(request.POST)
@@ -49,7 +146,64 @@ def dashboard(request: HttpRequest) -> HttpResponse:
             return redirect("core:report", project_id=project.id)
     else:
         form = ProjectPickerForm()
-    return render(request, "core/dashboard.html", {"form": form})
+
+    filter_form = PortfolioFilterForm(request.GET or None)
+    projects, sort = _filtered_projects(filter_form, filter_form.is_valid())
+
+    # One grouped aggregate per entry table covers every listed job.
+    totals = ProjectTotals.for_projects(projects)
+    ctx = _portfolio_context(projects, totals, sort)
+    ctx.update(form=form, filter_form=filter_form)
+    return render(request, "core/dashboard.html", ctx)
+
+
+@login_required
+@use_replica
+async def adashboard(request: HttpRequest) -> HttpResponse:
+    """Async :func:`dashboard`: the job list and grouped totals load concurrently."""
+    if request.method == "POST":
+        form = ProjectPickerForm(request.POST)
+        if await sync_to_async(form.is_valid)():
+            project = form.cleaned_data["project"]
+            return redirect("core:report", project_id=project.id)
+    else:
+        form = ProjectPickerForm()
+
+    filter_form = PortfolioFilterForm(request.GET or None)
+    projects, sort = _filtered_projects(filter_form, await sync_to_async(filter_form.is_valid)())
+
+    project_list, totals = await asyncio.gather(
+        alist(projects), ProjectTotals.afor_projects(projects)
+    )
+    ctx = _portfolio_context(project_list, totals, sort)
+    ctx.update(form=form, filter_form=filter_form)
+    return await _arender(request, "core/dashboard.html", ctx)
+
+
+async def _arender(request: HttpRequest, template_name: str, ctx: Dict[str, object]) -> HttpResponse:
+    # why: forms and context processors (request.user, cached choice lists)
+    # may still hit the ORM lazily, which is only allowed from sync code
+    return await sync_to_async(render)(request, template_name, ctx)
+
+
+def _project_assets_etag(request: HttpRequest, project_id: int) -> Optional[str]:
+    client_id = choices.client_for_project(project_id)
+    if client_id is None:
+        return None
+    payload = json.dumps(choices.assets_for_client(client_id))
+    return hashlib.md5(payload.encode(), usedforsecurity=False).hexdigest()
+
+
+@login_required
+@cache_control(private=True, max_age=60)
+@condition(etag_func=_project_assets_etag)
+def project_assets(request: HttpRequest, project_id: int) -> JsonResponse:
+    """Active assets for an active job's client, for the work entry form."""
+    client_id = choices.client_for_project(project_id)
+    if client_id is None:
+        raise Http404("No active job with that id.")
+    assets = [{"id": pk, "label": label} for pk, label in choices.assets_for_client(client_id)]
+    return JsonResponse({"project": project_id, "assets": assets})
 
 
 @login_required
@@ -92,33 +246,146 @@ def add_payment(request: HttpRequest) -> HttpResponse:
 
 
 @login_required
-def report(request: HttpRequest, project_id: int) -> HttpResponse:
-    project = get_object_or_404(Project, pk=project_id)
+def offline_entry(request: HttpRequest) -> HttpResponse:
+    """Entry form that works without a connection; entries queue on the device until synced."""
+    ctx = {
+        "projects": [
+            {"id": pk, "label": label, "client": client_id} for pk, label, client_id in choices.active_projects()
+        ],
+        "assets": {
+            client_id: [{"id": pk, "label": label} for pk, label in assets]
+            for client_id, assets in choices.active_assets()["by_client"].items()
+        },
+        "csrf_cookie": settings.CSRF_COOKIE_NAME,
+    }
+    return render(request, "core/offline.html", ctx)
 
-    work_entries = (
-        WorkEntry.objects.filter(project=project)
-        .select_related("asset")
-        .order_by("-date", "id")
-    )
 
-    raw_materials = MaterialEntry.objects.filter(project=project).order_by("-date", "id")
-    material_entries: List[Dict[str, object]] = []
-    for m in raw_materials:
-        cost = m.total
-        material_entries.append(
-            {
-                "date": m.date,
-                "description": m.description,
-                "cost": cost,
-                "markup_percent": None,
-                "sell_price": cost,
-            }
-        )
+def offline_service_worker(_request: HttpRequest) -> HttpResponse:
+    """Service worker for ``/offline/``; served from that path so its scope covers the page."""
+    shell = [reverse("core:offline"), static("css/app.css"), static("js/offline.js"), static("img/squire-logo.png")]
+    # A new static build changes the hashed names, and so the cache name.
+    version = hashlib.md5("|".join(shell).encode(), usedforsecurity=False).hexdigest()[:12]
+    script = render_to_string("core/offline_sw.js", {"shell": json.dumps(shell), "version": version})
+    response = HttpResponse(script, content_type="text/javascript")
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+@require_POST
+def sync_entries(request: HttpRequest) -> JsonResponse:
+    """Store a batch of entries queued offline (see :mod:`core.sync`).
+
+    Answers JSON in every case, including a 401 instead of the login
+    redirect, so the device can tell what to keep queued.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Log in to sync."}, status=401)
+    try:
+        entries = sync.parse_body(request.body, request.headers.get("Content-Encoding", ""))
+    except sync.SyncError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(sync.apply_batch(entries).as_dict())
 
-    payments = Payment.objects.filter(project=project).order_by("-date", "id")
 
-    totals = ProjectTotals.for_project(project)
-    totals_ctx = {
+TIMESHEETS = {
+    "work": (WorkTimesheet, "Labor & Equipment Timesheet", "core:timesheet"),
+    "materials": (MaterialTimesheet, "Materials Timesheet", "core:timesheet_materials"),
+}
+
+
+def _timesheet(request: HttpRequest, kind: str) -> HttpResponse:
+    """Grid of entries for one job and day, saved together (see ``BaseTimesheetFormSet``)."""
+    formset_class, title, url_name = TIMESHEETS[kind]
+    posted = request.method == "POST"
+    header = TimesheetForm(request.POST if posted else (request.GET or None))
+    formset = None
+    if header.is_valid():
+        project, day = header.cleaned_data["project"], header.cleaned_data["date"]
+        formset = formset_class(request.POST if posted else None, project=project, prefix="rows")
+        if posted and formset.is_valid():
+            entries = formset.save(day)
+            messages.success(request, f"Saved {len(entries)} entries for {project.name} on {day:%m/%d/%Y}.")
+            query = urlencode({"project": project.pk, "date": day.isoformat()})
+            return redirect(f"{reverse(url_name)}?{query}")
+    ctx = {"header": header, "formset": formset, "title": title, "kind": kind}
+    return render(request, "core/timesheet.html", ctx)
+
+
+@login_required
+def timesheet(request: HttpRequest) -> HttpResponse:
+    return _timesheet(request, "work")
+
+
+@login_required
+def material_timesheet(request: HttpRequest) -> HttpResponse:
+    return _timesheet(request, "materials")
+
+
+@login_required
+def import_entries(request: HttpRequest) -> HttpResponse:
+    result = None
+    if request.method == "POST":
+        form = ImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            handle = io.TextIOWrapper(form.cleaned_data["file"].file, encoding="utf-8-sig", newline="")
+            result = importers.import_csv(
+                form.cleaned_data["kind"], handle, allow_partial=form.cleaned_data["allow_partial"]
+            )
+            if result.committed:
+                messages.success(request, f"Imported {result.created} entries.")
+            else:
+                messages.error(request, "Nothing was imported; fix the rows below and upload again.")
+    else:
+        form = ImportForm()
+    return render(request, "core/import_form.html", {"form": form, "result": result})
+
+
+REPORT_PAGE_SIZE = 200
+REPORT_SECTIONS = ("work", "materials", "payments")
+ROW_TEMPLATES = {
+    "work": "core/partials/work_row.html",
+    "materials": "core/partials/material_row.html",
+    "payments": "core/partials/payment_row.html",
+}
+EMPTY_ROWS = {
+    "work": '<tr><td colspan="6" class="muted">No labor or equipment logged.</td></tr>',
+    "materials": '<tr><td colspan="5" class="muted">No materials.</td></tr>',
+    "payments": '<tr><td colspan="3" class="muted">No payments.</td></tr>',
+}
+
+
+def _report_querysets(
+    project: Project, start: Optional[date] = None, end: Optional[date] = None
+) -> Dict[str, QuerySet]:
+    if project.archived_at:
+        querysets = {
+            "work": ArchivedWorkEntry.objects.filter(project=project).select_related("asset"),
+            "materials": ArchivedMaterialEntry.objects.filter(project=project),
+            "payments": ArchivedPayment.objects.filter(project=project),
+        }
+    else:
+        querysets = {
+            "work": WorkEntry.objects.filter(project=project).select_related("asset").with_cost(),
+            "materials": MaterialEntry.objects.filter(project=project).with_cost(),
+            "payments": Payment.objects.filter(project=project),
+        }
+    return {name: exports.filter_range(queryset, start, end) for name, queryset in querysets.items()}
+
+
+def _report_context(project: Project) -> Dict[str, object]:
+    # Totals always cover the whole job, whichever rows are on screen.
+    totals = report_cache.for_project(project.pk, "totals", lambda: ProjectLedger.totals_for(project))
+    return {"project": project, "totals": _totals_context(totals)}
+
+
+def _period_context(form: ReportPeriodForm, start: Optional[date], end: Optional[date]) -> Dict[str, object]:
+    query = urlencode({k: v.isoformat() for k, v in (("start", start), ("end", end)) if v})
+    return {"form": form, "start": start, "end": end, "active": bool(query), "query": query}
+
+
+def _totals_context(totals: ProjectTotals) -> Dict[str, Decimal]:
+    return {
         "work_total": totals.labor,
         "materials_total": totals.materials,
         "payments_total": totals.payments,
@@ -126,13 +393,312 @@ def report(request: HttpRequest, project_id: int) -> HttpResponse:
         "grand_total": totals.labor + totals.materials,
     }
 
+
+def _render_rows(name: str, rows: Iterable[object], project: Project) -> Iterator[str]:
+    template = get_template(ROW_TEMPLATES[name])
+    empty = True
+    for row in rows:
+        empty = False
+        yield template.render({"row": row, "project": project})
+    if empty:
+        yield EMPTY_ROWS[name]
+
+
+def _cursor_url(request: HttpRequest, section: str, cursor: Optional[str]) -> str:
+    query = request.GET.copy()
+    query.pop(section, None)
+    if cursor:
+        query[section] = cursor
+    return f"?{query.urlencode()}" if query else request.path
+
+
+def _section_key(name: str, cursor: str, start: Optional[date], end: Optional[date]) -> str:
+    # Rendered rows include asset names, so they stay on the per-version cache
+    # even for closed periods; only totals get long-lived snapshots.
+    if start or end:
+        return f"{name}:{start or ''}:{end or ''}:{cursor}"
+    return f"{name}:{cursor}"
+
+
+def _section_fragment(name: str, page: KeysetPage, project: Project) -> Dict[str, object]:
+    rows = "".join(_render_rows(name, page.items, project))
+    return {"rows": rows, "next_cursor": page.next_cursor, "is_first": page.is_first}
+
+
+def _section_context(request: HttpRequest, name: str, fragment: Dict[str, object]) -> Dict[str, object]:
+    # Rendered rows are cached per job version; pager links depend on the
+    # other sections' cursors, so they are built per request.
+    next_cursor = fragment["next_cursor"]
+    return {
+        "rows": mark_safe(fragment["rows"]),
+        "next_url": _cursor_url(request, name, next_cursor) if next_cursor else None,
+        "first_url": None if fragment["is_first"] else _cursor_url(request, name, None),
+    }
+
+
+@login_required
+def report(request: HttpRequest, project_id: int) -> HttpResponse:
+    project = get_object_or_404(Project.objects.select_related("client"), pk=project_id)
+    form = ReportPeriodForm(request.GET)
+    start, end = form.period()
+
+    sections = {}
+    for name, queryset in _report_querysets(project, start, end).items():
+        # why: the cursor is part of the cache key; junk must not mint new entries
+        cursor = normalize_cursor(request.GET.get(name))
+
+        def build(name=name, queryset=queryset, cursor=cursor) -> Dict[str, object]:
+            return _section_fragment(name, keyset_page(queryset, cursor, REPORT_PAGE_SIZE), project)
+
+        fragment = report_cache.for_project(project.pk, _section_key(name, cursor, start, end), build)
+        sections[name] = _section_context(request, name, fragment)
+
+    if start or end:
+        # Closed periods are answered from long-lived snapshots (see report_cache).
+        totals = report_cache.for_period(
+            project.pk, "totals", start, end, lambda: ProjectTotals.for_project(project, start, end)
+        )
+    else:
+        totals = report_cache.for_project(project.pk, "totals", lambda: ProjectLedger.totals_for(project))
     ctx = {
         "project": project,
-        "work_entries": work_entries,
-        "material_entries": material_entries,
-        "payments": payments,
-        "totals": totals_ctx,
+        "totals": _totals_context(totals),
+        "sections": sections,
+        "period": _period_context(form, start, end),
     }
-
     return render(request, "core/report.html", ctx)
 
+
+@login_required
+async def areport(request: HttpRequest, project_id: int) -> HttpResponse:
+    """Async :func:`report`: the three sections and the totals load concurrently."""
+    project = await aget_object_or_404(Project.objects.select_related("client"), pk=project_id)
+    form = ReportPeriodForm(request.GET)
+    start, end = form.period()
+    querysets = _report_querysets(project, start, end)
+
+    async def section(name: str) -> Dict[str, object]:
+        cursor = normalize_cursor(request.GET.get(name))
+
+        async def build() -> Dict[str, object]:
+            page = await akeyset_page(querysets[name], cursor, REPORT_PAGE_SIZE)
+            return _section_fragment(name, page, project)
+
+        fragment = await report_cache.afor_project(project.pk, _section_key(name, cursor, start, end), build)
+        return _section_context(request, name, fragment)
+
+    if start or end:
+        async def totals() -> ProjectTotals:
+            return await ProjectTotals.afor_project(project, start, end)
+
+        job_totals = report_cache.afor_period(project.pk, "totals", start, end, totals)
+    else:
+        async def totals() -> ProjectTotals:
+            return await ProjectLedger.atotals_for(project)
+
+        job_totals = report_cache.afor_project(project.pk, "totals", totals)
+
+    *fragments, job_totals = await asyncio.gather(*(section(name) for name in REPORT_SECTIONS), job_totals)
+    ctx = {
+        "project": project,
+        "totals": _totals_context(job_totals),
+        "sections": dict(zip(REPORT_SECTIONS, fragments)),
+        "period": _period_context(form, start, end),
+    }
+    return await _arender(request, "core/report.html", ctx)
+
+
+@login_required
+@use_replica
+def report_full(request: HttpRequest, project_id: int) -> StreamingHttpResponse:
+    """Stream every row of a job's report, rendering rows as they are read."""
+    project = get_object_or_404(Project.objects.select_related("client"), pk=project_id)
+    shell = render_to_string("core/report_full.html", _report_context(project), request=request)
+    querysets = _report_querysets(project)
+
+    def page() -> Iterator[str]:
+        rest = shell
+        for name in REPORT_SECTIONS:
+            head, _, rest = rest.partition(f"<!--rows:{name}-->")
+            yield head
+            rows = querysets[name].order_by("-date", "id").iterator(chunk_size=2000)
+            yield from chunked(_render_rows(name, rows, project))
+        yield rest
+
+    return streaming_response(request, page(), content_type="text/html; charset=utf-8")
+
+
+def _export_response(
+    request: HttpRequest, rows: Iterator[exports.Row], filename: str, fmt: str
+) -> HttpResponse:
+    if fmt == "xlsx":
+        if not exports.xlsx_available():
+            return HttpResponseBadRequest("Excel export requires openpyxl to be installed.")
+        response = streaming_response(
+            request, exports.xlsx_chunks(rows, title=filename), content_type=exports.XLSX_CONTENT_TYPE
+        )
+    else:
+        response = streaming_response(
+            request, chunked(exports.csv_lines(rows)), content_type="text/csv; charset=utf-8"
+        )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+@login_required
+@use_replica
+def export_project(request: HttpRequest, project_id: int) -> HttpResponse:
+    """Download one job's log (``?section=work|materials|payments|totals``)."""
+    project = get_object_or_404(Project.objects.select_related("client"), pk=project_id)
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    section = form.cleaned_data["section"]
+    filename = f"{slugify(project.name)}-{section}"
+
+    if section == "totals":
+        rows = exports.totals_rows(project, ProjectLedger.totals_for(project))
+    else:
+        queryset = exports.SECTIONS[section].for_project(project)
+        queryset = exports.filter_range(queryset, form.cleaned_data["start"], form.cleaned_data["end"])
+        rows = exports.SECTIONS[section].rows(queryset)
+    return _export_response(request, rows, filename, form.cleaned_data["format"])
+
+
+@login_required
+@use_replica
+def export_range(request: HttpRequest) -> HttpResponse:
+    """Download one log across every job, optionally limited to a date range."""
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    section = form.cleaned_data["section"]
+    if section not in exports.SECTIONS:
+        return HttpResponseBadRequest("Totals can only be exported for a single job.")
+    start, end = form.cleaned_data["start"], form.cleaned_data["end"]
+
+    queryset = exports.filter_range(exports.SECTIONS[section].queryset(), start, end)
+    span = "-".join(d.isoformat() for d in (start, end) if d) or "all"
+    rows = exports.SECTIONS[section].rows(queryset)
+    return _export_response(request, rows, f"{section}-{span}", form.cleaned_data["format"])
+
+
+@login_required
+@use_replica
+def receivables_report(request: HttpRequest) -> HttpResponse:
+    """Aged balances and billed/paid amounts per period across active jobs."""
+    form = ReceivablesForm(request.GET or None)
+    if form.is_valid():
+        data = form.cleaned_data
+    else:
+        # Keep the bound form so its errors are shown; report on the defaults meanwhile.
+        defaults = ReceivablesForm({})
+        defaults.is_valid()
+        data = defaults.cleaned_data
+    projects = Project.objects.filter(active=True)
+    if data["client"]:
+        projects = projects.filter(client=data["client"])
+
+    aging = receivables.aging(projects, data["as_of"])
+    start, end = receivables.period_bounds(data["start"], data["end"], data["granularity"])
+    ctx = {
+        "form": form,
+        "as_of": data["as_of"],
+        "aging": aging,
+        "aging_summary": receivables.aging_summary(aging),
+        "bucket_labels": receivables.BUCKET_LABELS,
+        "clients": receivables.period_summary(projects, start, end, data["granularity"]),
+        "period_start": start,
+        "period_end": end,
+        "granularity": data["granularity"],
+    }
+    return render(request, "core/receivables.html", ctx)
+
+
+@login_required
+def search_page(request: HttpRequest) -> HttpResponse:
+    """Ranked full-text matches across clients, jobs, assets and the entry logs."""
+    form = SearchForm(request.GET or None)
+    query = form.cleaned_data["q"] if form.is_valid() else ""
+    ctx = {
+        "form": form,
+        "query": query,
+        "groups": search.search(query),
+        "results_per_kind": search.RESULTS_PER_KIND,
+    }
+    return render(request, "core/search.html", ctx)
+
+
+@login_required
+def invoice_list(request: HttpRequest) -> HttpResponse:
+    """Issued invoices, newest first, optionally for one job (``?project=``)."""
+    invoices = Invoice.objects.all()
+    project = None
+    if request.GET.get("project", "").isdigit():
+        project = get_object_or_404(Project.objects.select_related("client"), pk=request.GET["project"])
+        invoices = invoices.filter(project=project)
+    return render(request, "core/invoice_list.html", {"invoices": invoices[:200], "project": project})
+
+
+@login_required
+def invoice_detail(request: HttpRequest, invoice_id: int) -> HttpResponse:
+    """Printable invoice, read straight from its frozen lines."""
+    invoice = get_object_or_404(Invoice, pk=invoice_id)
+    lines = list(invoice.lines.all())
+    ctx = {
+        "invoice": invoice,
+        "labor_lines": [line for line in lines if line.kind == line.LABOR],
+        "material_lines": [line for line in lines if line.kind == line.MATERIAL],
+    }
+    return render(request, "core/invoice.html", ctx)
+
+
+@login_required
+def invoice_export(request: HttpRequest, invoice_id: int) -> HttpResponse:
+    """Download an invoice as CSV (or ``?format=xlsx``)."""
+    invoice = get_object_or_404(Invoice, pk=invoice_id)
+    fmt = "xlsx" if request.GET.get("format") == "xlsx" else "csv"
+    rows = invoicing.invoice_rows(invoice, list(invoice.lines.all()))
+    return _export_response(request, rows, invoice.number, fmt)
+
+
+def _visible_tasks(request: HttpRequest) -> QuerySet:
+    """Background tasks the user may see: their own, or every task for staff."""
+    queryset = BackgroundTask.objects.defer("params").select_related("created_by")
+    return queryset if request.user.is_staff else queryset.filter(created_by=request.user)
+
+
+@login_required
+def task_list(request: HttpRequest) -> HttpResponse:
+    """Recent background tasks, plus forms that queue an export or (staff) a totals rebuild."""
+    form = BackgroundExportForm(initial={"format": "csv"})
+    if request.method == "POST":
+        if request.POST.get("task") == "rebuild_ledger" and request.user.is_staff:
+            task = tasks.enqueue("rebuild_ledger", {"rollups": settings.RECEIVABLES_ROLLUP}, user=request.user)
+            return redirect("core:task", task_id=task.pk)
+        form = BackgroundExportForm(request.POST)
+        if form.is_valid():
+            task = tasks.enqueue("export", form.task_params(), user=request.user)
+            return redirect("core:task", task_id=task.pk)
+    ctx = {"form": form, "tasks": _visible_tasks(request)[:50]}
+    return render(request, "core/task_list.html", ctx)
+
+
+@login_required
+def task_detail(request: HttpRequest, task_id: int) -> HttpResponse:
+    """Status and progress of one task; refreshes itself until the task finishes."""
+    task = get_object_or_404(_visible_tasks(request), pk=task_id)
+    return render(request, "core/task.html", {"task": task})
+
+
+@login_required
+def task_download(request: HttpRequest, task_id: int) -> HttpResponse:
+    """The file a finished task produced."""
+    task = get_object_or_404(_visible_tasks(request), pk=task_id, status=BackgroundTask.DONE)
+    if not task.output_file:
+        raise Http404("This task did not produce a file.")
+    try:
+        handle = task.output_file.open("rb")
+    except FileNotFoundError:
+        raise Http404("This task's file has been deleted.")
+    return FileResponse(handle, as_attachment=True, filename=task.output_name, content_type=task.output_type)
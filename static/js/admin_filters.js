@@ -0,0 +1,12 @@
+// why: autocomplete list filters (core/admin.py) reload the changelist when a value is picked or cleared
+'use strict';
+document.addEventListener('DOMContentLoaded', function () {
+  django.jQuery('select[data-filter-param]').on('change', function () {
+    const params = new URLSearchParams(window.location.search);
+    params.delete(this.dataset.filterParam);
+    params.delete(this.dataset.filterNullParam);
+    params.delete('p');
+    if (this.value) params.set(this.dataset.filterParam, this.value);
+    window.location.search = params.toString();
+  });
+});
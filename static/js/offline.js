@@ -0,0 +1,215 @@
+// why: crews on poor connections queue entries on the device and upload them in batches (see core/sync.py)
+'use strict';
+(function () {
+  const root = document.getElementById('offline-entry');
+  if (!root) return;
+  const form = document.getElementById('offline-form');
+  const kindSelect = document.getElementById('offline-kind');
+  const projectSelect = document.getElementById('offline-project');
+  const assetSelect = document.getElementById('offline-asset');
+  const queueBody = document.getElementById('offline-queue');
+  const status = document.getElementById('offline-status');
+  const projects = JSON.parse(document.getElementById('offline-projects').textContent);
+  const assets = JSON.parse(document.getElementById('offline-assets').textContent);
+  const projectById = new Map(projects.map((p) => [String(p.id), p]));
+  const FIELDS = {
+    work: ['asset', 'hours', 'notes'],
+    materials: ['description', 'quantity', 'unit_cost', 'markup_percent'],
+    payments: ['amount', 'notes'],
+  };
+  const KIND_LABELS = { work: 'Labor & Equipment', materials: 'Materials', payments: 'Payment' };
+  const BATCH = 200;
+
+  // ---------- IndexedDB queue ----------
+  let dbPromise = null;
+  function openQueue() {
+    dbPromise = dbPromise || new Promise((resolve, reject) => {
+      const request = indexedDB.open('jobtool-offline', 1);
+      request.onupgradeneeded = () => request.result.createObjectStore('queue', { keyPath: 'id' });
+      request.onsuccess = () => resolve(request.result);
+      request.onerror = () => reject(request.error);
+    });
+    return dbPromise;
+  }
+
+  async function withStore(mode, fn) {
+    const db = await openQueue();
+    return new Promise((resolve, reject) => {
+      const tx = db.transaction('queue', mode);
+      const request = fn(tx.objectStore('queue'));
+      tx.oncomplete = () => resolve(request ? request.result : undefined);
+      tx.onerror = () => reject(tx.error);
+    });
+  }
+
+  const queued = () => withStore('readonly', (store) => store.getAll());
+  const save = (entry) => withStore('readwrite', (store) => store.put(entry));
+  const remove = (ids) => withStore('readwrite', (store) => { ids.forEach((id) => store.delete(id)); });
+
+  // ---------- helpers ----------
+  function newId() {
+    if (crypto.randomUUID) return crypto.randomUUID();
+    const b = crypto.getRandomValues(new Uint8Array(16));
+    b[6] = (b[6] & 0x0f) | 0x40;
+    b[8] = (b[8] & 0x3f) | 0x80;
+    const h = Array.from(b, (x) => x.toString(16).padStart(2, '0')).join('');
+    return `${h.slice(0, 8)}-${h.slice(8, 12)}-${h.slice(12, 16)}-${h.slice(16, 20)}-${h.slice(20)}`;
+  }
+
+  function today() {
+    const d = new Date();
+    return new Date(d.getTime() - d.getTimezoneOffset() * 60000).toISOString().slice(0, 10);
+  }
+
+  function cookie(name) {
+    const match = document.cookie.split('; ').find((part) => part.startsWith(name + '='));
+    return match ? decodeURIComponent(match.slice(name.length + 1)) : '';
+  }
+
+  async function requestBody(entries) {
+    const json = JSON.stringify({ entries });
+    if (!window.CompressionStream) return { body: json, headers: {} };
+    const stream = new Blob([json]).stream().pipeThrough(new CompressionStream('gzip'));
+    return { body: await new Response(stream).blob(), headers: { 'Content-Encoding': 'gzip' } };
+  }
+
+  function summary(entry) {
+    if (entry.kind === 'work') {
+      const asset = (assets[projectById.get(String(entry.project))?.client] || [])
+        .find((a) => String(a.id) === String(entry.asset));
+      return `${entry.hours} h${asset ? ' — ' + asset.label : ''}`;
+    }
+    if (entry.kind === 'materials') return `${entry.quantity} × ${entry.description} @ $${entry.unit_cost}`;
+    return `$${entry.amount}`;
+  }
+
+  // ---------- form ----------
+  function showKind() {
+    for (const fieldset of form.querySelectorAll('fieldset[data-kind]')) {
+      const active = fieldset.dataset.kind === kindSelect.value;
+      fieldset.hidden = !active;
+      fieldset.disabled = !active;
+    }
+  }
+
+  function fillAssets() {
+    const project = projectById.get(projectSelect.value);
+    const options = project ? assets[project.client] || [] : [];
+    assetSelect.replaceChildren(new Option('---------', ''), ...options.map((a) => new Option(a.label, a.id)));
+  }
+
+  form.addEventListener('submit', async (event) => {
+    event.preventDefault();
+    const data = Object.fromEntries(new FormData(form));
+    const entry = { id: newId(), kind: data.kind, project: data.project, date: data.date };
+    for (const name of FIELDS[data.kind]) entry[name] = data[name] ?? '';
+    await save(entry);
+    for (const fieldset of form.querySelectorAll('fieldset[data-kind]')) {
+      fieldset.querySelectorAll('input').forEach((input) => { input.value = input.defaultValue; });
+    }
+    await render();
+    sync();
+  });
+
+  kindSelect.addEventListener('change', showKind);
+  projectSelect.addEventListener('change', fillAssets);
+  document.getElementById('offline-sync').addEventListener('click', () => sync());
+
+  queueBody.addEventListener('click', async (event) => {
+    const id = event.target.dataset.discard;
+    if (id && window.confirm('Discard this entry? It has not been saved.')) {
+      await remove([id]);
+      render();
+    }
+  });
+
+  // ---------- queue display ----------
+  async function render() {
+    const entries = (await queued()).sort((a, b) => a.date.localeCompare(b.date));
+    const rows = entries.map((entry) => {
+      const tr = document.createElement('tr');
+      const cells = [
+        entry.date,
+        projectById.get(String(entry.project))?.label || `Job #${entry.project}`,
+        `${KIND_LABELS[entry.kind]}: ${summary(entry)}`,
+        entry.error ? `Rejected: ${entry.error}` : 'Waiting to upload',
+      ];
+      for (const text of cells) {
+        const td = document.createElement('td');
+        td.textContent = text;
+        tr.append(td);
+      }
+      const action = document.createElement('td');
+      if (entry.error) {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'btn btn-ghost';
+        button.textContent = 'Discard';
+        button.dataset.discard = entry.id;
+        action.append(button);
+      }
+      tr.append(action);
+      return tr;
+    });
+    if (!rows.length) {
+      const tr = document.createElement('tr');
+      tr.innerHTML = '<td colspan="5" class="muted">Nothing queued.</td>';
+      rows.push(tr);
+    }
+    queueBody.replaceChildren(...rows);
+    const waiting = entries.filter((entry) => !entry.error).length;
+    status.textContent = `${navigator.onLine ? 'Online' : 'Offline'} — ${waiting} waiting to upload.`;
+  }
+
+  // ---------- sync ----------
+  let syncing = false;
+  async function sync() {
+    if (syncing || !navigator.onLine) return render();
+    syncing = true;
+    try {
+      const pending = (await queued()).filter((entry) => !entry.error);
+      for (let i = 0; i < pending.length; i += BATCH) {
+        const batch = pending.slice(i, i + BATCH);
+        const payload = await requestBody(batch);
+        const response = await fetch(root.dataset.syncUrl, {
+          method: 'POST',
+          credentials: 'same-origin',
+          headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': cookie(root.dataset.csrfCookie),
+            ...payload.headers,
+          },
+          body: payload.body,
+        });
+        if (!response.ok) {
+          if (response.status === 401 || response.status === 403) {
+            status.textContent = 'Log in again to upload the queued entries.';
+          }
+          return;
+        }
+        const result = await response.json();
+        await remove([...result.accepted, ...result.duplicates]);
+        for (const entry of batch) {
+          if (result.errors[entry.id]) await save({ ...entry, error: result.errors[entry.id] });
+        }
+      }
+    } catch (_) {
+      // still offline or the server is unreachable; the next trigger retries
+    } finally {
+      syncing = false;
+      if (status.textContent.startsWith('Log in')) return;
+      render();
+    }
+  }
+
+  form.elements.date.value = today();
+  showKind();
+  fillAssets();
+  render().then(sync);
+  window.addEventListener('online', () => sync());
+  window.addEventListener('offline', () => render());
+  setInterval(() => sync(), 60000);
+  if ('serviceWorker' in navigator) {
+    navigator.serviceWorker.register(root.dataset.swUrl, { scope: root.dataset.scope }).catch(() => {});
+  }
+})();
@@ -0,0 +1,41 @@
+// Service worker for the offline entry page: caches the page shell so it opens without a connection.
+'use strict';
+const CACHE = 'jobtool-offline-{{ version }}';
+const SHELL = {{ shell|safe }};
+const PAGE = SHELL[0];
+
+self.addEventListener('install', (event) => {
+  event.waitUntil(caches.open(CACHE).then((cache) => cache.addAll(SHELL)).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', (event) => {
+  event.waitUntil(
+    caches.keys()
+      .then((keys) => Promise.all(
+        keys.filter((key) => key.startsWith('jobtool-offline-') && key !== CACHE).map((key) => caches.delete(key))
+      ))
+      .then(() => self.clients.claim())
+  );
+});
+
+self.addEventListener('fetch', (event) => {
+  const request = event.request;
+  const url = new URL(request.url);
+  if (request.method !== 'GET' || url.origin !== self.location.origin) return;
+  if (request.mode === 'navigate') {
+    // why: network first keeps the job and asset lists current; the cached page is the fallback
+    event.respondWith(
+      fetch(request)
+        .then((response) => {
+          if (response.ok && !response.redirected && url.pathname === PAGE) {
+            const copy = response.clone();
+            caches.open(CACHE).then((cache) => cache.put(PAGE, copy));
+          }
+          return response;
+        })
+        .catch(() => caches.match(PAGE))
+    );
+  } else if (SHELL.includes(url.pathname)) {
+    event.respondWith(caches.match(request).then((cached) => cached || fetch(request)));
+  }
+});